@@ -0,0 +1,39 @@
+"""storage deletion outbox
+
+Revision ID: 0b2d4f6a8c1e
+Revises: f1a3c5e7b9d4
+Create Date: 2026-10-18 19:58:31.640127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b2d4f6a8c1e'
+down_revision: Union[str, Sequence[str], None] = 'f1a3c5e7b9d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('storage_deletions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=500), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        op.f('ix_storage_deletions_next_attempt_at'), 'storage_deletions', ['next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_storage_deletions_next_attempt_at'), table_name='storage_deletions')
+    op.drop_table('storage_deletions')
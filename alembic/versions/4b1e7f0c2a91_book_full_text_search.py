@@ -0,0 +1,52 @@
+"""book full-text search documents
+
+Revision ID: 4b1e7f0c2a91
+Revises: d90583282c40
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1e7f0c2a91'
+down_revision: Union[str, Sequence[str], None] = 'd90583282c40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'book_search_documents',
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('document', postgresql.TSVECTOR(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_id')
+    )
+    op.create_index(
+        'ix_book_search_documents_document', 'book_search_documents', ['document'],
+        unique=False, postgresql_using='gin'
+    )
+    # Index the existing catalog
+    op.execute(
+        "INSERT INTO book_search_documents (book_id, document) "
+        "SELECT b.id, "
+        "setweight(to_tsvector('english', coalesce(b.title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(a.name, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(c.name, '')), 'C') || "
+        "setweight(to_tsvector('english', coalesce(b.description, '')), 'D') "
+        "FROM books b "
+        "LEFT JOIN authors a ON a.id = b.author_id "
+        "LEFT JOIN book_categories c ON c.id = b.category_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_book_search_documents_document', table_name='book_search_documents', postgresql_using='gin')
+    op.drop_table('book_search_documents')
@@ -0,0 +1,64 @@
+"""indexes for the list filters, sorts and relationship loads
+
+Revision ID: 5e7a9c1b3d6f
+Revises: 0b2d4f6a8c1e
+Create Date: 2026-10-18 21:14:52.307815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7a9c1b3d6f'
+down_revision: Union[str, Sequence[str], None] = '0b2d4f6a8c1e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so the tables stay writable, which has to run outside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_books_author_id'), 'books', ['author_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(
+            op.f('ix_books_category_id'), 'books', ['category_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(
+            op.f('ix_books_publication_year'), 'books', ['publication_year'],
+            unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            op.f('ix_reviews_user_id'), 'reviews', ['user_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(
+            'ix_reviews_book_id_created_at', 'reviews', ['book_id', 'created_at'],
+            unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_reviews_book_id_rating', 'reviews', ['book_id', 'rating'],
+            unique=False, postgresql_concurrently=True
+        )
+        # Case-insensitive name lookups and prefix searches
+        op.create_index(
+            'ix_authors_lower_name', 'authors', [sa.text('lower(name) text_pattern_ops')],
+            unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_book_categories_lower_name', 'book_categories', [sa.text('lower(name) text_pattern_ops')],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_book_categories_lower_name', table_name='book_categories', postgresql_concurrently=True)
+        op.drop_index('ix_authors_lower_name', table_name='authors', postgresql_concurrently=True)
+        op.drop_index('ix_reviews_book_id_rating', table_name='reviews', postgresql_concurrently=True)
+        op.drop_index('ix_reviews_book_id_created_at', table_name='reviews', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_reviews_user_id'), table_name='reviews', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_books_publication_year'), table_name='books', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_books_category_id'), table_name='books', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_books_author_id'), table_name='books', postgresql_concurrently=True)
@@ -0,0 +1,42 @@
+"""trigram indexes for fuzzy book search
+
+Revision ID: 9a3c5d7e1f20
+Revises: 4b1e7f0c2a91
+Create Date: 2026-10-18 11:40:03.552917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3c5d7e1f20'
+down_revision: Union[str, Sequence[str], None] = '4b1e7f0c2a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_books_title_trgm', 'books', [sa.text('lower(title) gin_trgm_ops')],
+        unique=False, postgresql_using='gin'
+    )
+    op.create_index(
+        'ix_authors_name_trgm', 'authors', [sa.text('lower(name) gin_trgm_ops')],
+        unique=False, postgresql_using='gin'
+    )
+    op.create_index(
+        'ix_book_categories_name_trgm', 'book_categories', [sa.text('lower(name) gin_trgm_ops')],
+        unique=False, postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_book_categories_name_trgm', table_name='book_categories', postgresql_using='gin')
+    op.drop_index('ix_authors_name_trgm', table_name='authors', postgresql_using='gin')
+    op.drop_index('ix_books_title_trgm', table_name='books', postgresql_using='gin')
@@ -0,0 +1,49 @@
+"""book rating aggregates
+
+Revision ID: c7d2e4f6a8b0
+Revises: 9a3c5d7e1f20
+Create Date: 2026-10-18 13:05:27.804311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e4f6a8b0'
+down_revision: Union[str, Sequence[str], None] = '9a3c5d7e1f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RATING_COUNT_COLUMNS = [f'rating_{star}_count' for star in range(1, 6)]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('average_rating', sa.Float(), nullable=True))
+    op.add_column('books', sa.Column('review_count', sa.Integer(), server_default='0', nullable=False))
+    for column in RATING_COUNT_COLUMNS:
+        op.add_column('books', sa.Column(column, sa.Integer(), server_default='0', nullable=False))
+    op.create_index(op.f('ix_books_average_rating'), 'books', ['average_rating'], unique=False)
+
+    # Backfill from the existing reviews
+    star_counts = ', '.join(
+        f"rating_{star}_count = (SELECT count(*) FROM reviews r WHERE r.book_id = books.id AND r.rating = {star})"
+        for star in range(1, 6)
+    )
+    op.execute(
+        f"UPDATE books SET {star_counts}, "
+        "review_count = (SELECT count(*) FROM reviews r WHERE r.book_id = books.id), "
+        "average_rating = (SELECT avg(r.rating) FROM reviews r WHERE r.book_id = books.id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_books_average_rating'), table_name='books')
+    for column in reversed(RATING_COUNT_COLUMNS):
+        op.drop_column('books', column)
+    op.drop_column('books', 'review_count')
+    op.drop_column('books', 'average_rating')
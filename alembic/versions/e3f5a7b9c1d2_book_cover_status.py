@@ -0,0 +1,30 @@
+"""book cover status
+
+Revision ID: e3f5a7b9c1d2
+Revises: c7d2e4f6a8b0
+Create Date: 2026-10-18 18:42:10.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3f5a7b9c1d2'
+down_revision: Union[str, Sequence[str], None] = 'c7d2e4f6a8b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('cover_status', sa.String(length=20), nullable=True))
+    # Covers uploaded so far went up synchronously
+    op.execute("UPDATE books SET cover_status = 'ready' WHERE cover_image_s3_key IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'cover_status')
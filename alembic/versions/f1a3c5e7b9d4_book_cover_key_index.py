@@ -0,0 +1,27 @@
+"""book cover key index
+
+Revision ID: f1a3c5e7b9d4
+Revises: e3f5a7b9c1d2
+Create Date: 2026-10-18 19:20:44.107385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a3c5e7b9d4'
+down_revision: Union[str, Sequence[str], None] = 'e3f5a7b9c1d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_books_cover_image_s3_key'), 'books', ['cover_image_s3_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_books_cover_image_s3_key'), table_name='books')
@@ -0,0 +1,98 @@
+"""
+Benchmark of api_response with each JSON provider, on pages of books shaped
+like BookSchema dumps them (author, category and reviews with their users).
+
+    poetry run python -m benchmarks.bench_json_provider --per-page 100 --reviews 5
+"""
+import argparse
+import datetime
+import timeit
+
+from flask import Flask
+
+from bookstore_api.app.helpers import api_response, FastJSONProvider, JSON_PROVIDERS
+from bookstore_api.app.helpers.json_provider import orjson
+
+
+def book_page(per_page, reviews_per_book):
+    """A page of books as the books list endpoint serializes it."""
+    now = datetime.datetime(2025, 1, 1, 12, 30).isoformat()
+    books = [
+        {
+            'id': i,
+            'title': f'The Book of Things, Volume {i}',
+            'description': 'A long description of the book, the kind publishers write for the back cover. ' * 4,
+            'isbn': f'{9780000000000 + i}',
+            'cover_image_url': f'https://covers.example.com/covers/{i:064x}.jpg',
+            'cover_image_s3_key': f'covers/{i:064x}.jpg',
+            'cover_status': 'ready',
+            'publication_year': 1950 + i % 75,
+            'author_id': i % 50,
+            'category_id': i % 12,
+            'average_rating': 3.75,
+            'review_count': reviews_per_book,
+            'author': {'name': f'Author {i % 50}'},
+            'category': {'name': f'Category {i % 12}'},
+            'reviews': [
+                {
+                    'id': i * reviews_per_book + j,
+                    'rating': 1 + j % 5,
+                    'comment': 'Enjoyed it, though the middle chapters drag a little.',
+                    'user': {'id': j, 'username': f'reader{j}'},
+                    'created_at': now,
+                    'updated_at': now,
+                }
+                for j in range(reviews_per_book)
+            ],
+            'created_at': now,
+            'updated_at': now,
+        }
+        for i in range(per_page)
+    ]
+    return {
+        'books': books,
+        'total': 100000,
+        'pages': 100000 // per_page,
+        'current_page': 1,
+        'per_page': per_page
+    }
+
+def make_app(provider):
+    app = Flask(__name__)
+    app.config['JSON_PROVIDER'] = provider
+    app.json = FastJSONProvider(app)
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--per-page', type=int, default=100, help='Books per page.')
+    parser.add_argument('--reviews', type=int, default=5, help='Reviews per book.')
+    parser.add_argument('--number', type=int, default=200, help='Responses per timing run.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing runs, the best one is reported.')
+    args = parser.parse_args()
+
+    if orjson is None:
+        print('orjson is not installed (poetry install --extras fast-json), only stdlib is measured.')
+    payload = book_page(args.per_page, args.reviews)
+    print(f'{args.per_page} books per page, {args.reviews} reviews per book')
+
+    timings = {}
+    for provider in JSON_PROVIDERS:
+        app = make_app(provider)
+        if provider == 'orjson' and not app.json.use_orjson:
+            continue
+        with app.test_request_context():
+            size = len(api_response(payload, message='Books fetched successfully').get_data())
+            best = min(timeit.repeat(
+                lambda: api_response(payload, message='Books fetched successfully'),
+                number=args.number, repeat=args.repeat
+            )) / args.number
+        timings[provider] = best
+        print(f'  {provider:<7} {best * 1000:8.3f} ms per response ({size} bytes)')
+
+    if len(timings) == 2:
+        print(f"  orjson is {timings['stdlib'] / timings['orjson']:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of compiled dump functions against marshmallow's dump, on pages of
+books with their author, category and reviews, as the books list dumps them.
+
+    poetry run python -m benchmarks.bench_serializers --per-page 100 --reviews 5
+"""
+import argparse
+import datetime
+import json
+import timeit
+
+from bookstore_api.app.helpers import compile_dump, get_schema
+from bookstore_api.app.models import Author, Book, BookCategory, Review, User
+from bookstore_api.app.schemas import BookSchema
+
+
+def book_page(per_page, reviews_per_book):
+    """Transient books, loaded with everything BookSchema dumps."""
+    now = datetime.datetime(2025, 1, 1, 12, 30)
+    authors = [Author(id=i, name=f'Author {i}') for i in range(50)]
+    categories = [BookCategory(id=i, name=f'Category {i}') for i in range(12)]
+    users = [User(id=i, username=f'reader{i}') for i in range(reviews_per_book)]
+    books = []
+    for i in range(per_page):
+        book = Book(
+            id=i, title=f'The Book of Things, Volume {i}', isbn=f'{9780000000000 + i}',
+            description='A long description of the book, the kind publishers write for the back cover.',
+            cover_image_url=f'https://covers.example.com/covers/{i:064x}.jpg', cover_status='ready',
+            publication_year=1950 + i % 75, average_rating=3.75, review_count=reviews_per_book,
+            author=authors[i % 50], category=categories[i % 12], created_at=now, updated_at=now
+        )
+        book.reviews = [
+            Review(
+                id=i * reviews_per_book + j, rating=1 + j % 5, user=users[j], created_at=now, updated_at=now,
+                comment='Enjoyed it, though the middle chapters drag a little.'
+            )
+            for j in range(reviews_per_book)
+        ]
+        books.append(book)
+    return books
+
+def check_nested_fieldsets(books):
+    """Sparse schemas differing only in their nested fields dump differently."""
+    for only in (('id', 'reviews.rating'), ('id', 'reviews.comment'), ('id', 'reviews.user.username')):
+        schema = get_schema(BookSchema, many=True, only=only)
+        if json.dumps(compile_dump(schema)(books)) != json.dumps(schema.dump(books)):
+            raise SystemExit(f'{",".join(only)}: the compiled dump differs from marshmallow')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--per-page', type=int, default=100, help='Books per page.')
+    parser.add_argument('--reviews', type=int, default=5, help='Reviews per book.')
+    parser.add_argument('--number', type=int, default=100, help='Dumps per timing run.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing runs, the best one is reported.')
+    args = parser.parse_args()
+
+    books = book_page(args.per_page, args.reviews)
+    print(f'{args.per_page} books per page, {args.reviews} reviews per book')
+    check_nested_fieldsets(books)
+
+    variants = {
+        'full': BookSchema(many=True),
+        'sparse': BookSchema(many=True, only=('id', 'title', 'isbn', 'author.name', 'average_rating')),
+    }
+    for name, schema in variants.items():
+        dump = compile_dump(schema)
+        if json.dumps(dump(books)) != json.dumps(schema.dump(books)):
+            raise SystemExit(f'{name}: the compiled dump differs from marshmallow')
+
+        marshmallow_time = min(timeit.repeat(
+            lambda: schema.dump(books), number=args.number, repeat=args.repeat)) / args.number
+        compiled_time = min(timeit.repeat(
+            lambda: dump(books), number=args.number, repeat=args.repeat)) / args.number
+        print(f'  {name:<7} marshmallow {marshmallow_time * 1000:8.3f} ms, compiled {compiled_time * 1000:8.3f} ms '
+              f'({marshmallow_time / compiled_time:.1f}x faster, same output)')
+
+
+if __name__ == '__main__':
+    main()
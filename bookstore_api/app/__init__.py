@@ -5,8 +5,12 @@ from dotenv import load_dotenv
 from werkzeug.exceptions import HTTPException
 
 from .extensions import db, migrate, ma, jwt
-from .helpers import ApiError
+from .helpers import ApiError, FastJSONProvider
 from .scripts import init_app_commands
+from .services import (
+    init_book_search, response_cache, identity_cache, token_blocklist, cover_uploads, storage_deletions,
+    replica_router, db_pools, query_metrics
+)
 # Import config
 from .config import DevelopmentConfig, ProductionConfig, TestConfig
 # Import routes
@@ -29,11 +33,22 @@ def create_app():
     else:
         app.config.from_object(TestConfig)
 
-    # Initialize database and migrations
+    # JSON encoding of every response, orjson when it is installed
+    app.json = FastJSONProvider(app)
+
+    # Initialize database and migrations, the pools are configured before the engines exist
+    db_pools.init_app(app)
     db.init_app(app)
+    query_metrics.init_app(app)
+    replica_router.init_app(app)
     migrate.init_app(app, db)
     ma.init_app(app)
     jwt.init_app(app)
+    response_cache.init_app(app)
+    identity_cache.init_app(app)
+    token_blocklist.init_app(app)
+    cover_uploads.init_app(app)
+    storage_deletions.init_app(app)
 
     # Register custom CLI commands
     init_app_commands(app)
@@ -71,5 +86,6 @@ def create_app():
 
     with app.app_context():
         db.create_all()
+        init_book_search()
 
     return app
@@ -12,15 +12,87 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY')
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pools, see services.db_pools: threaded (requests served by threads), prefork
+    # (gunicorn sync workers, a small pool each) or pgbouncer (no pool, PgBouncer in transaction
+    # mode does the pooling). DB_POOL_SIZE/DB_MAX_OVERFLOW override the profile's sizes,
+    # DB_STATEMENT_TIMEOUT (ms, 0 disables) cancels longer PostgreSQL statements of requests, the
+    # seed batch commands run without it.
+    # SQLALCHEMY_ENGINE_OPTIONS set here take precedence over the profile.
+    DB_POOL_PROFILE = os.getenv('DB_POOL_PROFILE', 'threaded')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE')) if os.getenv('DB_POOL_SIZE') else None
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW')) if os.getenv('DB_MAX_OVERFLOW') else None
+    DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', '30000'))
+    # Read replicas (comma separated URIs) serving the reads of the API's GET requests.
+    # Replicas lagging over REPLICA_MAX_LAG seconds drop out of rotation, the lag being
+    # checked every REPLICA_CHECK_INTERVAL seconds. Clients read from the primary for
+    # REPLICA_PIN_SECONDS after a write, keep it above the usual lag.
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.getenv('SQLALCHEMY_REPLICA_URIS', '').split(',') if uri]
+    REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', '5'))
+    REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', '5'))
+    REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '10'))
+    # Per-request SQL metrics, see services.query_metrics: Server-Timing header (disable to keep
+    # timings from clients), JSON log line per request, at WARNING past SQL_SLOW_REQUEST_MS of
+    # database time. SQL_NPLUS1_MODE (off, warn or raise) reports SELECTs repeated at least
+    # SQL_NPLUS1_THRESHOLD times in a request, raise only fails requests when TESTING is set.
+    SQL_SERVER_TIMING = os.getenv('SQL_SERVER_TIMING', 'true').lower() == 'true'
+    SQL_SLOW_REQUEST_MS = float(os.getenv('SQL_SLOW_REQUEST_MS', '500'))
+    SQL_NPLUS1_MODE = os.getenv('SQL_NPLUS1_MODE', 'warn')
+    SQL_NPLUS1_THRESHOLD = int(os.getenv('SQL_NPLUS1_THRESHOLD', '5'))
     JWT_ALGORITHM = os.getenv('JWT_ALGORITHM')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
     JWT_TOKEN_LOCATION = ['headers', 'cookies']
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES_DAYS', '3')))
+    # JSON encoder of every response: orjson (if installed, stdlib otherwise) or stdlib
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    # Response cache backend: redis, lru (in-process) or null (disabled)
     CACHE_TYPE = os.getenv('CACHE_TYPE')
     CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', '300'))
-    REDIS_HOST = os.getenv('REDIS_HOST')
-    REDIS_PORT = os.getenv('REDIS_PORT')
-    REDIS_DB = os.getenv('REDIS_DB')
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1024'))
+    # Per-worker cache of the authenticated user and role, other workers see
+    # user and role changes once their entries expire (seconds)
+    IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', '60'))
+    IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv('IDENTITY_CACHE_MAX_ENTRIES', '10000'))
+    REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+    REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+    REDIS_DB = int(os.getenv('REDIS_DB', '0'))
+    # Connection pool shared by the response cache and the token blocklist, timeouts in seconds
+    REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '0.5'))
+    REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv('REDIS_SOCKET_CONNECT_TIMEOUT', '0.5'))
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', '30'))
+    # How long (seconds) a worker trusts a "not revoked" answer for a token. This
+    # bounds how late a revocation made through another worker is enforced.
+    BLOCKLIST_CACHE_TTL = float(os.getenv('BLOCKLIST_CACHE_TTL', '5'))
+    BLOCKLIST_CACHE_MAX_ENTRIES = int(os.getenv('BLOCKLIST_CACHE_MAX_ENTRIES', '10000'))
+    # Background cover uploads: storage backend (s3, or local for development), where
+    # uploads are spooled, worker threads and retries with exponential backoff. Covers
+    # pending for over COVER_UPLOAD_STALE_AFTER seconds are settled by `seed stale-covers`.
+    COVER_UPLOAD_BACKEND = os.getenv('COVER_UPLOAD_BACKEND', 's3')
+    COVER_UPLOAD_LOCAL_DIR = os.getenv('COVER_UPLOAD_LOCAL_DIR', 'covers')
+    COVER_UPLOAD_SPOOL_DIR = os.getenv('COVER_UPLOAD_SPOOL_DIR')
+    COVER_UPLOAD_WORKERS = int(os.getenv('COVER_UPLOAD_WORKERS', '4'))
+    COVER_UPLOAD_MAX_RETRIES = int(os.getenv('COVER_UPLOAD_MAX_RETRIES', '3'))
+    COVER_UPLOAD_RETRY_BACKOFF = float(os.getenv('COVER_UPLOAD_RETRY_BACKOFF', '1'))
+    COVER_UPLOAD_STALE_AFTER = int(os.getenv('COVER_UPLOAD_STALE_AFTER', '3600'))
+    # Deletion outbox: keys per storage request (at most 1000), how often (seconds,
+    # 0 disables) each worker drains it in the background and the retry backoff
+    STORAGE_DELETION_BATCH_SIZE = int(os.getenv('STORAGE_DELETION_BATCH_SIZE', '1000'))
+    STORAGE_DELETION_DRAIN_INTERVAL = float(os.getenv('STORAGE_DELETION_DRAIN_INTERVAL', '30'))
+    STORAGE_DELETION_RETRY_BACKOFF = float(os.getenv('STORAGE_DELETION_RETRY_BACKOFF', '60'))
+    STORAGE_DELETION_MAX_BACKOFF = float(os.getenv('STORAGE_DELETION_MAX_BACKOFF', '3600'))
+    # Covers clients may upload straight to S3 through presigned POSTs
+    COVER_ALLOWED_CONTENT_TYPES = os.getenv(
+        'COVER_ALLOWED_CONTENT_TYPES', 'image/jpeg,image/png,image/webp,image/gif').split(',')
+    COVER_MAX_BYTES = int(os.getenv('COVER_MAX_BYTES', str(5 * 1024 * 1024)))
+    COVER_PRESIGNED_EXPIRES = int(os.getenv('COVER_PRESIGNED_EXPIRES', '300'))
+    # Most items accepted by a batch write endpoint
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '1000'))
+    # Fuzzy book search: minimum similarity, max matches ranked by the in-process
+    # trigram index and how long (seconds) that index lives before a full rebuild, as
+    # long as the writes made through other processes can go unseen
+    SEARCH_FUZZY_THRESHOLD = float(os.getenv('SEARCH_FUZZY_THRESHOLD', '0.4'))
+    SEARCH_FUZZY_MAX_MATCHES = int(os.getenv('SEARCH_FUZZY_MAX_MATCHES', '1000'))
+    SEARCH_TRIGRAM_INDEX_MAX_AGE = int(os.getenv('SEARCH_TRIGRAM_INDEX_MAX_AGE', '300'))
 
 class DevelopmentConfig(Config):
     # Development-specific configuration settings
@@ -30,8 +102,14 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     # Production-specific configuration settings
     ENV = 'production'
+    # Served by gunicorn's forked sync workers
+    DB_POOL_PROFILE = os.getenv('DB_POOL_PROFILE', 'prefork')
+    SQL_NPLUS1_MODE = os.getenv('SQL_NPLUS1_MODE', 'off')
 
 class TestConfig(Config):
     # Test-specific configuration settings
     ENV = 'testing'
     DEBUG = True
+    CACHE_TYPE = os.getenv('CACHE_TYPE', 'lru')
+    # Fail requests with N+1 queries under the test client (TESTING), so the tests catching them fail
+    SQL_NPLUS1_MODE = os.getenv('SQL_NPLUS1_MODE', 'raise')
@@ -1,9 +1,32 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_migrate import Migrate
 from flask_marshmallow import Marshmallow
 from flask_jwt_extended import JWTManager
+from sqlalchemy import Select
 
-db = SQLAlchemy()
+
+class RoutingSession(Session):
+    """
+    Sends the SELECTs of a request routed to a read replica (g.db_replica,
+    see services.replicas) to that replica. Flushes, other statements and
+    SELECTs with the `primary` execution option go to the primary: locking
+    reads (SELECT ... FOR UPDATE) have to set it, e.g.
+    query.with_for_update().execution_options(primary=True).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None and not self._flushing
+            and isinstance(clause, Select) and not clause.get_execution_options().get('primary')
+            and has_app_context() and g.get('db_replica') is not None
+        ):
+            return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 ma = Marshmallow()
 jwt = JWTManager()
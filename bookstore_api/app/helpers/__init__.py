@@ -4,7 +4,20 @@ from .role_required import role_required
 from .auth_helper import is_valid_email_format, is_strong_password, revoke_token
 from .api_helpers import (
     api_response, search_filter_and_sort_books, filter_and_sort_reviews,
-    get_page_filters
+    get_page_filters, get_book_sort, get_review_sort
+)
+from .pagination import (
+    paginate_by_cursor, paginate_query, get_count_mode, get_count_cache_key
+)
+from .serializers import compile_dump, get_schema
+from .loader_plans import build_loader_options, get_sparse_fieldset
+from .json_provider import FastJSONProvider, JSON_PROVIDERS
+from .batch import BatchResults, get_batch_items, load_batch_items, existing_ids
+from .catalog_export import export_books, get_export_filters, EXPORT_FORMATS
+from .query_plans import check_query_plans
+from .conditional import (
+    make_etag, last_modified_of, get_collection_validators, get_entity_validators, set_validators,
+    not_modified_response
 )
 
 __all__ = [
@@ -19,4 +32,30 @@ __all__ = [
     'search_filter_and_sort_books',
     'filter_and_sort_reviews',
     'get_page_filters',
+    'get_book_sort',
+    'get_review_sort',
+    'paginate_by_cursor',
+    'paginate_query',
+    'get_count_mode',
+    'get_count_cache_key',
+    'compile_dump',
+    'get_schema',
+    'build_loader_options',
+    'get_sparse_fieldset',
+    'make_etag',
+    'last_modified_of',
+    'get_collection_validators',
+    'get_entity_validators',
+    'set_validators',
+    'not_modified_response',
+    'FastJSONProvider',
+    'JSON_PROVIDERS',
+    'BatchResults',
+    'get_batch_items',
+    'load_batch_items',
+    'existing_ids',
+    'export_books',
+    'get_export_filters',
+    'EXPORT_FORMATS',
+    'check_query_plans',
 ]
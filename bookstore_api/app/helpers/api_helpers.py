@@ -1,13 +1,22 @@
 from flask import jsonify, make_response, current_app
-from sqlalchemy import or_, func
 
-from bookstore_api.app.models import (
-    Book, Author, BookCategory, Review
-)
+from bookstore_api.app.models import Book, Review
+from bookstore_api.app.services import get_search_backend
+from .pagination import _is_nullable
 
 DEFAULT_PER_PAGE = 10
 DEFAULT_PAGE = 1
 
+BOOK_SORT_COLUMNS = {
+    'title': Book.title,
+    'publication_year': Book.publication_year,
+    'rating': Book.average_rating,
+}
+REVIEW_SORT_COLUMNS = {
+    'created_at': Review.created_at,
+    'rating': Review.rating,
+}
+
 def api_response(data=None, message="Success", status_code=200, **kwargs):
     """
     Creates a consistent JSON response structure for success.
@@ -34,19 +43,47 @@ def get_page_filters(filters):
         return None, None
     return per_page, page
 
+def get_book_sort(filters):
+    """Return the (sort_by, column, descending) sort key for the books query."""
+    sort_by = filters.get('sort_by', 'title')  # Default sort by title
+    if sort_by not in BOOK_SORT_COLUMNS:
+        sort_by = 'title'
+    sort_order = filters.get('sort_order', 'asc')  # Default ascending order
+    return sort_by, BOOK_SORT_COLUMNS[sort_by], sort_order == 'desc'
+
+def get_review_sort(filters):
+    """Return the (sort_by, column, descending) sort key for the reviews query."""
+    sort_by = filters.get('sort_by', 'created_at')  # Default sort by created_at
+    if sort_by not in REVIEW_SORT_COLUMNS:
+        sort_by = 'created_at'
+    sort_order = filters.get('sort_order', 'desc')  # Default descending order
+    return sort_by, REVIEW_SORT_COLUMNS[sort_by], sort_order == 'desc'
+
+def _sort_order(column, id_column, descending):
+    """
+    ORDER BY of a list sorted on `column`, rows without a value last whichever
+    the direction, as paginate_by_cursor orders them.
+    """
+    sort_column = column.desc() if descending else column.asc()
+    if _is_nullable(column):
+        sort_column = sort_column.nulls_last()
+    return sort_column, id_column.desc() if descending else id_column.asc()
+
 def search_filter_and_sort_books(books_query, filters):
     """Apply filtering and sorting to the books query based on request args."""
-    # Searching
+    # Searching, rank is None when the search mode or backend cannot rank
+    rank = None
     search_term = filters.get('search')
     if search_term:
-        search_pattern = f"%{search_term.lower()}%"
-        books_query = books_query.join(Author, isouter=True).join(BookCategory, isouter=True).filter(
-            or_(
-                func.lower(Book.title).like(search_pattern),
-                func.lower(Author.name).like(search_pattern),
-                func.lower(BookCategory.name).like(search_pattern)
-            )
-        )
+        search_backend = get_search_backend()
+        search_mode = filters.get('search_mode', 'fulltext')
+        if search_mode == 'fuzzy':
+            books_query, rank = search_backend.apply_fuzzy(
+                books_query, search_term, current_app.config['SEARCH_FUZZY_THRESHOLD'])
+        elif search_mode == 'prefix':
+            books_query, rank = search_backend.apply_prefix(books_query, search_term)
+        else:
+            books_query, rank = search_backend.apply(books_query, search_term)
 
     # Filtering
     author_id = filters.get('author_id')
@@ -59,21 +96,22 @@ def search_filter_and_sort_books(books_query, filters):
         books_query = books_query.filter(Book.category_id == category_id)
     if publication_year:
         books_query = books_query.filter(Book.publication_year >= publication_year)
-    # TODO: Filter by minimum rating when reviews are implemented
 
-    # Sorting
-    sort_by = filters.get('sort_by', 'title')  # Default sort by title
-    sort_order = filters.get('sort_order', 'asc')  # Default ascending order
+    min_rating = filters.get('min_rating')
+    if min_rating:
+        try:
+            min_rating_value = float(min_rating)
+            if 1 <= min_rating_value <= 5:
+                books_query = books_query.filter(Book.average_rating >= min_rating_value)
+        except ValueError:
+            pass  # Invalid min_rating is ignored like the other filters
 
-    if sort_by in ['title', 'publication_year'] and hasattr(Book, sort_by):
-        sort_column = getattr(Book, sort_by)
-        if sort_order == 'desc':
-            sort_column = sort_column.desc()
-        else:
-            sort_column = sort_column.asc()
-        books_query = books_query.order_by(sort_column)
+    # Sorting, with the id as a tie-breaker so that pages are stable
+    if filters.get('sort_by') == 'relevance' and rank is not None:
+        return books_query.order_by(rank.desc(), Book.id.asc())
 
-    return books_query
+    _, sort_column, descending = get_book_sort(filters)
+    return books_query.order_by(*_sort_order(sort_column, Book.id, descending))
 
 def filter_and_sort_reviews(reviews_query, filters):
     """Apply filtering and sorting to the reviews query based on request args."""
@@ -94,16 +132,6 @@ def filter_and_sort_reviews(reviews_query, filters):
         except ValueError:
             pass  # Invalid min_rating will be handled by the caller
 
-    # Sorting
-    sort_by = filters.get('sort_by', 'created_at')  # Default sort by created_at
-    sort_order = filters.get('sort_order', 'desc')  # Default descending order
-
-    if sort_by in ['created_at', 'rating'] and hasattr(Review, sort_by):
-        sort_column = getattr(Review, sort_by)
-        if sort_order == 'desc':
-            sort_column = sort_column.desc()
-        else:
-            sort_column = sort_column.asc()
-        reviews_query = reviews_query.order_by(sort_column)
-
-    return reviews_query
+    # Sorting, with the id as a tie-breaker so that pages are stable
+    _, sort_column, descending = get_review_sort(filters)
+    return reviews_query.order_by(*_sort_order(sort_column, Review.id, descending))
@@ -1,19 +1,8 @@
-import os
 import re
-from datetime import timedelta
 from flask import jsonify
-from dotenv import load_dotenv
 
-load_dotenv()
-
-def revoke_token(redis_db, jti: str):
-    redis_db.setex(
-        jti,
-        timedelta(
-            days=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES_DAYS', '1'))
-        ).total_seconds(),
-        'true'
-    )
+def revoke_token(blocklist, jwt_data: dict):
+    blocklist.revoke(jwt_data['jti'], jwt_data['exp'])
     return jsonify({"message": "Access token revoked"}), 200
 
 
@@ -0,0 +1,88 @@
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import select
+
+from bookstore_api.app.extensions import db
+from .api_helpers import api_response
+
+
+class BatchResults:
+    """
+    Per-item outcome of a batch write, in the order of the request's items.
+    Items are validated and resolved before anything is written, and the ones
+    which passed are then written together in a single transaction.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.results = [None] * len(items)
+
+    def fail(self, index, status_code, message, errors=None):
+        self.results[index] = {'index': index, 'status': status_code, 'message': message}
+        if errors:
+            self.results[index]['errors'] = errors
+
+    def succeed(self, index, status_code, **data):
+        self.results[index] = {'index': index, 'status': status_code, **data}
+
+    def pending(self):
+        """Indexes of the items which have not failed so far."""
+        return [index for index, result in enumerate(self.results) if result is None]
+
+    def response(self, message, status_code=200):
+        """Every result, with a 207 instead of `status_code` when some items failed."""
+        failed = sum(1 for result in self.results if result['status'] >= 400)
+        return api_response({
+            'results': self.results,
+            'succeeded': len(self.results) - failed,
+            'failed': failed
+        }, message=message, status_code=207 if failed else status_code)
+
+
+def get_batch_items(payload):
+    """
+    The items of a batch request body, either a JSON array or an object with
+    an `items` array. Raises ValueError if there are none or more than
+    BATCH_MAX_ITEMS.
+    """
+    items = payload.get('items') if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        raise ValueError('The request body must be a non-empty array of items')
+    max_items = current_app.config['BATCH_MAX_ITEMS']
+    if len(items) > max_items:
+        raise ValueError(f'A batch is limited to {max_items} items')
+    return items
+
+def load_batch_items(batch, schema, id_field=None):
+    """
+    Validate every item of a batch with `schema`, failing the invalid ones.
+    Returns index -> loaded data of the valid items. With `id_field`, each item
+    must also carry that integer field, which is left out of the schema and
+    set on the loaded data.
+    """
+    loaded = {}
+    for index, item in enumerate(batch.items):
+        if not isinstance(item, dict):
+            batch.fail(index, 400, 'Each item must be an object')
+            continue
+        item = dict(item)
+        item_id = item.pop(id_field, None) if id_field else None
+        if id_field and (not isinstance(item_id, int) or isinstance(item_id, bool)):
+            batch.fail(index, 400, f'{id_field} must be an integer')
+            continue
+        try:
+            data = schema.load(item)
+        except ValidationError as e:
+            batch.fail(index, 400, 'Validation failure', e.messages)
+            continue
+        if id_field:
+            data[id_field] = item_id
+        loaded[index] = data
+    return loaded
+
+def existing_ids(model, ids):
+    """The subset of `ids` with a row in the model's table, in one IN query."""
+    ids = {item_id for item_id in ids if item_id is not None}
+    if not ids:
+        return set()
+    return set(db.session.execute(select(model.id).where(model.id.in_(ids))).scalars())
@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+
+from sqlalchemy.orm import joinedload, load_only
+
+from bookstore_api.app.models import Book, Author, BookCategory
+from .api_helpers import search_filter_and_sort_books
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+# Book columns exported, followed by the author and category names
+EXPORT_BOOK_COLUMNS = (
+    'id', 'title', 'isbn', 'description', 'publication_year', 'average_rating', 'review_count',
+    'cover_image_url', 'created_at', 'updated_at'
+)
+EXPORT_COLUMNS = EXPORT_BOOK_COLUMNS + ('author', 'category')
+# Books list filters compared with integer columns
+EXPORT_INT_FILTERS = ('author_id', 'category_id', 'publication_year')
+# Rows read per round trip from the server-side cursor, and serialized per chunk written out
+EXPORT_BATCH_SIZE = 1000
+
+
+def get_export_filters(filters):
+    """
+    The export's books list filters, the integer ones coerced. Raises
+    ValueError for one that isn't an integer, before the export starts
+    streaming rather than halfway through it.
+    """
+    export_filters = dict(filters.items())
+    for name in EXPORT_INT_FILTERS:
+        if export_filters.get(name):
+            try:
+                export_filters[name] = int(export_filters[name])
+            except ValueError as e:
+                raise ValueError(f'{name} must be an integer') from e
+    return export_filters
+
+def export_books_query(filters):
+    """
+    Books matching the same filters as the books list, read through a
+    server-side cursor so memory stays flat whatever the size of the export.
+    """
+    books = Book.query.options(
+        load_only(*(getattr(Book, column) for column in EXPORT_BOOK_COLUMNS)),
+        joinedload(Book.author).load_only(Author.name),
+        joinedload(Book.category).load_only(BookCategory.name),
+    )
+    return search_filter_and_sort_books(books, filters).yield_per(EXPORT_BATCH_SIZE)
+
+def _export_row(book):
+    row = {column: getattr(book, column) for column in EXPORT_BOOK_COLUMNS}
+    row['author'] = book.author.name if book.author else None
+    row['category'] = book.category.name if book.category else None
+    for column in ('created_at', 'updated_at'):
+        if row[column] is not None:
+            row[column] = row[column].isoformat()
+    return row
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == EXPORT_BATCH_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def export_books(filters, export_format='ndjson'):
+    """
+    Generate an export of the books matching the filters, as returned by
+    get_export_filters, as chunks of NDJSON or CSV text.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'export format must be one of {", ".join(EXPORT_FORMATS)}')
+
+    rows = (_export_row(book) for book in export_books_query(filters))
+    if export_format == 'ndjson':
+        for chunk in _chunks(rows):
+            yield ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in chunk)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, EXPORT_COLUMNS)
+    writer.writeheader()
+    for chunk in _chunks(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,98 @@
+import datetime
+import hashlib
+
+from flask import request, make_response
+from sqlalchemy import func, select
+
+from bookstore_api.app.extensions import db
+
+
+def make_etag(*parts):
+    """
+    Build an ETag from the values a representation is derived from (ids,
+    timestamps, counts). The request args are mixed in since they shape the
+    representation too (sparse fieldsets, pagination).
+    """
+    args = sorted(request.args.items(multi=True))
+    return hashlib.sha1(repr((parts, args)).encode()).hexdigest()
+
+def last_modified_of(*timestamps):
+    """Latest of the given timestamps, as an aware datetime, naive timestamps being taken as UTC."""
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    if not timestamps:
+        return None
+    return max(timestamps).replace(tzinfo=datetime.timezone.utc)
+
+def _nested_versions(model, rows, plan):
+    """
+    Latest update and row count of the rows the loader `plan` nests in the
+    representation of the `model` rows matching `rows`, at every depth, as
+    scalar subqueries.
+    """
+    versions = []
+    for name, (_, nested_plan) in plan.items():
+        relationship = getattr(model, name).property
+        (local, remote), = relationship.local_remote_pairs
+        target = relationship.mapper.class_
+        target_rows = remote.in_(select(local).where(rows))
+        versions += [
+            select(func.max(target.updated_at)).where(target_rows).scalar_subquery(),
+            select(func.count(target.id)).where(target_rows).scalar_subquery(),
+        ]
+        versions += _nested_versions(target, target_rows, nested_plan)
+    return versions
+
+def get_collection_validators(name, query, updated_at_column, id_column, loader_plan=None):
+    """
+    Weak ETag and Last-Modified of a filtered collection, from its latest
+    update and its row count, and those of the related rows `loader_plan`
+    nests in its representation, so that renaming an author or adding a
+    review changes the validators of the books listing them.
+    """
+    nested = []
+    if loader_plan:
+        ids = query.order_by(None).with_entities(id_column).cte(f'{name}_ids')
+        nested = _nested_versions(id_column.class_, id_column.in_(select(ids.c[0])), loader_plan)
+    versions = query.order_by(None).with_entities(
+        func.max(updated_at_column), func.count(id_column), *nested).one()
+    last_modified = last_modified_of(versions[0], *versions[2::2])
+    return make_etag(name, *versions), last_modified
+
+def get_entity_validators(name, model, entity_id, loader_plan=None, columns=()):
+    """
+    Strong ETag and Last-Modified of one row of `model`, from its latest update
+    and those of the related rows `loader_plan` nests in its representation,
+    like get_collection_validators, along with the row's values of `columns`
+    read in the same statement. Returns None when there is no such row.
+    """
+    row = model.id == entity_id
+    versions = db.session.execute(
+        select(*columns, model.updated_at, *_nested_versions(model, row, loader_plan or {})).where(row)).first()
+    if versions is None:
+        return None
+    values, versions = tuple(versions[:len(columns)]), versions[len(columns):]
+    return make_etag(name, entity_id, *versions), last_modified_of(versions[0], *versions[1::2]), values
+
+def set_validators(response, etag, last_modified=None, weak=False):
+    """Add ETag and Last-Modified headers to a response."""
+    response.set_etag(etag, weak=weak)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
+
+def not_modified_response(etag, last_modified=None, weak=False):
+    """
+    Return a 304 Not Modified response when the request's validators still
+    match the representation, or None when it has to be sent in full.
+    """
+    if request.if_none_match:
+        matches = request.if_none_match.contains_weak(etag)
+    elif last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have no sub-second precision
+        matches = last_modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        matches = False
+
+    if not matches:
+        return None
+    return set_validators(make_response('', 304), etag, last_modified, weak)
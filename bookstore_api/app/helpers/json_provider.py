@@ -0,0 +1,106 @@
+import datetime
+import decimal
+import json
+import math
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    # Optional, installed with the fast-json extra
+    orjson = None
+
+JSON_PROVIDERS = ('orjson', 'stdlib')
+
+
+def _default(o):
+    # Datetimes as ISO 8601 like orjson, whichever encoder serializes them
+    if isinstance(o, (datetime.date, datetime.datetime)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+def _finite(obj):
+    """The object with NaN and infinities replaced by None, the null orjson writes for them."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+def _orjson_default(o):
+    # What orjson does not encode natively
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider of the app, behind jsonify, api_response and the error
+    handlers. Encodes with orjson when it is installed, with the stdlib json
+    module otherwise, or when JSON_PROVIDER is stdlib.
+
+    Both encoders write the same JSON: UTF-8 text rather than ASCII escapes,
+    NaN and infinities as null, datetimes as ISO 8601 strings, sort_keys and
+    the debug mode's indentation like Flask's default provider. Only the
+    spelling of some floats differs (1e+16 against orjson's 1e16).
+    """
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = orjson is not None and app.config.get('JSON_PROVIDER', 'orjson') == 'orjson'
+
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Options orjson has no equivalent for go to the stdlib encoder
+        if not self.use_orjson or kwargs:
+            return self._stdlib_dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_orjson_default, option=self._orjson_options()).decode()
+
+    def _stdlib_dumps(self, obj, **kwargs):
+        if 'indent' not in kwargs:
+            # Compact like orjson, json.dumps puts spaces after separators otherwise
+            kwargs.setdefault('separators', (',', ':'))
+        if 'allow_nan' in kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return super().dumps(obj, allow_nan=False, **kwargs)
+        except ValueError as e:
+            if 'Out of range float' not in str(e):
+                raise
+            return super().dumps(_finite(obj), allow_nan=False, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if not self.use_orjson or kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # What orjson rejects but json accepts, like NaN or integers over 64 bits
+            return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        # Straight to bytes, without a round trip through str
+        return self._app.response_class(
+            orjson.dumps(obj, default=_orjson_default, option=self._orjson_options(indent)) + b'\n',
+            mimetype=self.mimetype
+        )
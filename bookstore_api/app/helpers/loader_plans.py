@@ -0,0 +1,99 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, noload
+
+from .serializers import get_schema
+
+
+def _split_arg(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+def _only_tree(only):
+    """Turn ('id', 'author.name') into {'id': None, 'author': {'name': None}}; None means everything."""
+    nested = {}
+    for path in only:
+        head, _, rest = path.partition('.')
+        if not rest:
+            nested[head] = None
+        elif nested.get(head, []) is not None:
+            nested.setdefault(head, []).append(rest)
+    return {name: None if paths is None else _only_tree(paths) for name, paths in nested.items()}
+
+def _loader_options(model, plan, tree):
+    mapper = inspect(model)
+    options = []
+
+    if tree is not None:
+        columns = {column.key for column in mapper.column_attrs if column.key in tree}
+        columns.update(mapper.get_property_by_column(column).key for column in mapper.primary_key)
+        # Relationship loads need their local foreign keys on the parent row.
+        for name in plan:
+            if name in tree:
+                columns.update(
+                    mapper.get_property_by_column(column).key
+                    for column in mapper.relationships[name].local_columns
+                )
+        options.append(load_only(*[getattr(model, key) for key in sorted(columns)]))
+
+    for name, (loader, nested_plan) in plan.items():
+        if tree is not None and name not in tree:
+            options.append(noload(getattr(model, name)))
+            continue
+        option = loader(getattr(model, name))
+        nested_options = _loader_options(
+            mapper.relationships[name].mapper.class_, nested_plan, None if tree is None else tree[name])
+        if nested_options:
+            option = option.options(*nested_options)
+        options.append(option)
+    return options
+
+def build_loader_options(model, plan, only=None):
+    """
+    Turn a loader plan into SQLAlchemy loader options for the given model.
+
+    A plan maps relationship names to a (loader, nested_plan) pair, e.g.
+    {'reviews': (selectinload, {'user': (joinedload, {})})}, and should mirror
+    what the resource's schema dumps so that no relationship is lazy loaded.
+    When a marshmallow `only` set is given, columns outside of it are not
+    fetched and relationships outside of it are not loaded at all.
+    """
+    return _loader_options(model, plan, None if only is None else _only_tree(only))
+
+def _invalid_field(schema, path):
+    """Whether the dotted `path` is not a field `schema` dumps, nested fields' own only/exclude applying."""
+    name, _, rest = path.partition('.')
+    field = schema.dump_fields.get(name)
+    if field is None:
+        return True
+    if not rest:
+        return False
+    nested_schema = getattr(field, 'schema', None)
+    return nested_schema is None or _invalid_field(nested_schema, rest)
+
+def get_sparse_fieldset(filters, schema, plan):
+    """
+    Build the schema and `only` set for the ?fields= and ?include= request args.
+
+    `fields` lists the (dotted) fields to dump, `include` the relationships of
+    the loader plan to embed alongside them. When neither is given the schema
+    is returned as is with an `only` of None. Raises ValueError for unknown
+    fields or relationships.
+    """
+    fields = _split_arg(filters.get('fields'))
+    include = _split_arg(filters.get('include'))
+    if not fields and not include:
+        return schema, None
+
+    unknown = [name for name in include if name not in plan]
+    if unknown:
+        raise ValueError(f"Invalid include: {', '.join(unknown)}")
+    if not fields:
+        fields = [name for name in schema.dump_fields if name not in plan]
+
+    # marshmallow intersects a nested path with the nested field's own `only`, dropping
+    # unknown names rather than rejecting them
+    invalid = [path for path in fields if _invalid_field(schema, path)]
+    if invalid:
+        raise ValueError(f"Invalid fields: {', '.join(invalid)}")
+
+    only = tuple(dict.fromkeys(fields + include))
+    return get_schema(schema.__class__, many=schema.many, only=only, exclude=schema.exclude), only
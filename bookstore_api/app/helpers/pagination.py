@@ -0,0 +1,151 @@
+import base64
+import binascii
+import datetime
+import json
+import math
+
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import or_, tuple_, func
+
+from bookstore_api.app.extensions import db
+from .ttl_cache import TTLCache
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+# Query args that do not change which rows a list endpoint matches
+NON_FILTER_ARGS = ('page', 'per_page', 'count', 'cursor', 'fields', 'include')
+
+Page = namedtuple('Page', ['items', 'total', 'pages', 'page', 'per_page'])
+
+DEFAULT_PER_PAGE = 10
+
+count_cache = TTLCache(maxsize=1024)
+
+
+def encode_cursor(sort_by, descending, value, last_id):
+    """Encode the position after a row as an opaque, url-safe cursor token."""
+    if isinstance(value, datetime.datetime):
+        value = {'dt': value.isoformat()}
+    payload = json.dumps({'s': sort_by, 'd': descending, 'k': value, 'i': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Decode a cursor token, raising ValueError if it was not produced by encode_cursor."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        value = payload['k']
+        if isinstance(value, dict):
+            value = datetime.datetime.fromisoformat(value['dt'])
+        return payload['s'], payload['d'], value, int(payload['i'])
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def _is_nullable(column):
+    return any(getattr(col, 'nullable', True) for col in column.property.columns)
+
+def paginate_by_cursor(query, sort, id_column, cursor, per_page):
+    """
+    Keyset pagination: return the page of items after `cursor` and the cursor of the next page.
+
+    `sort` is a (sort_by, column, descending) tuple. Rows are ordered by the sort
+    column with the id as a tie-breaker, so the ordering is stable under
+    concurrent inserts and every page is an index range scan, whatever its depth.
+    An empty cursor starts from the first page; next_cursor is None on the last one.
+    """
+    sort_by, column, descending = sort
+    nullable = _is_nullable(column)
+
+    if cursor:
+        cursor_sort_by, cursor_descending, value, last_id = decode_cursor(cursor)
+        if (cursor_sort_by, cursor_descending) != (sort_by, descending):
+            raise ValueError('Cursor does not match the requested sort order')
+
+        if value is None:
+            # NULL sort keys come last, only the id orders them
+            query = query.filter(column.is_(None), id_column < last_id if descending else id_column > last_id)
+        else:
+            position = tuple_(column, id_column)
+            after = position < tuple_(value, last_id) if descending else position > tuple_(value, last_id)
+            query = query.filter(or_(after, column.is_(None)) if nullable else after)
+
+    sort_column = column.desc() if descending else column.asc()
+    if nullable:
+        sort_column = sort_column.nulls_last()
+    rows = query.add_columns(column).order_by(None).order_by(
+        sort_column, id_column.desc() if descending else id_column.asc()
+    ).limit(per_page + 1).all()
+
+    items = [row[0] for row in rows[:per_page]]
+    next_cursor = None
+    if len(rows) > per_page:
+        last_item, last_value = rows[per_page - 1]
+        next_cursor = encode_cursor(sort_by, descending, last_value, last_item.id)
+    return items, next_cursor
+
+def get_count_mode(filters):
+    """Return the requested count mode (exact by default), or None if it is not supported."""
+    count_mode = filters.get('count', 'exact')
+    return count_mode if count_mode in COUNT_MODES else None
+
+def get_count_cache_key(path, filters):
+    """Normalize a list request into a cache key for its estimated count."""
+    return (path, tuple(sorted(
+        (key, tuple(sorted(filters.getlist(key)))) for key in filters if key not in NON_FILTER_ARGS
+    )))
+
+def _planner_estimate(query):
+    """Row estimate from the Postgres planner, without running the query."""
+    statement = query.order_by(None).enable_eagerloads(False).statement
+    connection = db.session.connection()
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+def estimate_count(query, cache_key):
+    """
+    Estimate the number of rows matched by the query.
+
+    Counts are cached per normalized filter set for CACHE_DEFAULT_TIMEOUT
+    seconds. On Postgres a cache miss asks the planner for its row estimate,
+    elsewhere it falls back to an exact count.
+    """
+    total = count_cache.get(cache_key)
+    if total is None:
+        if db.session.get_bind().dialect.name == 'postgresql':
+            total = _planner_estimate(query)
+        else:
+            total = query.order_by(None).count()
+        count_cache.set(cache_key, total, ttl=current_app.config['CACHE_DEFAULT_TIMEOUT'])
+    return total
+
+def paginate_query(query, page, per_page, count_mode='exact', cache_key=None):
+    """
+    OFFSET/LIMIT pagination with a selectable strategy for the total count.
+
+    `exact` computes the total with a count(*) OVER () window in the same round
+    trip as the page, `estimate` uses estimate_count and `none` skips it, in
+    which case total and pages are None.
+    """
+    page = max(page, 1)
+    if per_page < 1:
+        per_page = DEFAULT_PER_PAGE
+    page_query = query.limit(per_page).offset((page - 1) * per_page)
+
+    total = None
+    if count_mode == 'exact':
+        rows = page_query.add_columns(func.count().over()).all()
+        items = [row[0] for row in rows]
+        if rows:
+            total = rows[0][1]
+        else:
+            # Past the last page the window has no rows to report on
+            total = 0 if page == 1 else query.order_by(None).count()
+    else:
+        items = page_query.all()
+        if count_mode == 'estimate':
+            total = estimate_count(query, cache_key)
+
+    pages = None if total is None else math.ceil(total / per_page)
+    return Page(items, total, pages, page, per_page)
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import re
+import uuid
+
+from sqlalchemy import select, insert, func, text
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Author, Book, BookCategory, Review, Role, User
+from .api_helpers import DEFAULT_PER_PAGE, search_filter_and_sort_books, filter_and_sort_reviews
+
+# SQLite's EXPLAIN QUERY PLAN reads "SCAN <table>" for a pass over a whole table
+# (or a whole index), "SEARCH <table> USING INDEX ..." for an index lookup
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+def _sample(builder):
+    """A value from the data for the queries to look up, the first row's."""
+    return db.session.execute(builder.limit(1)).scalar()
+
+def query_shapes():
+    """
+    (name, table, statement) of the queries the endpoints filter, sort and
+    load relationships with, built by the same helpers, with values taken
+    from the data. Each statement has to reach `table` through an index.
+    """
+    author_id = _sample(select(Book.author_id).order_by(Book.id))
+    category_id = _sample(select(Book.category_id).where(Book.category_id.isnot(None)).order_by(Book.id))
+    latest_year = _sample(select(func.max(Book.publication_year)))
+    book_id = _sample(select(Review.book_id).order_by(Review.id))
+    user_id = _sample(select(Review.user_id).order_by(Review.id))
+    author_name = _sample(select(Author.name).order_by(Author.id))
+    category_name = _sample(select(BookCategory.name).order_by(BookCategory.id))
+    # The last word of the latest title, misspelled
+    title_word = (_sample(select(Book.title).order_by(Book.id.desc())) or '').split()[-1:]
+    if None in (author_id, category_id, latest_year, book_id, user_id) or not title_word:
+        raise ValueError('The database needs books with authors, categories, publication years and reviews')
+    fuzzy_term = title_word[0][:-1] if len(title_word[0]) > 4 else title_word[0]
+
+    def books(filters):
+        return search_filter_and_sort_books(Book.query, filters).limit(DEFAULT_PER_PAGE).statement
+
+    def reviews(filters):
+        return filter_and_sort_reviews(
+            Review.query.filter_by(book_id=book_id), filters).limit(DEFAULT_PER_PAGE).statement
+
+    return [
+        ('books list by author', 'books', books({'author_id': author_id})),
+        ('books list by category', 'books', books({'category_id': category_id})),
+        ('books list by publication year', 'books', books({'publication_year': latest_year})),
+        ('books fuzzy search', 'books', books({'search': fuzzy_term, 'search_mode': 'fuzzy'})),
+        ('book reviews, newest first', 'reviews', reviews({})),
+        ('book reviews by rating', 'reviews', reviews({'sort_by': 'rating', 'sort_order': 'desc'})),
+        ('book reviews with a minimum rating', 'reviews', reviews({'min_rating': 4, 'sort_by': 'rating'})),
+        ("author's books", 'books', select(Book).where(Book.author_id.in_([author_id]))),
+        ("category's books", 'books', select(Book).where(Book.category_id.in_([category_id]))),
+        ("books' reviews", 'reviews', select(Review).where(Review.book_id.in_([book_id]))),
+        ("user's reviews", 'reviews', select(Review).where(Review.user_id == user_id)),
+        ('author by name', 'authors', select(Author).where(func.lower(Author.name) == author_name.lower())),
+        ('category by name', 'book_categories',
+         select(BookCategory).where(func.lower(BookCategory.name) == category_name.lower())),
+    ]
+
+def _walk_postgres_plan(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from _walk_postgres_plan(child)
+
+def scanned_tables(statement):
+    """Tables the database plans to read whole for the statement."""
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # Bound rather than literal parameters, a literal LIKE pattern's % would be taken for one
+        compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return {
+            node['Relation Name'] for node in _walk_postgres_plan(plan[0]['Plan']) if node['Node Type'] == 'Seq Scan'
+        }
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+    if connection.dialect.name == 'sqlite':
+        details = [row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+        return {match.group(1) for match in map(SQLITE_SCAN.match, details) if match}
+    raise NotImplementedError(f'Reading query plans of {connection.dialect.name} is not supported')
+
+def seed_plan_check_catalog(books, reviews_per_book=5):
+    """
+    Synthetic books, authors, categories, users and reviews, sized so the
+    planner prefers an index wherever one applies. The caller rolls back.
+    """
+    tag = uuid.uuid4().hex[:8]
+    authors = max(1, books // 20)
+    categories = max(1, books // 200)
+    users = max(reviews_per_book, books // 20)
+
+    def ids(model, prefix):
+        return db.session.execute(
+            select(model.id).where(model.name.like(f'{prefix}%')).order_by(model.id)).scalars().all()
+
+    db.session.execute(insert(Author), [{'name': f'plan {tag} author {i}'} for i in range(authors)])
+    db.session.execute(insert(BookCategory), [{'name': f'plan {tag} category {i}'} for i in range(categories)])
+    db.session.execute(insert(Role), [{'name': f'plan {tag}'}])
+    role_id = db.session.execute(select(Role.id).where(Role.name == f'plan {tag}')).scalar_one()
+    db.session.execute(insert(User), [
+        {'username': f'plan{tag}{i}', 'email': f'{i}@plan{tag}.test', 'password_hash': '-', 'role_id': role_id}
+        for i in range(users)
+    ])
+    author_ids, category_ids = ids(Author, f'plan {tag} '), ids(BookCategory, f'plan {tag} ')
+    user_ids = db.session.execute(
+        select(User.id).where(User.role_id == role_id).order_by(User.id)).scalars().all()
+
+    db.session.execute(insert(Book), [
+        {
+            # A word of its own for the fuzzy search to look up
+            'title': f'Plan check book {i} {hashlib.sha1(f"{tag}{i}".encode()).hexdigest()[:10]}',
+            'isbn': f'P{tag[:4]}{i:08d}', 'author_id': author_ids[i % authors],
+            'category_id': category_ids[i % categories], 'publication_year': 1950 + i % 75,
+        }
+        for i in range(books)
+    ])
+    book_ids = db.session.execute(
+        select(Book.id).where(Book.isbn.like(f'P{tag[:4]}%')).order_by(Book.id)).scalars().all()
+    db.session.execute(insert(Review), [
+        {'book_id': book_id, 'user_id': user_ids[(i + j) % users], 'rating': 1 + (i + j) % 5, 'comment': '-'}
+        for i, book_id in enumerate(book_ids) for j in range(reviews_per_book)
+    ])
+    db.session.execute(text('ANALYZE'))
+
+def check_query_plans(seed_books=0):
+    """
+    EXPLAIN every query shape, returns (name, table, scanned tables) for each,
+    the query regressed if `table` is among the scanned ones. With
+    `seed_books`, synthetic data is added first and everything is rolled
+    back afterwards.
+    """
+    try:
+        if seed_books:
+            seed_plan_check_catalog(seed_books)
+        return [(name, table, scanned_tables(statement)) for name, table, statement in query_shapes()]
+    finally:
+        db.session.rollback()
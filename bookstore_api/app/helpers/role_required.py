@@ -1,5 +1,5 @@
 from functools import wraps
-from flask_jwt_extended import get_current_user
+from flask_jwt_extended import get_current_user, get_jwt
 
 from bookstore_api.app.helpers import handle_errors
 
@@ -7,7 +7,9 @@ def role_required(*required_roles):
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            if get_current_user().role.name not in required_roles:
+            # Tokens carry the role claim, older ones fall back to the (cached) user
+            role = get_jwt().get('role') or get_current_user().role.name
+            if role not in required_roles:
                 return handle_errors('Unauthorized access', 403)
             return f(*args, **kwargs)
         return wrapper
@@ -0,0 +1,181 @@
+import keyword
+
+from marshmallow import Schema, fields, missing
+from marshmallow.decorators import PRE_DUMP, POST_DUMP
+from marshmallow.utils import get_value, ensure_text_type
+
+from .ttl_cache import TTLCache
+
+# Sparse schemas, one per schema class and options, each keeping its compiled dump.
+# Bounded, since ?fields= lets clients ask for any combination of fields.
+sparse_schemas = TTLCache(maxsize=512, ttl=24 * 3600)
+# Converters returning values of these types unchanged
+NATIVE_TYPES = {int: int, float: float, ensure_text_type: str}
+
+
+def schema_key(schema_class, many=False, only=None, exclude=()):
+    """What makes two schema instances dump alike."""
+    return schema_class, bool(many), None if only is None else tuple(only), tuple(sorted(exclude))
+
+def get_schema(schema_class, many=False, only=None, exclude=()):
+    """A schema instance built with these options, shared between requests."""
+    key = schema_key(schema_class, many, only, exclude)
+    schema = sparse_schemas.get(key)
+    if schema is None:
+        schema = schema_class(many=many, only=only, exclude=exclude)
+        sparse_schemas.set(key, schema)
+    return schema
+
+def _field_converter(field):
+    """The formatting of a field's non-None values, or None if the field has to serialize itself."""
+    field_class = type(field)
+    if (
+        field_class.serialize is not fields.Field.serialize
+        or field_class.get_value is not fields.Field.get_value
+        or not field._CHECK_ATTRIBUTE
+        or (field.attribute and '.' in field.attribute)
+    ):
+        return None
+    if isinstance(field, fields.Number) and field_class._serialize is fields.Number._serialize:
+        if field.as_string or field_class._format_num is not fields.Number._format_num:
+            return None
+        return field.num_type
+    if field_class._serialize is fields.String._serialize:
+        return ensure_text_type
+    if field_class._serialize is fields.DateTime._serialize and field_class is fields.DateTime:
+        return field.SERIALIZATION_FUNCS.get(field.format or field.DEFAULT_FORMAT)
+    if field_class is fields.Nested:
+        nested_dump = None
+
+        # Compiled on first use, schemas may nest each other
+        def dump_nested(value):
+            nonlocal nested_dump
+            if nested_dump is None:
+                nested_dump = _nested_dump(field)
+            return nested_dump(value)
+        return dump_nested
+    return None
+
+def _nested_dump(field):
+    many = field.schema.many or field.many
+    dump = compile_dump(field.schema)
+    dump_one = getattr(dump, 'dump_one', None)
+    if dump_one is None:
+        return lambda value: dump(value, many=many)
+    if many:
+        return lambda value: [dump_one(item) for item in value]
+    return dump_one
+
+def _generate_dump_one(plan, namespace):
+    """
+    Straight-line source of a dump of one object, with the plan's keys,
+    attributes, defaults, converters and fields bound in `namespace` by
+    position rather than written into the source. Objects supporting []
+    go to dump_mapping.
+    """
+    lines = [
+        'def dump_one(obj):',
+        "    if hasattr(obj, '__getitem__'):",
+        '        return dump_mapping(obj)',
+        '    ret = dict_class()',
+    ]
+    for i, (key, name, attribute, default, convert, field) in enumerate(plan):
+        namespace.update({f'k{i}': key, f'n{i}': name, f'a{i}': attribute, f'd{i}': default,
+                          f'c{i}': convert, f'f{i}': field})
+        if convert is None:
+            lines += [
+                f'    value = f{i}.serialize(n{i}, obj, accessor=get_attribute)',
+                '    if value is not missing:',
+                f'        ret[k{i}] = value',
+            ]
+            continue
+        if attribute.isidentifier() and not keyword.iskeyword(attribute):
+            # Plain attribute access is quicker than getattr with a default
+            lines += [
+                '    try:',
+                f'        value = obj.{attribute}',
+                '    except AttributeError:',
+                '        value = missing',
+            ]
+        else:
+            lines.append(f'    value = getattr(obj, a{i}, missing)')
+        if default is not missing:
+            lines += [
+                '    if value is missing:',
+                f'        value = d{i}() if callable(d{i}) else d{i}',
+            ]
+        formatted = f'None if value is None else c{i}(value)'
+        if convert in NATIVE_TYPES:
+            # Values already of the type come out of the conversion unchanged
+            namespace[f't{i}'] = NATIVE_TYPES[convert]
+            formatted = f'value if value.__class__ is t{i} else {formatted}'
+        lines += [
+            '    if value is not missing:',
+            f'        ret[k{i}] = {formatted}',
+        ]
+    lines.append('    return ret')
+    return '\n'.join(lines)
+
+def _compile(schema):
+    schema_class = type(schema)
+    if (
+        schema._hooks[PRE_DUMP] or schema._hooks[POST_DUMP]
+        or schema_class.get_attribute is not Schema.get_attribute
+        or schema_class._serialize is not Schema._serialize
+    ):
+        return schema.dump
+
+    plan = []
+    for name, field in schema.dump_fields.items():
+        key = field.data_key if field.data_key is not None else name
+        plan.append((key, name, field.attribute or name, field.dump_default, _field_converter(field), field))
+    dict_class = schema.dict_class
+    get_attribute = schema.get_attribute
+
+    def dump_mapping(obj):
+        # Read the way marshmallow reads objects supporting [], key first
+        ret = dict_class()
+        for key, name, attribute, default, convert, field in plan:
+            if convert is None:
+                value = field.serialize(name, obj, accessor=get_attribute)
+                if value is not missing:
+                    ret[key] = value
+                continue
+            value = get_value(obj, attribute, missing)
+            if value is missing:
+                if default is missing:
+                    continue
+                value = default() if callable(default) else default
+            ret[key] = None if value is None else convert(value)
+        return ret
+
+    namespace = {
+        'dict_class': dict_class, 'get_attribute': get_attribute, 'missing': missing, 'dump_mapping': dump_mapping
+    }
+    exec(_generate_dump_one(plan, namespace), namespace) # pylint: disable=exec-used
+    dump_one = namespace['dump_one']
+
+    def dump(obj, many=None):
+        many = schema.many if many is None else bool(many)
+        if many and obj is not None:
+            return [dump_one(item) for item in obj]
+        return dump_one(obj)
+    dump.dump_one = dump_one
+    return dump
+
+def compile_dump(schema):
+    """
+    A dump function equivalent to `schema.dump`, specialized for the schema's
+    fields and its only/exclude options: a function generated for the
+    schema reads and formats each value without marshmallow's per-field
+    dispatch, nested schemas are compiled too. Fields, schemas and hooks it
+    cannot specialize go through marshmallow, so the output is always the
+    same as `schema.dump`.
+    Compiled once per schema instance: marshmallow keeps only the top-level
+    names in `schema.only`, the dotted ones live on its nested fields, so
+    two schemas with the same options may still dump different nested fields.
+    """
+    dump = schema.__dict__.get('_compiled_dump')
+    if dump is None:
+        dump = schema._compiled_dump = _compile(schema)
+    return dump
@@ -4,6 +4,7 @@ from .review import Review
 from .user import User
 from .role import Role
 from .book_category import BookCategory
+from .storage_deletion import StorageDeletion
 
 __all__ = [
     'Author',
@@ -11,5 +12,6 @@ __all__ = [
     'Review',
     'User',
     'Role',
-    'BookCategory'
+    'BookCategory',
+    'StorageDeletion',
 ]
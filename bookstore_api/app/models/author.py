@@ -1,7 +1,7 @@
 import datetime
 
 from typing import List, TYPE_CHECKING
-from sqlalchemy import String, DateTime, Text
+from sqlalchemy import String, DateTime, Text, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .mixins import TransactionMixin
@@ -26,3 +26,11 @@ class Author(TransactionMixin):
 
     def __repr__(self):
         return f'<Author {self.name}>'
+
+
+# Case-insensitive name lookups and prefix searches, text_pattern_ops lets PostgreSQL
+# use it for LIKE 'prefix%' whatever the collation
+Index(
+    'ix_authors_lower_name', func.lower(Author.name).label('lower_name'),
+    postgresql_ops={'lower_name': 'text_pattern_ops'}
+)
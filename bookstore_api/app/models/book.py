@@ -1,9 +1,10 @@
 import datetime
 
 from typing import List, TYPE_CHECKING
-from sqlalchemy import String, DateTime, Text, ForeignKey
+from sqlalchemy import String, DateTime, Text, Float, ForeignKey, select, update, func, case
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from bookstore_api.app.extensions import db
 from .mixins import TransactionMixin
 
 # Use TYPE_CHECKING block to import models ONLY during static analysis
@@ -11,6 +12,12 @@ from .mixins import TransactionMixin
 if TYPE_CHECKING:
     from . import Review, Author, BookCategory
 
+def _as_ratings(value):
+    if value is None:
+        return []
+    return value if isinstance(value, (list, tuple)) else [value]
+
+
 class Book(TransactionMixin):
     """Book model representing a book in the bookstore."""
     __tablename__ = "books"
@@ -20,13 +27,26 @@ class Book(TransactionMixin):
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     isbn: Mapped[str] = mapped_column(String(13), unique=True, nullable=False)
     cover_image_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
-    cover_image_s3_key: Mapped[str | None] = mapped_column(String(500), nullable=True)
-    publication_year: Mapped[int | None] = mapped_column(nullable=True)
+    # Content-addressed, books with the same cover share the object. Indexed
+    # since counting the books using a key decides when it can be deleted.
+    cover_image_s3_key: Mapped[str | None] = mapped_column(String(500), nullable=True, index=True)
+    # pending while the cover is uploaded in the background, then ready or failed
+    cover_status: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    publication_year: Mapped[int | None] = mapped_column(nullable=True, index=True)
+
+    # Review aggregates, kept up to date by adjust_rating_aggregates
+    average_rating: Mapped[float | None] = mapped_column(Float, nullable=True, index=True)
+    review_count: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    rating_1_count: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    rating_2_count: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    rating_3_count: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    rating_4_count: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    rating_5_count: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
 
-    # Foreign keys
-    author_id: Mapped[int] = mapped_column(ForeignKey('authors.id'), nullable=False)
+    # Foreign keys, indexed for the list filters and the author/category books loads
+    author_id: Mapped[int] = mapped_column(ForeignKey('authors.id'), nullable=False, index=True)
     category_id: Mapped[int] = mapped_column(
-        ForeignKey('book_categories.id', ondelete='SET NULL'), nullable=True)
+        ForeignKey('book_categories.id', ondelete='SET NULL'), nullable=True, index=True)
 
     author: Mapped['Author'] = relationship('Author', back_populates='books')
     category: Mapped['BookCategory'] = relationship('BookCategory', back_populates='books')
@@ -38,3 +58,48 @@ class Book(TransactionMixin):
 
     def __repr__(self):
         return f'<Book {self.title}>'
+
+    @classmethod
+    def adjust_rating_aggregates(cls, book_id, added=None, removed=None):
+        """
+        Apply a review rating being added, removed or changed (both) to the book's
+        aggregates with a single atomic UPDATE. The caller commits. `added` and
+        `removed` may also be lists of ratings, to apply several reviews at once.
+        """
+        star_deltas = {star: 0 for star in range(1, 6)}
+        for rating in _as_ratings(added):
+            star_deltas[rating] += 1
+        for rating in _as_ratings(removed):
+            star_deltas[rating] -= 1
+
+        count_delta = sum(star_deltas.values())
+        sum_delta = sum(star * delta for star, delta in star_deltas.items())
+        # The right-hand side of an UPDATE reads the values from before it
+        new_count = cls.review_count + count_delta
+        new_sum = sum(star * getattr(cls, f'rating_{star}_count') for star in range(1, 6)) + sum_delta
+
+        values = {
+            f'rating_{star}_count': getattr(cls, f'rating_{star}_count') + delta
+            for star, delta in star_deltas.items() if delta
+        }
+        values['review_count'] = new_count
+        values['average_rating'] = case((new_count > 0, new_sum * 1.0 / new_count), else_=None)
+        db.session.execute(
+            update(cls).where(cls.id == book_id).values(**values).execution_options(synchronize_session=False)
+        )
+
+    @classmethod
+    def recompute_rating_aggregates(cls):
+        """Recompute the review aggregates of every book from the reviews table. The caller commits."""
+        from .review import Review # pylint: disable=import-outside-toplevel
+
+        def count_reviews(*criteria):
+            return select(func.count(Review.id)).where(Review.book_id == cls.id, *criteria).scalar_subquery()
+
+        values = {f'rating_{star}_count': count_reviews(Review.rating == star) for star in range(1, 6)}
+        values['review_count'] = count_reviews()
+        values['average_rating'] = select(func.avg(Review.rating)).where(
+            Review.book_id == cls.id).scalar_subquery()
+        # Not an edit of the book itself, keep updated_at as it is
+        values['updated_at'] = cls.updated_at
+        db.session.execute(update(cls).values(**values).execution_options(synchronize_session=False))
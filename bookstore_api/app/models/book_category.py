@@ -1,7 +1,7 @@
 import datetime
 
 from typing import List, TYPE_CHECKING
-from sqlalchemy import String, DateTime, Text
+from sqlalchemy import String, DateTime, Text, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .mixins import TransactionMixin
@@ -26,3 +26,11 @@ class BookCategory(TransactionMixin):
 
     def __repr__(self):
         return f'<BookCategory {self.name}>'
+
+
+# Case-insensitive name lookups and prefix searches, text_pattern_ops lets PostgreSQL
+# use it for LIKE 'prefix%' whatever the collation
+Index(
+    'ix_book_categories_lower_name', func.lower(BookCategory.name).label('lower_name'),
+    postgresql_ops={'lower_name': 'text_pattern_ops'}
+)
@@ -2,7 +2,7 @@ import datetime
 
 from typing import TYPE_CHECKING
 from sqlalchemy import (
-    Integer, DateTime, Text, CheckConstraint, ForeignKey, UniqueConstraint
+    Integer, DateTime, Text, CheckConstraint, ForeignKey, UniqueConstraint, Index
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -20,8 +20,9 @@ class Review(TransactionMixin):
     id: Mapped[int] = mapped_column(primary_key=True)
     rating: Mapped[int] = mapped_column(Integer, nullable=False)
     comment: Mapped[str | None] = mapped_column(Text, nullable=True)
-    # Foreign key to User & Book
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False)
+    # Foreign key to User & Book. book_id leads the unique constraint's index and the
+    # sorting indexes below, user_id needs its own
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), nullable=False, index=True)
     book_id: Mapped[int] = mapped_column(ForeignKey('books.id'), nullable=False)
 
     user: Mapped['User'] = relationship('User', back_populates='reviews')
@@ -35,6 +36,9 @@ class Review(TransactionMixin):
     __table_args__ = (
         CheckConstraint('rating >= 1 AND rating <= 5', name='ck_rating_range'),
         UniqueConstraint('book_id', 'user_id', name='_user_book_review_uc'),
+        # A book's reviews in the orders filter_and_sort_reviews offers
+        Index('ix_reviews_book_id_created_at', 'book_id', 'created_at'),
+        Index('ix_reviews_book_id_rating', 'book_id', 'rating'),
     )
 
     def __repr__(self):
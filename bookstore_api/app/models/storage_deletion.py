@@ -0,0 +1,25 @@
+import datetime
+
+from sqlalchemy import String, DateTime, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .mixins import TransactionMixin
+
+class StorageDeletion(TransactionMixin):
+    """
+    Outbox of storage objects to delete, written in the same transaction as
+    the change that stopped using them and drained in batches in the background.
+    """
+    __tablename__ = "storage_deletions"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    key: Mapped[str] = mapped_column(String(500), nullable=False)
+    attempts: Mapped[int] = mapped_column(default=0, server_default='0', nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    next_attempt_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(), default=datetime.datetime.now, nullable=False, index=True)
+
+    created_at: Mapped[datetime.datetime] = mapped_column(DateTime(), default=datetime.datetime.now)
+
+    def __repr__(self):
+        return f'<StorageDeletion {self.key}>'
@@ -1,8 +1,8 @@
 from flask import Blueprint, request, current_app, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from marshmallow import ValidationError
+from redis import RedisError
 from werkzeug.security import generate_password_hash, check_password_hash
-import redis
 
 from bookstore_api.app.helpers import (
     handle_errors, api_response, RoleType, revoke_token, is_valid_email_format, is_strong_password
@@ -10,17 +10,15 @@ from bookstore_api.app.helpers import (
 from bookstore_api.app.schemas.user_schema import UserSchema
 from bookstore_api.app.models import User, Role
 from bookstore_api.app.extensions import jwt
-
-### Initialize Redis connection
-redis_db = redis.StrictRedis(host='localhost', port=6379, db=0, decode_responses=True)
+from bookstore_api.app.services import identity_cache, token_blocklist
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+user_schema = UserSchema()
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     # handle user registration
-    user_schema = UserSchema()
-
     try:
         validated_data = user_schema.load(request.get_json(silent=True))
     except ValidationError as e:
@@ -84,7 +82,7 @@ def login():
     return api_response(
         data={
             'access_token': create_access_token(identity=str(user.id)),
-            'user': UserSchema().dump(user)
+            'user': user_schema.dump(user)
         },
         message="Login successful",
         status_code=200
@@ -93,17 +91,24 @@ def login():
 @auth_bp.route("/logout", methods=["DELETE"])
 @jwt_required(verify_type=False)
 def logout():
-    return revoke_token(redis_db, get_jwt()["jti"])
+    return revoke_token(token_blocklist, get_jwt())
 
 @auth_bp.route("/revoke_access", methods=["DELETE"])
 @jwt_required()
 def revoke_access_token():
-    return revoke_token(redis_db, get_jwt()["jti"])
+    return revoke_token(token_blocklist, get_jwt())
 
 @auth_bp.route("/revoke_refresh", methods=["DELETE"])
 @jwt_required(refresh=True)
 def revoke_refresh_token():
-    return revoke_token(redis_db, get_jwt()["jti"])
+    return revoke_token(token_blocklist, get_jwt())
+
+@auth_bp.route("/revoke_all", methods=["DELETE"])
+@jwt_required(verify_type=False)
+def revoke_all_tokens():
+    # Log the user out everywhere, every token issued to them so far stops working
+    token_blocklist.revoke_all(get_jwt_identity())
+    return jsonify({"message": "All tokens revoked"}), 200
 
 @auth_bp.route("/refresh", methods=["POST"])
 @jwt_required(refresh=True)
@@ -114,8 +119,7 @@ def refresh():
 
 @jwt.token_in_blocklist_loader
 def check_if_token_is_revoked(_, jwt_payload: dict):
-    jti = jwt_payload["jti"]
-    return redis_db.get(jti) is not None
+    return token_blocklist.is_revoked(jwt_payload)
 
 @jwt.user_lookup_loader
 def user_lookup_callback(_, jwt_data):
@@ -123,4 +127,19 @@ def user_lookup_callback(_, jwt_data):
     # The identity is stored under the key defined by JWT_IDENTITY_CLAIM (default: 'sub')
     identity = jwt_data["sub"]
 
-    return User.query.get(int(identity))
+    return identity_cache.get(identity)
+
+@jwt.additional_claims_loader
+def add_claims(identity):
+    # The role lets role_required authorize from the token alone, a role
+    # change only applies to tokens issued after it. The generation is
+    # what revoke_all invalidates, tokens aren't issued without it.
+    try:
+        claims = {'gen': token_blocklist.get_generation(identity)}
+    except RedisError as e:
+        current_app.logger.error(f"Token blocklist unavailable, can't issue a token: {e}")
+        return handle_errors('token service unavailable, please try again later', 503, e)
+    user = identity_cache.get(identity)
+    if user:
+        claims['role'] = user.role.name
+    return claims
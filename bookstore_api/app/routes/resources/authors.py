@@ -2,23 +2,56 @@ from flask import current_app, request
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required
 from marshmallow import ValidationError
-
-from bookstore_api.app.helpers import role_required, RoleType, api_response, handle_errors
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
+
+from bookstore_api.app.helpers import (
+    role_required, RoleType, api_response, handle_errors, build_loader_options,
+    get_sparse_fieldset, get_collection_validators, get_entity_validators, not_modified_response, set_validators,
+    compile_dump
+)
 from bookstore_api.app.schemas import AuthorSchema
 from bookstore_api.app.models import Author
+from bookstore_api.app.services import response_cache
 
 author_schema = AuthorSchema()
 authors_schema = AuthorSchema(many=True)
+author_update_schema = AuthorSchema(partial=True, exclude=['books'])
+
+# Everything AuthorSchema nests, a write to any of them changes the cached authors
+AUTHOR_CACHE_TAGS = ['authors', 'books', 'categories', 'reviews']
+
+# AuthorSchema dumps books -> (category, reviews -> user), see BookSchema.
+AUTHOR_LOADER_PLAN = {
+    'books': (selectinload, {
+        'category': (joinedload, {}),
+        'reviews': (selectinload, {'user': (joinedload, {})}),
+    }),
+}
 
 
 class AuthorListResource(Resource):
     method_decorators = [role_required(RoleType.ADMIN.value), jwt_required()]
+    loader_plan = AUTHOR_LOADER_PLAN
 
+    @response_cache.cached(tags=AUTHOR_CACHE_TAGS)
     def get(self):
         try:
-            return api_response({
-                'authors': authors_schema.dump(Author.query.all())
-            }, message='Authors fetched successfully', status_code=200)
+            schema, only = get_sparse_fieldset(request.args, authors_schema, self.loader_plan)
+        except ValueError as e:
+            return handle_errors('Invalid fields or include parameters', 400, e)
+
+        etag, last_modified = get_collection_validators(
+            'authors', Author.query, Author.updated_at, Author.id, self.loader_plan)
+        not_modified = not_modified_response(etag, last_modified, weak=True)
+        if not_modified is not None:
+            return not_modified
+
+        try:
+            return set_validators(api_response({
+                'authors': compile_dump(schema)(
+                    Author.query.options(*build_loader_options(Author, self.loader_plan, only)).all())
+            }, message='Authors fetched successfully', status_code=200), etag, last_modified, weak=True)
         except Exception as e:
             current_app.logger.error(f"Error fetching authors: {e}")
             return handle_errors('Error fetching authors', 500, e)
@@ -31,7 +64,8 @@ class AuthorListResource(Resource):
             current_app.logger.error(f"Validation error occured during author creation: {e}")
             return handle_errors('author creation failure', 400, e)
 
-        author_exists = Author.query.filter_by(name=validated_data['name'].lower()).one_or_none()
+        author_exists = Author.query.filter(
+            func.lower(Author.name) == validated_data['name'].lower()).first()
         if author_exists:
             return handle_errors(f'author with name ({validated_data["name"]}) already exists', 400)
 
@@ -42,27 +76,45 @@ class AuthorListResource(Resource):
         except Exception as e:
             current_app.logger.error(f"Error creating author: {e}")
             return handle_errors('Error creating author', 500, e)
+        response_cache.invalidate('authors')
 
         return api_response({
-            'author': author_schema.dump(new_author)
+            'author': compile_dump(author_schema)(new_author)
         }, message='Author created successfully', status_code=201)
 
 
 class AuthorResource(Resource):
     method_decorators = [role_required(RoleType.ADMIN.value), jwt_required()]
+    loader_plan = AUTHOR_LOADER_PLAN
 
+    @response_cache.cached(tags=AUTHOR_CACHE_TAGS)
     def get(self, author_id):
-        author = Author.query.get_or_404(author_id, description='Author not found')
-
-        return api_response({
-            'author': author_schema.dump(author)
-        }, message='Author fetched successfully', status_code=200)
+        try:
+            schema, only = get_sparse_fieldset(request.args, author_schema, self.loader_plan)
+        except ValueError as e:
+            return handle_errors('Invalid fields or include parameters', 400, e)
+
+        # The author's books, with their category and reviews, are nested in the representation
+        validators = get_entity_validators('author', Author, author_id, self.loader_plan)
+        if validators is None:
+            return handle_errors('Author not found', 404)
+        etag, last_modified, _ = validators
+        not_modified = not_modified_response(etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        author = Author.query.options(*build_loader_options(Author, self.loader_plan, only)).get_or_404(
+            author_id, description='Author not found')
+
+        return set_validators(api_response({
+            'author': compile_dump(schema)(author)
+        }, message='Author fetched successfully', status_code=200), etag, last_modified)
 
     def put(self, author_id):
         author_data = request.get_json(silent=True)
 
         try:
-            validated_data = AuthorSchema(partial=True, exclude=['books']).load(author_data)
+            validated_data = author_update_schema.load(author_data)
         except ValidationError as e:
             current_app.logger.error(f"Validation error occured during author update: {e}")
             return handle_errors('author update failure', 400, e)
@@ -77,9 +129,10 @@ class AuthorResource(Resource):
         except Exception as e:
             current_app.logger.error(f"Error updating author: {e}")
             return handle_errors('Error updating author', 500, e)
+        response_cache.invalidate('authors')
 
         return api_response({
-            'author': author_schema.dump(author)
+            'author': compile_dump(author_schema)(author)
         }, message='Author updated successfully', status_code=200)
 
     def delete(self, author_id):
@@ -90,5 +143,6 @@ class AuthorResource(Resource):
         except Exception as e:
             current_app.logger.error(f"Error deleting author: {e}")
             return handle_errors('Error deleting author', 500, e)
+        response_cache.invalidate('authors')
 
         return api_response({}, message='Author deleted successfully', status_code=204)
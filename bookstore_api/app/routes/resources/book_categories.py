@@ -2,24 +2,46 @@ from flask import request, current_app
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required
 from marshmallow import ValidationError
+from sqlalchemy import func
 
-from bookstore_api.app.helpers import role_required, RoleType, handle_errors, api_response
+from bookstore_api.app.helpers import (
+    role_required, RoleType, handle_errors, api_response, build_loader_options, get_sparse_fieldset,
+    get_collection_validators, not_modified_response, set_validators, compile_dump
+)
 from bookstore_api.app.schemas import BookCategorySchema
 from bookstore_api.app.models import BookCategory
+from bookstore_api.app.services import response_cache
 
 category_schema = BookCategorySchema(exclude=['books'])
 categories_schema = BookCategorySchema(many=True, exclude=['books'])
+category_update_schema = BookCategorySchema(partial=True, exclude=['books'])
 
 
 class BookCategoryListResource(Resource):
     method_decorators = [role_required(RoleType.ADMIN.value), jwt_required()]
+    # The schemas exclude books, so there is nothing to load eagerly
+    loader_plan = {}
 
+    @response_cache.cached(tags=['categories'])
     def get(self):
         """Fetching all book categories"""
         try:
-            return api_response({
-                'book_categories': categories_schema.dump(BookCategory.query.order_by(BookCategory.name).all())
-            }, message='Book categories fetched successfully', status_code=200)
+            schema, only = get_sparse_fieldset(request.args, categories_schema, self.loader_plan)
+        except ValueError as e:
+            return handle_errors('Invalid fields or include parameters', 400, e)
+
+        etag, last_modified = get_collection_validators(
+            'book_categories', BookCategory.query, BookCategory.updated_at, BookCategory.id)
+        not_modified = not_modified_response(etag, last_modified, weak=True)
+        if not_modified is not None:
+            return not_modified
+
+        try:
+            categories = BookCategory.query.options(
+                *build_loader_options(BookCategory, self.loader_plan, only)).order_by(BookCategory.name)
+            return set_validators(api_response({
+                'book_categories': compile_dump(schema)(categories.all())
+            }, message='Book categories fetched successfully', status_code=200), etag, last_modified, weak=True)
         except Exception as e:
             current_app.logger.error(f"Error fetching book categories: {e}")
             return handle_errors('Error fetching book categories', 500, e)
@@ -34,7 +56,8 @@ class BookCategoryListResource(Resource):
             current_app.logger.error(f"Validation error occured during book category creation: {e}")
             return handle_errors('book category creation failure', 400, e)
 
-        category_exists = BookCategory.query.filter_by(name=validated_data['name'].lower()).one_or_none()
+        category_exists = BookCategory.query.filter(
+            func.lower(BookCategory.name) == validated_data['name'].lower()).first()
         if category_exists:
             return handle_errors(f'book category with name ({validated_data["name"]}) already exists', 400)
 
@@ -45,9 +68,10 @@ class BookCategoryListResource(Resource):
         except Exception as e:
             current_app.logger.error(f"Error creating book category: {e}")
             return handle_errors('Error creating book category', 500, e)
+        response_cache.invalidate('categories')
 
         return api_response({
-            'book_category': category_schema.dump(new_category)
+            'book_category': compile_dump(category_schema)(new_category)
         }, message='Book category created successfully', status_code=201)
 
 
@@ -57,7 +81,7 @@ class BookCategoryResource(Resource):
     def put(self, category_id):
         """Updating a book category by ID"""
         try:
-            validated_data = BookCategorySchema(partial=True, exclude=['books']).load(request.get_json(silent=True))
+            validated_data = category_update_schema.load(request.get_json(silent=True))
         except ValidationError as e:
             current_app.logger.error(f"Validation error occured during book category ({category_id}) update: {e}")
             return handle_errors('book category update failure', 400, e)
@@ -71,9 +95,10 @@ class BookCategoryResource(Resource):
         except Exception as e:
             current_app.logger.error(f"Error updating book category with id {category_id}: {e}")
             return handle_errors('Error updating book category', 500, e)
+        response_cache.invalidate('categories')
 
         return api_response({
-            'book_category': category_schema.dump(category)
+            'book_category': compile_dump(category_schema)(category)
         }, message='Book category updated successfully', status_code=200)
 
     def delete(self, category_id):
@@ -85,5 +110,6 @@ class BookCategoryResource(Resource):
         except Exception as e:
             current_app.logger.error(f"Error deleting book category with id {category_id}: {e}")
             return handle_errors('Error deleting book category', 500, e)
+        response_cache.invalidate('categories')
 
         return api_response({}, message='Book category deleted successfully', status_code=204)
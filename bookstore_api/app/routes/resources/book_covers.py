@@ -0,0 +1,116 @@
+import mimetypes
+import uuid
+
+from flask import request, current_app
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from marshmallow import ValidationError
+
+from bookstore_api.app.helpers import role_required, RoleType, handle_errors, api_response, compile_dump
+from bookstore_api.app.schemas import BookSchema, CoverUploadRequestSchema, CoverUploadConfirmSchema
+from bookstore_api.app.models import Book
+from bookstore_api.app.extensions import db
+from bookstore_api.app.services import (
+    response_cache, schedule_deletion, create_presigned_upload, get_s3_object_metadata, get_s3_public_url,
+    COVER_READY
+)
+
+book_schema = BookSchema()
+upload_request_schema = CoverUploadRequestSchema()
+upload_confirm_schema = CoverUploadConfirmSchema()
+
+
+def cover_key_prefix(book_id):
+    """Keys handed out for a book's presigned uploads, so a confirm can only claim its own."""
+    return f'covers/{book_id}/'
+
+
+class BookCoverUploadResource(Resource):
+    """Presigned uploads: the client sends the cover straight to S3, the API never sees its bytes."""
+    method_decorators = [role_required(RoleType.ADMIN.value), jwt_required()]
+
+    def post(self, book_id):
+        """Creating a presigned POST for uploading a book's cover"""
+        try:
+            validated_data = upload_request_schema.load(request.get_json(silent=True))
+        except ValidationError as e:
+            return handle_errors('cover upload request failure', 400, e)
+
+        if current_app.config['COVER_UPLOAD_BACKEND'] != 's3':
+            return handle_errors('Presigned cover uploads need the s3 cover upload backend', 501)
+
+        content_type = validated_data['content_type']
+        if content_type not in current_app.config['COVER_ALLOWED_CONTENT_TYPES']:
+            return handle_errors(f'Unsupported cover image content type {content_type}', 400)
+        max_size = current_app.config['COVER_MAX_BYTES']
+        if validated_data.get('content_length', 0) > max_size:
+            return handle_errors(f'Cover images are limited to {max_size} bytes', 413)
+
+        Book.query.get_or_404(book_id, description='Book not found')
+
+        extension = mimetypes.guess_extension(content_type) or ''
+        key = f'{cover_key_prefix(book_id)}{uuid.uuid4()}{extension}'
+        expires_in = current_app.config['COVER_PRESIGNED_EXPIRES']
+        try:
+            upload = create_presigned_upload(
+                key, content_type, validated_data.get('content_length', max_size), expires_in)
+        except Exception as e:
+            current_app.logger.error(f"Error creating presigned cover upload for book {book_id}: {e}")
+            return handle_errors('Error creating cover upload', 500, e)
+
+        return api_response({
+            'upload': upload,
+            'key': key,
+            'expires_in': expires_in
+        }, message='Cover upload created successfully', status_code=201)
+
+
+class BookCoverConfirmResource(Resource):
+    method_decorators = [role_required(RoleType.ADMIN.value), jwt_required()]
+
+    def post(self, book_id):
+        """Recording a cover uploaded through a presigned POST on its book"""
+        try:
+            validated_data = upload_confirm_schema.load(request.get_json(silent=True))
+        except ValidationError as e:
+            return handle_errors('cover upload confirmation failure', 400, e)
+
+        book = Book.query.get_or_404(book_id, description='Book not found')
+        key = validated_data['key']
+        if not key.startswith(cover_key_prefix(book_id)):
+            return handle_errors('This key was not issued for this book', 400)
+        if book.cover_image_s3_key == key:
+            return api_response({
+                'book': compile_dump(book_schema)(book)
+            }, message='Book cover updated successfully', status_code=200)
+
+        # Only the object's metadata, the bytes stay in S3
+        try:
+            metadata = get_s3_object_metadata(key)
+        except Exception as e:
+            current_app.logger.error(f"Error checking uploaded cover {key}: {e}")
+            return handle_errors('Error checking uploaded cover', 502, e)
+        if metadata is None:
+            return handle_errors('The cover has not been uploaded', 400)
+        if (
+            metadata['size'] > current_app.config['COVER_MAX_BYTES']
+            or metadata['content_type'] not in current_app.config['COVER_ALLOWED_CONTENT_TYPES']
+        ):
+            schedule_deletion(key)
+            db.session.commit()
+            return handle_errors('The uploaded cover is not an accepted image', 400)
+
+        schedule_deletion(book.cover_image_s3_key)
+        book.cover_image_s3_key = key
+        book.cover_image_url = get_s3_public_url(key)
+        book.cover_status = COVER_READY
+        try:
+            book.save()
+        except Exception as e:
+            current_app.logger.error(f"Error updating book {book_id} with its uploaded cover: {e}")
+            return handle_errors('Error updating book cover', 500, e)
+        response_cache.invalidate('books')
+
+        return api_response({
+            'book': compile_dump(book_schema)(book)
+        }, message='Book cover updated successfully', status_code=200)
@@ -1,42 +1,99 @@
-from flask import request, current_app
+from flask import request, current_app, Response, stream_with_context
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required
 from marshmallow import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
 
 from bookstore_api.app.helpers import (
     role_required, RoleType, handle_errors, api_response,
-    search_filter_and_sort_books, get_page_filters
+    search_filter_and_sort_books, get_page_filters, build_loader_options,
+    get_sparse_fieldset, get_book_sort, paginate_by_cursor, paginate_query, get_count_mode,
+    get_count_cache_key, get_collection_validators, get_entity_validators, not_modified_response, set_validators,
+    export_books, get_export_filters, EXPORT_FORMATS, BatchResults, get_batch_items, load_batch_items, existing_ids,
+    compile_dump
 )
 from bookstore_api.app.schemas import BookSchema
 from bookstore_api.app.models import Book, Author, BookCategory
-from bookstore_api.app.services import upload_photo_to_s3, delete_photo_from_s3
+from bookstore_api.app.extensions import db
+from bookstore_api.app.services import response_cache, cover_uploads, schedule_deletion, COVER_PENDING
 
 book_schema = BookSchema()
 books_schema = BookSchema(many=True)
+book_update_schema = BookSchema(partial=True)
+# Batch results leave out the relationships, dumping them would load them book by book
+batch_book_schema = BookSchema(exclude=['author', 'category', 'reviews'])
+dump_batch_book = compile_dump(batch_book_schema)
 
 DEFAULT_PER_PAGE = 10
 DEFAULT_PAGE = 1
 
+# Everything BookSchema nests, a write to any of them changes the cached books
+BOOK_CACHE_TAGS = ['books', 'authors', 'categories', 'reviews']
+
+# Relationships dumped by BookSchema, loaded up front so that a page of books
+# costs the same number of queries whatever its size.
+BOOK_LOADER_PLAN = {
+    'author': (joinedload, {}),
+    'category': (joinedload, {}),
+    'reviews': (selectinload, {'user': (joinedload, {})}),
+}
+
 class BookListResource(Resource):
     method_decorators = [role_required(RoleType.ADMIN.value), jwt_required()]
+    loader_plan = BOOK_LOADER_PLAN
 
+    @response_cache.cached(tags=BOOK_CACHE_TAGS)
     def get(self):
         """Fetching all books with pagination"""
         per_page, page = get_page_filters(request.args)
         if per_page is None or page is None:
             return handle_errors('Pagination parameters must be integers', 400)
+        count_mode = get_count_mode(request.args)
+        if count_mode is None:
+            return handle_errors('count must be one of exact, estimate or none', 400)
+
+        try:
+            schema, only = get_sparse_fieldset(request.args, books_schema, self.loader_plan)
+        except ValueError as e:
+            return handle_errors('Invalid fields or include parameters', 400, e)
+
+        # Validators of the whole filtered set, checked before anything is loaded or serialized
+        etag, last_modified = get_collection_validators(
+            'books', search_filter_and_sort_books(Book.query, request.args), Book.updated_at, Book.id,
+            self.loader_plan)
+        not_modified = not_modified_response(etag, last_modified, weak=True)
+        if not_modified is not None:
+            return not_modified
+
+        books = search_filter_and_sort_books(
+            Book.query.options(*build_loader_options(Book, self.loader_plan, only)), request.args)
+
+        # Opt-in keyset pagination, skips the OFFSET scan and the total count
+        if 'cursor' in request.args:
+            if request.args.get('sort_by') == 'relevance':
+                return handle_errors('sort_by=relevance is not supported with cursor pagination', 400)
+            try:
+                items, next_cursor = paginate_by_cursor(
+                    books, get_book_sort(request.args), Book.id, request.args['cursor'], per_page)
+            except ValueError as e:
+                return handle_errors('Invalid cursor', 400, e)
+            return set_validators(api_response({
+                'books': compile_dump(schema)(items),
+                'next_cursor': next_cursor,
+                'per_page': per_page
+            }, message='Books fetched successfully', status_code=200), etag, last_modified, weak=True)
 
-        books = search_filter_and_sort_books(Book.query, request.args)
         try:
-            paginated_books = books.paginate(
-                page=page, per_page=per_page, error_out=False)
-            return api_response({
-                'books': books_schema.dump(paginated_books.items),
+            paginated_books = paginate_query(
+                books, page, per_page, count_mode, get_count_cache_key(request.path, request.args))
+            return set_validators(api_response({
+                'books': compile_dump(schema)(paginated_books.items),
                 'total': paginated_books.total,
                 'pages': paginated_books.pages,
                 'current_page': paginated_books.page,
                 'per_page': paginated_books.per_page
-            }, message='Books fetched successfully', status_code=200)
+            }, message='Books fetched successfully', status_code=200), etag, last_modified, weak=True)
         except Exception as e:
             current_app.logger.error(f"Error fetching books: {e}")
             return handle_errors('Error fetching books', 500, e)
@@ -52,49 +109,65 @@ class BookListResource(Resource):
 
         Author.query.get_or_404(validated_data['author_id'], description='Author not found')
         if validated_data.get('category_id'):
-            BookCategory.query.get(validated_data['category_id'], description='Book category not found')
-
-        try:
-            new_book = Book(**validated_data)
-            new_book.save()
-        except Exception as e:
-            current_app.logger.error(f"Error creating book: {e}")
-            return handle_errors('Error creating book', 500, e)
+            BookCategory.query.get_or_404(validated_data['category_id'], description='Book category not found')
 
+        # The cover is uploaded in the background, the book only reserves its key for now
+        upload = None
         cover_image = request.files.get('cover_image')
         if cover_image and cover_image.filename != '':
-            # TODO: Can use celery task for handling file uploads in background if needed
-            validated_data['cover_image_url'], validated_data['cover_image_s3_key'] = upload_photo_to_s3(
-                cover_image, cover_image.filename)
+            upload = cover_uploads.spool(cover_image)
+            validated_data['cover_image_s3_key'] = upload['key']
+            validated_data['cover_status'] = COVER_PENDING
 
         try:
-            setattr(new_book, 'cover_image_url', validated_data.get('cover_image_url'))
-            setattr(new_book, 'cover_image_s3_key', validated_data.get('cover_image_s3_key'))
+            new_book = Book(**validated_data)
             new_book.save()
         except Exception as e:
-            current_app.logger.error(f"Error updating book with cover image info: {e}")
-            return handle_errors('Error updating book with cover image info', 500, e)
+            if upload:
+                cover_uploads.discard(upload)
+            current_app.logger.error(f"Error creating book: {e}")
+            return handle_errors('Error creating book', 500, e)
+        if upload:
+            cover_uploads.submit(new_book.id, upload)
+        response_cache.invalidate('books')
 
         return api_response({
-            'book': book_schema.dump(new_book)
+            'book': compile_dump(book_schema)(new_book)
         }, message='Book created successfully', status_code=201)
 
 
 class BookResource(Resource):
     method_decorators = [role_required(RoleType.ADMIN.value), jwt_required()]
+    loader_plan = BOOK_LOADER_PLAN
 
+    @response_cache.cached(tags=BOOK_CACHE_TAGS)
     def get(self, book_id):
         """Fetching a book by ID"""
-        book = Book.query.get_or_404(book_id, description='Book not found')
-        return api_response({
-            'book': book_schema.dump(book)
-        }, message='Book fetched successfully', status_code=200)
+        try:
+            schema, only = get_sparse_fieldset(request.args, book_schema, self.loader_plan)
+        except ValueError as e:
+            return handle_errors('Invalid fields or include parameters', 400, e)
+
+        # Everything the representation depends on, without loading the book itself
+        validators = get_entity_validators('book', Book, book_id, self.loader_plan)
+        if validators is None:
+            return handle_errors('Book not found', 404)
+        etag, last_modified, _ = validators
+        not_modified = not_modified_response(etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        book = Book.query.options(*build_loader_options(Book, self.loader_plan, only)).get_or_404(
+            book_id, description='Book not found')
+        return set_validators(api_response({
+            'book': compile_dump(schema)(book)
+        }, message='Book fetched successfully', status_code=200), etag, last_modified)
 
     def put(self, book_id):
         """Updating a book by ID"""
         book_exists = Book.query.get_or_404(book_id, description='Book not found')
         try:
-            validated_data = BookSchema(partial=True).load(request.form)
+            validated_data = book_update_schema.load(request.form)
         except ValidationError as e:
             current_app.logger.error(f"Validation error occured during book ({book_id}) update: {e}")
             return handle_errors('book update failure', 400, e)
@@ -105,38 +178,163 @@ class BookResource(Resource):
             BookCategory.query.get_or_404(
                 validated_data['category_id'], description='Book category not found')
 
-        # TODO: Can use celery task for handling file uploads in background if needed
+        # The new cover is uploaded in the background, the old one goes to the deletion outbox
+        upload = None
         cover_image = request.files.get('cover_image')
         if cover_image and cover_image.filename != '':
-            # Delete old cover image from S3 if exists
-            if book_exists.cover_image_s3_key:
-                delete_photo_from_s3(book_exists.cover_image_s3_key)
-            # Upload new cover image to S3
-            validated_data['cover_image_url'], validated_data['cover_image_s3_key'] = upload_photo_to_s3(
-                cover_image, cover_image.filename)
+            upload = cover_uploads.spool(cover_image)
+            if book_exists.cover_image_s3_key != upload['key']:
+                schedule_deletion(book_exists.cover_image_s3_key)
+            validated_data['cover_image_url'] = None
+            validated_data['cover_image_s3_key'] = upload['key']
+            validated_data['cover_status'] = COVER_PENDING
 
         for key, value in validated_data.items():
             setattr(book_exists, key, value)
         try:
             book_exists.save()
         except Exception as e:
+            if upload:
+                cover_uploads.discard(upload)
             current_app.logger.error(f"Error updating book with id {book_id}: {e}")
             return handle_errors('Error updating book', 500, e)
+        if upload:
+            cover_uploads.submit(book_id, upload)
+        response_cache.invalidate('books')
 
         return api_response({
-            'book': book_schema.dump(book_exists)
+            'book': compile_dump(book_schema)(book_exists)
         }, message='Book updated successfully', status_code=200)
 
     def delete(self, book_id):
         book = Book.query.get_or_404(book_id, description='Book not found')
 
         try:
-            # Delete cover image from S3 if exists
-            if book.cover_image_s3_key:
-                delete_photo_from_s3(book.cover_image_s3_key)
+            # The cover image is deleted in the background, unless another book shares it
+            schedule_deletion(book.cover_image_s3_key)
             book.delete()
         except Exception as e:
             current_app.logger.error(f"Error deleting book with id {book_id}: {e}")
             return handle_errors('Error deleting book', 500, e)
+        response_cache.invalidate('books')
 
         return api_response({}, message='Book deleted successfully', status_code=204)
+
+
+class BookExportResource(Resource):
+    """The whole catalog, or the books matching the list filters, streamed as NDJSON or CSV."""
+    method_decorators = [role_required(RoleType.ADMIN.value), jwt_required()]
+
+    def get(self):
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return handle_errors(f'format must be one of {", ".join(EXPORT_FORMATS)}', 400)
+        try:
+            filters = get_export_filters(request.args)
+        except ValueError as e:
+            return handle_errors(str(e), 400, e)
+
+        # Not cached, the rows are sent as they are read
+        return Response(
+            stream_with_context(export_books(filters, export_format)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename=books.{export_format}'}
+        )
+
+
+class BookBatchResource(Resource):
+    """
+    Creating or updating many books in one request, written in a single
+    transaction. Covers are not accepted here, they go through the book's
+    own endpoints.
+    """
+    method_decorators = [role_required(RoleType.ADMIN.value), jwt_required()]
+
+    def post(self):
+        """Creating books in a batch"""
+        try:
+            batch = BatchResults(get_batch_items(request.get_json(silent=True)))
+        except ValueError as e:
+            return handle_errors(str(e), 400, e)
+
+        loaded = load_batch_items(batch, book_schema)
+        self._check_references(batch, loaded)
+
+        # An isbn can neither exist already nor repeat within the batch
+        isbns = {data['isbn'] for data in loaded.values()}
+        taken = set(db.session.execute(select(Book.isbn).where(Book.isbn.in_(isbns))).scalars()) if isbns else set()
+        new_books = {}
+        for index in batch.pending():
+            isbn = loaded[index]['isbn']
+            if isbn in taken:
+                batch.fail(index, 409, f'A book with isbn {isbn} already exists')
+                continue
+            taken.add(isbn)
+            new_books[index] = Book(**loaded[index])
+
+        return self._write(batch, new_books, 201, 'Books created')
+
+    def patch(self):
+        """Updating books in a batch, each item carries the id of its book"""
+        try:
+            batch = BatchResults(get_batch_items(request.get_json(silent=True)))
+        except ValueError as e:
+            return handle_errors(str(e), 400, e)
+
+        loaded = load_batch_items(batch, book_update_schema, id_field='id')
+        books = {
+            book.id: book
+            for book in Book.query.filter(Book.id.in_({data['id'] for data in loaded.values()}))
+        } if loaded else {}
+        for index in batch.pending():
+            if loaded[index]['id'] not in books:
+                batch.fail(index, 404, 'Book not found')
+        self._check_references(batch, loaded)
+
+        # A new isbn can neither belong to another book nor be claimed twice
+        isbns = {loaded[index]['isbn'] for index in batch.pending() if 'isbn' in loaded[index]}
+        isbn_owners = dict(db.session.execute(
+            select(Book.isbn, Book.id).where(Book.isbn.in_(isbns))).all()) if isbns else {}
+        updated_books = {}
+        for index in batch.pending():
+            data = dict(loaded[index])
+            book_id = data.pop('id')
+            isbn = data.get('isbn')
+            if isbn is not None and isbn_owners.setdefault(isbn, book_id) != book_id:
+                batch.fail(index, 409, f'A book with isbn {isbn} already exists')
+                continue
+            for key, value in data.items():
+                setattr(books[book_id], key, value)
+            updated_books[index] = books[book_id]
+
+        return self._write(batch, updated_books, 200, 'Books updated')
+
+    @staticmethod
+    def _check_references(batch, loaded):
+        # One IN query per referenced table for the whole batch
+        author_ids = existing_ids(Author, (data.get('author_id') for data in loaded.values()))
+        category_ids = existing_ids(BookCategory, (data.get('category_id') for data in loaded.values()))
+        for index in batch.pending():
+            data = loaded[index]
+            if 'author_id' in data and data['author_id'] not in author_ids:
+                batch.fail(index, 404, 'Author not found')
+            elif data.get('category_id') and data['category_id'] not in category_ids:
+                batch.fail(index, 404, 'Book category not found')
+
+    @staticmethod
+    def _write(batch, books, status_code, message):
+        if books:
+            try:
+                db.session.add_all(books.values())
+                db.session.flush()
+                # Dumped before the commit expires them
+                for index, book in books.items():
+                    batch.succeed(index, status_code, book=dump_batch_book(book))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Error writing a batch of {len(books)} books: {e}")
+                return handle_errors('Error writing books, none of the batch was saved', 500, e)
+            response_cache.invalidate('books')
+
+        return batch.response(f'{message} in a batch', status_code)
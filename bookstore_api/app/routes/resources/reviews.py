@@ -2,29 +2,56 @@ from flask import request, current_app
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_current_user
 from marshmallow import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
 from bookstore_api.app.helpers import (
     RoleType, handle_errors, api_response, filter_and_sort_reviews,
-    get_page_filters
+    get_page_filters, build_loader_options, get_sparse_fieldset, get_review_sort,
+    paginate_by_cursor, paginate_query, get_count_mode, get_count_cache_key, get_collection_validators,
+    get_entity_validators, not_modified_response, set_validators,
+    BatchResults, get_batch_items, load_batch_items, existing_ids, compile_dump
 )
 from bookstore_api.app.schemas import ReviewSchema
 from bookstore_api.app.models import Review, Book
+from bookstore_api.app.extensions import db
+from bookstore_api.app.services import response_cache
 
 review_schema = ReviewSchema()
 reviews_schema = ReviewSchema(many=True)
+review_update_schema = ReviewSchema(partial=True)
+# Batch results leave out the relationships, dumping them would load them review by review
+batch_review_schema = ReviewSchema(exclude=['book', 'user'])
+dump_batch_review = compile_dump(batch_review_schema)
 
 DEFAULT_PER_PAGE = 10
 DEFAULT_PAGE = 1
 
+# Relationships dumped by ReviewSchema, both many-to-one so a join covers them.
+REVIEW_LOADER_PLAN = {
+    'book': (joinedload, {}),
+    'user': (joinedload, {}),
+}
+
 
 class ReviewListResource(Resource):
     method_decorators = [jwt_required()]
+    loader_plan = REVIEW_LOADER_PLAN
 
+    @response_cache.cached(tags=lambda book_id: [f'book_reviews:{book_id}', 'books'])
     def get(self, book_id):
         """Fetching all reviews with optional filtering and pagination"""
         per_page, page = get_page_filters(request.args)
         if per_page is None or page is None:
             return handle_errors('Pagination parameters must be integers', 400)
+        count_mode = get_count_mode(request.args)
+        if count_mode is None:
+            return handle_errors('count must be one of exact, estimate or none', 400)
+
+        try:
+            schema, only = get_sparse_fieldset(request.args, reviews_schema, self.loader_plan)
+        except ValueError as e:
+            return handle_errors('Invalid fields or include parameters', 400, e)
 
         # Start with base query filtered by book_id
         try:
@@ -32,19 +59,42 @@ class ReviewListResource(Resource):
         except ValueError:
             return handle_errors('book_id must be an integer', 400)
 
+        # Validators of the whole filtered set, checked before anything is loaded or serialized
+        etag, last_modified = get_collection_validators(
+            'reviews', filter_and_sort_reviews(query, request.args), Review.updated_at, Review.id,
+            self.loader_plan)
+        not_modified = not_modified_response(etag, last_modified, weak=True)
+        if not_modified is not None:
+            return not_modified
+
+        query = query.options(*build_loader_options(Review, self.loader_plan, only))
+
         # Apply additional filters and sorting using helper function
         reviews = filter_and_sort_reviews(query, request.args)
 
+        # Opt-in keyset pagination, skips the OFFSET scan and the total count
+        if 'cursor' in request.args:
+            try:
+                items, next_cursor = paginate_by_cursor(
+                    reviews, get_review_sort(request.args), Review.id, request.args['cursor'], per_page)
+            except ValueError as e:
+                return handle_errors('Invalid cursor', 400, e)
+            return set_validators(api_response({
+                'reviews': compile_dump(schema)(items),
+                'next_cursor': next_cursor,
+                'per_page': per_page
+            }, message='Reviews fetched successfully', status_code=200), etag, last_modified, weak=True)
+
         try:
-            paginated_reviews = reviews.paginate(
-                page=page, per_page=per_page, error_out=False)
-            return api_response({
-                'reviews': reviews_schema.dump(paginated_reviews.items),
+            paginated_reviews = paginate_query(
+                reviews, page, per_page, count_mode, get_count_cache_key(request.path, request.args))
+            return set_validators(api_response({
+                'reviews': compile_dump(schema)(paginated_reviews.items),
                 'total': paginated_reviews.total,
                 'pages': paginated_reviews.pages,
                 'current_page': paginated_reviews.page,
                 'per_page': paginated_reviews.per_page
-            }, message='Reviews fetched successfully', status_code=200)
+            }, message='Reviews fetched successfully', status_code=200), etag, last_modified, weak=True)
         except Exception as e:
             current_app.logger.error(f"Error fetching reviews: {e}")
             return handle_errors('Error fetching reviews', 500, e)
@@ -69,31 +119,51 @@ class ReviewListResource(Resource):
 
         try:
             new_review = Review(**validated_data)
+            Book.adjust_rating_aggregates(book_id, added=new_review.rating)
             new_review.save()
         except Exception as e:
             current_app.logger.error(f"Error creating review: {e}")
             return handle_errors('Error creating review', 500, e)
+        response_cache.invalidate('reviews', f'book_reviews:{book_id}')
 
         return api_response({
-            'review': review_schema.dump(new_review)
+            'review': compile_dump(review_schema)(new_review)
         }, message='Review created successfully', status_code=201)
 
 
 class ReviewResource(Resource):
     method_decorators = [jwt_required()]
+    loader_plan = REVIEW_LOADER_PLAN
 
+    # Only the owner or an admin may see a review, so cache it per user
+    @response_cache.cached(tags=['reviews', 'books'], vary_on_user=True)
     def get(self, review_id):
         """Fetching a review by ID"""
-        review = Review.query.get_or_404(review_id, description='Review not found')
+        try:
+            schema, only = get_sparse_fieldset(request.args, review_schema, self.loader_plan)
+        except ValueError as e:
+            return handle_errors('Invalid fields or include parameters', 400, e)
+
+        # The owner and what the representation depends on, without loading the review itself
+        validators = get_entity_validators('review', Review, review_id, self.loader_plan, columns=[Review.user_id])
+        if validators is None:
+            return handle_errors('Review not found', 404)
+        etag, last_modified, (owner_id,) = validators
 
         current_user = get_current_user()
         # Users can only view their own reviews, admins can view any
-        if current_user.role.name != RoleType.ADMIN.value and review.user_id != current_user.id:
+        if current_user.role.name != RoleType.ADMIN.value and owner_id != current_user.id:
             return handle_errors('Unauthorized access', 403)
 
-        return api_response({
-            'review': review_schema.dump(review)
-        }, message='Review fetched successfully', status_code=200)
+        not_modified = not_modified_response(etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        review = Review.query.options(*build_loader_options(Review, self.loader_plan, only)).get_or_404(
+            review_id, description='Review not found')
+        return set_validators(api_response({
+            'review': compile_dump(schema)(review)
+        }, message='Review fetched successfully', status_code=200), etag, last_modified)
 
     def put(self, review_id):
         """Updating a review by ID"""
@@ -106,22 +176,26 @@ class ReviewResource(Resource):
 
         review_data = request.get_json(silent=True)
         try:
-            validated_data = ReviewSchema(partial=True).load(review_data)
+            validated_data = review_update_schema.load(review_data)
         except ValidationError as e:
             current_app.logger.error(f"Validation error occurred during review ({review_id}) update: {e}")
             return handle_errors('review update failure', 400, e)
 
-        for key, value in validated_data.items():
-            setattr(review_exists, key, value)
-
         try:
+            if validated_data.get('rating', review_exists.rating) != review_exists.rating:
+                Book.adjust_rating_aggregates(
+                    review_exists.book_id, added=validated_data['rating'], removed=review_exists.rating)
+
+            for key, value in validated_data.items():
+                setattr(review_exists, key, value)
             review_exists.save()
         except Exception as e:
             current_app.logger.error(f"Error updating review with id {review_id}: {e}")
             return handle_errors('Error updating review', 500, e)
+        response_cache.invalidate('reviews', f'book_reviews:{review_exists.book_id}')
 
         return api_response({
-            'review': review_schema.dump(review_exists)
+            'review': compile_dump(review_schema)(review_exists)
         }, message='Review updated successfully', status_code=200)
 
     def delete(self, review_id):
@@ -133,10 +207,108 @@ class ReviewResource(Resource):
         if current_user.role.name != RoleType.ADMIN.value and review.user_id != current_user.id:
             return handle_errors('Unauthorized access', 403)
 
+        book_id = review.book_id
         try:
+            Book.adjust_rating_aggregates(book_id, removed=review.rating)
             review.delete()
         except Exception as e:
             current_app.logger.error(f"Error deleting review with id {review_id}: {e}")
             return handle_errors('Error deleting review', 500, e)
+        response_cache.invalidate('reviews', f'book_reviews:{book_id}')
 
         return api_response({}, message='Review deleted successfully', status_code=204)
+
+
+class ReviewBatchResource(Resource):
+    """Creating or updating many of the current user's reviews in one request, written in a single transaction."""
+    method_decorators = [jwt_required()]
+
+    def post(self):
+        """Creating reviews in a batch, each item carries the book_id of its book"""
+        try:
+            batch = BatchResults(get_batch_items(request.get_json(silent=True)))
+        except ValueError as e:
+            return handle_errors(str(e), 400, e)
+
+        loaded = load_batch_items(batch, review_schema, id_field='book_id')
+        book_ids = existing_ids(Book, (data['book_id'] for data in loaded.values()))
+        current_user = get_current_user()
+        # A user reviews a book once, whether in an earlier request or earlier in the batch
+        reviewed = set(db.session.execute(
+            select(Review.book_id).where(Review.user_id == current_user.id, Review.book_id.in_(book_ids))
+        ).scalars()) if book_ids else set()
+        new_reviews = {}
+        for index in batch.pending():
+            book_id = loaded[index]['book_id']
+            if book_id not in book_ids:
+                batch.fail(index, 404, 'Book not found')
+                continue
+            if book_id in reviewed:
+                batch.fail(index, 409, 'You have already reviewed this book')
+                continue
+            reviewed.add(book_id)
+            new_reviews[index] = Review(**loaded[index], user_id=current_user.id)
+
+        ratings = {}
+        for review in new_reviews.values():
+            ratings.setdefault(review.book_id, {'added': [], 'removed': []})['added'].append(review.rating)
+        return self._write(batch, new_reviews, ratings, 201, 'Reviews created')
+
+    def patch(self):
+        """Updating reviews in a batch, each item carries the id of its review"""
+        try:
+            batch = BatchResults(get_batch_items(request.get_json(silent=True)))
+        except ValueError as e:
+            return handle_errors(str(e), 400, e)
+
+        loaded = load_batch_items(batch, review_update_schema, id_field='id')
+        reviews = {
+            review.id: review
+            for review in Review.query.filter(Review.id.in_({data['id'] for data in loaded.values()}))
+        } if loaded else {}
+        current_user = get_current_user()
+        updated_reviews = {}
+        ratings = {}
+        for index in batch.pending():
+            data = dict(loaded[index])
+            review = reviews.get(data.pop('id'))
+            if review is None:
+                batch.fail(index, 404, 'Review not found')
+                continue
+            # Only the review owner can update (not even admins)
+            if review.user_id != current_user.id:
+                batch.fail(index, 403, 'Unauthorized access')
+                continue
+
+            if data.get('rating', review.rating) != review.rating:
+                book_ratings = ratings.setdefault(review.book_id, {'added': [], 'removed': []})
+                book_ratings['added'].append(data['rating'])
+                book_ratings['removed'].append(review.rating)
+            for key, value in data.items():
+                setattr(review, key, value)
+            updated_reviews[index] = review
+
+        return self._write(batch, updated_reviews, ratings, 200, 'Reviews updated')
+
+    @staticmethod
+    def _write(batch, reviews, ratings, status_code, message):
+        if reviews:
+            try:
+                # One aggregates UPDATE per book, whatever the number of its reviews in the batch
+                for book_id, book_ratings in ratings.items():
+                    Book.adjust_rating_aggregates(book_id, **book_ratings)
+                db.session.add_all(reviews.values())
+                db.session.flush()
+                # Dumped, and their books noted, before the commit expires them
+                for index, review in reviews.items():
+                    batch.succeed(
+                        index, status_code, book_id=review.book_id, review=dump_batch_review(review))
+                book_ids = {review.book_id for review in reviews.values()}
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Error writing a batch of {len(reviews)} reviews: {e}")
+                return handle_errors('Error writing reviews, none of the batch was saved', 500, e)
+            response_cache.invalidate('reviews', *(f'book_reviews:{book_id}' for book_id in book_ids))
+
+        return batch.response(f'{message} in a batch', status_code)
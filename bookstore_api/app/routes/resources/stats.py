@@ -0,0 +1,25 @@
+from flask import current_app
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+
+from bookstore_api.app.helpers import role_required, RoleType, handle_errors, api_response
+from bookstore_api.app.services import db_pools, replica_router, response_cache, token_blocklist
+
+
+class StatsResource(Resource):
+    method_decorators = [role_required(RoleType.ADMIN.value), jwt_required()]
+
+    def get(self):
+        """Fetching the metrics of the worker serving the request"""
+        try:
+            return api_response({
+                'database': {
+                    'pools': db_pools.stats(),
+                    'replicas': replica_router.stats(),
+                },
+                'response_cache': response_cache.stats(),
+                'token_blocklist': token_blocklist.stats(),
+            }, message='Stats fetched successfully', status_code=200)
+        except Exception as e:
+            current_app.logger.error(f"Error fetching stats: {e}")
+            return handle_errors('Error fetching stats', 500, e)
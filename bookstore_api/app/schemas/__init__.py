@@ -4,6 +4,7 @@ from .review_schema import ReviewSchema
 from .user_schema import UserSchema
 from .role_schema import RoleSchema
 from .book_category_schema import BookCategorySchema
+from .book_cover_schema import CoverUploadRequestSchema, CoverUploadConfirmSchema
 
 __all__ = [
     'AuthorSchema',
@@ -11,5 +12,7 @@ __all__ = [
     'ReviewSchema',
     'UserSchema',
     'RoleSchema',
-    'BookCategorySchema'
+    'BookCategorySchema',
+    'CoverUploadRequestSchema',
+    'CoverUploadConfirmSchema',
 ]
@@ -0,0 +1,14 @@
+from marshmallow import fields, validate
+
+from bookstore_api.app.extensions import ma
+
+
+class CoverUploadRequestSchema(ma.Schema):
+    content_type = fields.String(required=True)
+    content_length = fields.Integer(
+        validate=validate.Range(min=1, error="content_length must be a positive number of bytes.")
+    )
+
+
+class CoverUploadConfirmSchema(ma.Schema):
+    key = fields.String(required=True, validate=validate.Length(min=1, max=500))
@@ -16,9 +16,12 @@ class BookSchema(ma.Schema):
     )
     cover_image_url = fields.String(dump_only=True)
     cover_image_s3_key = fields.String(dump_only=True)
+    cover_status = fields.String(dump_only=True)
     publication_year = fields.Integer(required=False, allow_none=True)
     author_id = fields.Integer(required=True)
     category_id = fields.Integer(required=False, allow_none=True)
+    average_rating = fields.Float(dump_only=True)
+    review_count = fields.Integer(dump_only=True)
     author = fields.Nested('AuthorSchema', only=['name'])
     category = fields.Nested('BookCategorySchema', only=['name'])
     reviews = fields.Nested('ReviewSchema', many=True, exclude=['book'])
@@ -1,3 +1,5 @@
+import functools
+
 import click
 
 from flask.cli import AppGroup
@@ -11,6 +13,16 @@ db_cli = AppGroup('seed', help='Database related commands.')
 # To see commands inside the 'db' group:
 # poetry run my-cli seed --help
 
+def batch_job(command):
+    """Run the command without the DB_STATEMENT_TIMEOUT requests are held to."""
+    @functools.wraps(command)
+    def wrapper(*args, **kwargs):
+        from bookstore_api.app.services import db_pools # pylint: disable=import-outside-toplevel
+
+        db_pools.lift_statement_timeout()
+        return command(*args, **kwargs)
+    return wrapper
+
 # This command remains a flat, top-level command: poetry run my-cli greet <name>
 @click.command('greet')
 @click.argument('name')
@@ -105,3 +117,165 @@ def create_admin_user(username, email, password):
         db.session.rollback()
         click.echo(f'❌ Error creating admin user: {e}')
         return
+
+# To run the nested command:
+# poetry run my-cli seed search-index
+@db_cli.command('search-index')
+@batch_job
+def rebuild_search_index():
+    """Rebuild the books full-text search index."""
+    from bookstore_api.app.services import rebuild_book_search # pylint: disable=import-outside-toplevel
+
+    click.echo('Rebuilding books search index...')
+    try:
+        rebuild_book_search()
+
+        click.echo('🔥 Books search index rebuilt.')
+    except Exception as e:
+        # Rollback the session in case of an error
+        db.session.rollback()
+        click.echo(f'❌ Error rebuilding books search index: {e}', err=True)
+
+# To run the nested command:
+# poetry run my-cli seed ratings
+@db_cli.command('ratings')
+@batch_job
+def recompute_ratings():
+    """Recompute the review aggregates of every book."""
+    from bookstore_api.app.models import Book # pylint: disable=import-outside-toplevel
+    from bookstore_api.app.services import response_cache # pylint: disable=import-outside-toplevel
+
+    click.echo('Recomputing book ratings...')
+    try:
+        Book.recompute_rating_aggregates()
+        db.session.commit()
+        response_cache.invalidate('books')
+
+        click.echo('🔥 Book ratings recomputed.')
+    except Exception as e:
+        # Rollback the session in case of an error
+        db.session.rollback()
+        click.echo(f'❌ Error recomputing book ratings: {e}', err=True)
+
+# To run the nested command:
+# poetry run my-cli seed storage-deletions
+@db_cli.command('storage-deletions')
+@batch_job
+def drain_storage_deletions():
+    """Delete the storage objects queued in the deletion outbox."""
+    from bookstore_api.app.services import storage_deletions # pylint: disable=import-outside-toplevel
+
+    click.echo('Draining storage deletions...')
+    try:
+        deleted, failed = storage_deletions.drain()
+
+        click.echo(f'🔥 Deleted {deleted} storage objects, {failed} failed and will be retried.')
+    except Exception as e:
+        # Rollback the session in case of an error
+        db.session.rollback()
+        click.echo(f'❌ Error draining storage deletions: {e}', err=True)
+
+# To run the nested command:
+# poetry run my-cli seed stale-covers --max-age 3600
+@db_cli.command('stale-covers')
+@click.option('--max-age', type=int, default=None,
+              help='Seconds a cover stays pending before it is settled, COVER_UPLOAD_STALE_AFTER by default.')
+@batch_job
+def recover_stale_covers(max_age):
+    """Settle the book covers left pending by an upload which never finished."""
+    from bookstore_api.app.services import cover_uploads # pylint: disable=import-outside-toplevel
+
+    click.echo('Recovering stale cover uploads...')
+    try:
+        ready, failed = cover_uploads.recover_stale(max_age)
+
+        click.echo(f'🔥 {ready} stale covers found in storage, {failed} marked as failed.')
+    except Exception as e:
+        # Rollback the session in case of an error
+        db.session.rollback()
+        click.echo(f'❌ Error recovering stale cover uploads: {e}', err=True)
+
+# To run the nested command:
+# poetry run my-cli seed import catalog.csv --batch-size 5000
+@db_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='File format, guessed from the extension by default.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows written and committed at a time.')
+@click.option('--resume/--restart', default=True, show_default=True,
+              help='Resume from the checkpoint left by an interrupted import of the same file.')
+@batch_job
+def import_catalog_file(path, file_format, batch_size, resume):
+    """Import books, authors and categories from a CSV or JSONL file."""
+    from bookstore_api.app.services import import_catalog # pylint: disable=import-outside-toplevel
+
+    def report(stats):
+        click.echo(f"  {stats['rows']} rows, {stats['imported']} books imported, "
+                   f"{stats['skipped']} skipped ({stats['rows_per_sec']:.0f} rows/sec)")
+
+    click.echo(f'Importing catalog from {path}...')
+    try:
+        stats = import_catalog(path, batch_size, file_format, resume, progress=report)
+
+        for error in stats['errors']:
+            click.echo(f'  ⚠️ {error}', err=True)
+        click.echo(f"🔥 Imported {stats['imported']} books from {stats['rows']} rows "
+                   f"({stats['rows_per_sec']:.0f} rows/sec), {stats['skipped']} rows skipped.")
+    except Exception as e:
+        # Rollback the session in case of an error
+        db.session.rollback()
+        click.echo(f'❌ Error importing catalog, rerun the command to resume: {e}', err=True)
+
+# To run the nested command:
+# poetry run my-cli seed export books.ndjson --format ndjson --filter category_id=3
+@db_cli.command('export')
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'export_format', type=click.Choice(['ndjson', 'csv']), default='ndjson', show_default=True,
+              help='Export file format.')
+@click.option('--filter', 'filters', multiple=True,
+              help='A books list filter as key=value, e.g. search=tolkien or min_rating=4. Repeatable.')
+@batch_job
+def export_catalog(output, export_format, filters):
+    """Export the books, with their author and category names, to an NDJSON or CSV file."""
+    from bookstore_api.app.helpers import export_books, get_export_filters # pylint: disable=import-outside-toplevel
+
+    click.echo(f'Exporting catalog to {output}...')
+    try:
+        filters = get_export_filters(dict(item.split('=', 1) for item in filters if '=' in item))
+        with open(output, 'w', newline='', encoding='utf-8') as export_file:
+            for chunk in export_books(filters, export_format):
+                export_file.write(chunk)
+        click.echo(f'🔥 Catalog exported to {output}.')
+    except Exception as e:
+        # Rollback the session in case of an error
+        db.session.rollback()
+        click.echo(f'❌ Error exporting catalog: {e}', err=True)
+
+# To run the nested command:
+# poetry run my-cli seed query-plans --books 20000
+@db_cli.command('query-plans')
+@click.option('--books', default=20000, show_default=True,
+              help='Synthetic books (with authors, categories, users and reviews) added for the check and '
+                   'rolled back afterwards, 0 to check the data as it is.')
+@batch_job
+def check_query_plans_command(books):
+    """EXPLAIN the queries the endpoints filter and sort with, fail if one scans a whole table."""
+    from bookstore_api.app.helpers import check_query_plans # pylint: disable=import-outside-toplevel
+
+    click.echo('Checking query plans...')
+    try:
+        results = check_query_plans(books)
+    except Exception as e:
+        click.echo(f'❌ Error checking query plans: {e}', err=True)
+        raise SystemExit(1) from e
+
+    regressed = [name for name, table, scanned in results if table in scanned]
+    for name, table, scanned in results:
+        if table in scanned:
+            click.echo(f'  ❌ {name}: sequential scan of {table}', err=True)
+        else:
+            click.echo(f'  ✅ {name}')
+    if regressed:
+        click.echo(f'❌ {len(regressed)} of {len(results)} queries scan a whole table.', err=True)
+        raise SystemExit(1)
+    click.echo(f'🔥 All {len(results)} queries use an index.')
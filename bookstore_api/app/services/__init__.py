@@ -1,6 +1,41 @@
-from .s3_utils import upload_photo_to_s3, delete_photo_from_s3
+from .s3_utils import (
+    upload_photo_to_s3, delete_photo_from_s3, create_presigned_upload, get_s3_object_metadata, get_s3_public_url
+)
+from .book_search import get_search_backend, init_book_search, rebuild_book_search
+from .response_cache import response_cache
+from .identity_cache import identity_cache, AuthenticatedUser
+from .token_blocklist import token_blocklist
+from .cover_uploads import cover_uploads, COVER_PENDING, COVER_READY
+from .storage_deletions import storage_deletions, schedule_deletion
+from .catalog_import import import_catalog, IMPORT_FORMATS
+from .replicas import replica_router, READ_PRIMARY_COOKIE
+from .db_pools import db_pools, POOL_PROFILES
+from .query_metrics import query_metrics, NPlusOneError
 
 __all__ = [
     'upload_photo_to_s3',
-    'delete_photo_from_s3'
+    'delete_photo_from_s3',
+    'create_presigned_upload',
+    'get_s3_object_metadata',
+    'get_s3_public_url',
+    'get_search_backend',
+    'init_book_search',
+    'rebuild_book_search',
+    'response_cache',
+    'identity_cache',
+    'AuthenticatedUser',
+    'token_blocklist',
+    'cover_uploads',
+    'COVER_PENDING',
+    'COVER_READY',
+    'storage_deletions',
+    'schedule_deletion',
+    'import_catalog',
+    'IMPORT_FORMATS',
+    'replica_router',
+    'READ_PRIMARY_COOKIE',
+    'db_pools',
+    'POOL_PROFILES',
+    'query_metrics',
+    'NPlusOneError',
 ]
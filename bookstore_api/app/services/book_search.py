@@ -0,0 +1,329 @@
+import re
+
+from flask import current_app
+from sqlalchemy import (
+    event, inspect, select, or_, func, text, bindparam, literal, case, union, Integer, Float, false
+)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Book, Author, BookCategory
+from .trigram_index import TrigramIndex
+
+SEARCH_TABLE = 'book_search_documents'
+# Book columns a refresh can select the books to reindex by
+REFRESH_COLUMNS = ('id', 'author_id', 'category_id')
+# Attributes that feed a book's search document
+INDEXED_ATTRIBUTES = {
+    Book: ('title', 'description', 'author_id', 'category_id'),
+    Author: ('name',),
+    BookCategory: ('name',),
+}
+
+# Fuzzy search fallback, shared by every request of this worker
+trigram_index = TrigramIndex()
+
+def _load_trigram_documents(column, ids):
+    documents = select(Book.id, Book.title, Author.name, BookCategory.name).outerjoin(
+        Author, Author.id == Book.author_id).outerjoin(BookCategory, BookCategory.id == Book.category_id)
+    if column is not None:
+        documents = documents.where(getattr(Book, column).in_(ids))
+    for row in db.session.execute(documents.execution_options(yield_per=1000)):
+        yield row[0], (row[1], row[2], row[3])
+
+def _matching_books(match):
+    """
+    Ids of the books whose lowercased title, author or category name satisfies
+    `match`, each table matched on its own so that its own index serves it,
+    which an OR across outer joined tables rules out.
+    """
+    return union(
+        select(Book.id).where(match(func.lower(Book.title))),
+        select(Book.id).where(Book.author_id.in_(select(Author.id).where(match(func.lower(Author.name))))),
+        select(Book.id).where(
+            Book.category_id.in_(select(BookCategory.id).where(match(func.lower(BookCategory.name))))),
+    )
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class LikeSearchBackend:
+    """Unindexed fallback matching the search term anywhere in the title, author or category name."""
+
+    def create_index(self, connection):
+        return False
+
+    def rebuild(self, connection):
+        pass
+
+    def refresh(self, connection, column, ids):
+        pass
+
+    def remove(self, connection, book_ids):
+        pass
+
+    def apply(self, books_query, term):
+        """Filter the books query by the search term, returns (query, rank) where rank may be None."""
+        search_pattern = f"%{term.lower()}%"
+        books_query = books_query.join(Author, isouter=True).join(BookCategory, isouter=True).filter(
+            or_(
+                func.lower(Book.title).like(search_pattern),
+                func.lower(Author.name).like(search_pattern),
+                func.lower(BookCategory.name).like(search_pattern)
+            )
+        )
+        return books_query, None
+
+    def apply_prefix(self, books_query, term):
+        """Match titles, author or category names starting with the term."""
+        search_pattern = f"{_escape_like(term.lower())}%"
+        matches = _matching_books(lambda name: name.like(search_pattern, escape='\\'))
+        return books_query.filter(Book.id.in_(matches)), None
+
+    def apply_fuzzy(self, books_query, term, threshold):
+        """Typo tolerant match through the in-process trigram index, ranked by similarity."""
+        trigram_index.refresh(_load_trigram_documents, current_app.config['SEARCH_TRIGRAM_INDEX_MAX_AGE'])
+        scores = dict(trigram_index.search(term, threshold, current_app.config['SEARCH_FUZZY_MAX_MATCHES']))
+        if not scores:
+            return books_query.filter(false()), literal(0.0)
+        return books_query.filter(Book.id.in_(scores)), case(scores, value=Book.id, else_=0.0)
+
+
+class PostgresSearchBackend(LikeSearchBackend):
+    """
+    Weighted tsvector documents (title A, author B, category C, description D)
+    in a side table with a GIN index, ranked with ts_rank.
+    """
+
+    def create_index(self, connection):
+        if inspect(connection).has_table(SEARCH_TABLE):
+            return False
+        connection.execute(text(
+            f"CREATE TABLE {SEARCH_TABLE} ("
+            " book_id INTEGER PRIMARY KEY REFERENCES books (id) ON DELETE CASCADE,"
+            " document TSVECTOR NOT NULL)"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING gin (document)"))
+        return True
+
+    def _upsert(self, where):
+        return (
+            f"INSERT INTO {SEARCH_TABLE} (book_id, document) "
+            "SELECT b.id, "
+            "setweight(to_tsvector('english', coalesce(b.title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(a.name, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(c.name, '')), 'C') || "
+            "setweight(to_tsvector('english', coalesce(b.description, '')), 'D') "
+            "FROM books b "
+            "LEFT JOIN authors a ON a.id = b.author_id "
+            "LEFT JOIN book_categories c ON c.id = b.category_id "
+            f"{where} "
+            "ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document"
+        )
+
+    def rebuild(self, connection):
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+        connection.execute(text(self._upsert('')))
+
+    def refresh(self, connection, column, ids):
+        if column not in REFRESH_COLUMNS:
+            raise ValueError(f'Cannot refresh the search index by {column}')
+        connection.execute(
+            text(self._upsert(f"WHERE b.{column} IN :ids")).bindparams(bindparam('ids', expanding=True)),
+            {'ids': list(ids)}
+        )
+
+    def remove(self, connection, book_ids):
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE book_id IN :ids").bindparams(
+                bindparam('ids', expanding=True)),
+            {'ids': list(book_ids)}
+        )
+
+    def apply(self, books_query, term):
+        matches = text(
+            f"SELECT book_id, ts_rank(document, websearch_to_tsquery('english', :term)) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE document @@ websearch_to_tsquery('english', :term)"
+        ).bindparams(term=term).columns(book_id=Integer, rank=Float).subquery('search_matches')
+        return books_query.join(matches, matches.c.book_id == Book.id), matches.c.rank
+
+    def apply_fuzzy(self, books_query, term, threshold):
+        """pg_trgm word similarity, served by the trigram GIN indexes on the lowercased names."""
+        term = term.lower()
+        # The <% operator reads its threshold from the settings, scope it to this transaction
+        # A SELECT, so that it runs wherever the query runs, the primary or the request's replica
+        db.session.execute(select(func.set_config('pg_trgm.word_similarity_threshold', str(threshold), True)))
+        books_query = books_query.filter(Book.id.in_(_matching_books(lambda name: literal(term).op('<%')(name))))
+        # Scored book by book, the author and category names looked up by primary key
+        return books_query, func.greatest(
+            func.word_similarity(term, func.lower(Book.title)),
+            select(func.word_similarity(term, func.lower(Author.name))).where(
+                Author.id == Book.author_id).scalar_subquery(),
+            select(func.word_similarity(term, func.lower(BookCategory.name))).where(
+                BookCategory.id == Book.category_id).scalar_subquery(),
+        )
+
+
+class SqliteSearchBackend(LikeSearchBackend):
+    """FTS5 virtual table keyed by book id, ranked with a column-weighted bm25."""
+
+    def create_index(self, connection):
+        if inspect(connection).has_table(SEARCH_TABLE):
+            return False
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            "title, author, category, description, tokenize='porter unicode61')"
+        ))
+        return True
+
+    def _insert(self, where):
+        return (
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, author, category, description) "
+            "SELECT b.id, b.title, coalesce(a.name, ''), coalesce(c.name, ''), coalesce(b.description, '') "
+            "FROM books b "
+            "LEFT JOIN authors a ON a.id = b.author_id "
+            "LEFT JOIN book_categories c ON c.id = b.category_id "
+            f"{where}"
+        )
+
+    def rebuild(self, connection):
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+        connection.execute(text(self._insert('')))
+
+    def refresh(self, connection, column, ids):
+        if column not in REFRESH_COLUMNS:
+            raise ValueError(f'Cannot refresh the search index by {column}')
+        params = {'ids': list(ids)}
+        connection.execute(
+            text(
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT id FROM books WHERE {column} IN :ids)"
+            ).bindparams(bindparam('ids', expanding=True)),
+            params
+        )
+        connection.execute(
+            text(self._insert(f"WHERE b.{column} IN :ids")).bindparams(bindparam('ids', expanding=True)),
+            params
+        )
+
+    def remove(self, connection, book_ids):
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN :ids").bindparams(bindparam('ids', expanding=True)),
+            {'ids': list(book_ids)}
+        )
+
+    def apply(self, books_query, term):
+        # Quote every word so that user input can never be read as FTS5 query syntax
+        words = re.findall(r'\w+', term)
+        if not words:
+            return books_query.filter(false()), literal(0.0)
+        matches = text(
+            f"SELECT rowid AS book_id, -bm25({SEARCH_TABLE}, 10.0, 5.0, 2.0, 1.0) AS rank "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query"
+        ).bindparams(query=' '.join(f'"{word}"' for word in words)).columns(
+            book_id=Integer, rank=Float).subquery('search_matches')
+        return books_query.join(matches, matches.c.book_id == Book.id), matches.c.rank
+
+
+_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SqliteSearchBackend,
+}
+_backends = {}
+
+def get_search_backend(bind=None):
+    """Return the search backend for the given engine (the app's engine by default)."""
+    bind = bind if bind is not None else db.engine
+    engine = getattr(bind, 'engine', bind)
+    backend = _backends.get(engine.url)
+    if backend is None:
+        backend = _backends[engine.url] = _BACKENDS.get(engine.dialect.name, LikeSearchBackend)()
+    return backend
+
+def init_book_search():
+    """Create the search index if needed, populating it from the existing books."""
+    engine = db.engine
+    try:
+        with engine.begin() as connection:
+            backend = get_search_backend(engine)
+            if backend.create_index(connection):
+                backend.rebuild(connection)
+    except OperationalError as e:
+        # e.g. SQLite built without FTS5
+        current_app.logger.error(f"Full-text search index unavailable, falling back to LIKE search: {e}")
+        _backends[engine.url] = LikeSearchBackend()
+
+def rebuild_book_search():
+    """Rebuild the whole search index from the books table."""
+    connection = db.session.connection()
+    get_search_backend(connection).rebuild(connection)
+    db.session.commit()
+
+def _has_indexed_changes(obj):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in INDEXED_ATTRIBUTES[type(obj)])
+
+@event.listens_for(Session, 'before_flush')
+def _collect_deleted_categories(session, flush_context, instances):
+    # Deleting a category nulls its books' category_id during the flush,
+    # so remember which books to reindex while they can still be found.
+    category_ids = [obj.id for obj in session.deleted if isinstance(obj, BookCategory)]
+    if category_ids:
+        book_ids = session.connection().execute(
+            select(Book.id).where(Book.category_id.in_(category_ids))
+        ).scalars()
+        session.info.setdefault('book_search_refresh', set()).update(book_ids)
+
+@event.listens_for(Session, 'after_flush')
+def _sync_book_search(session, flush_context):
+    book_ids = session.info.pop('book_search_refresh', set())
+    author_ids, category_ids, removed_ids = set(), set(), set()
+
+    for obj in session.deleted:
+        if isinstance(obj, Book):
+            removed_ids.add(obj.id)
+    for obj in session.new:
+        if isinstance(obj, Book):
+            book_ids.add(obj.id)
+    for obj in session.dirty:
+        if type(obj) in INDEXED_ATTRIBUTES and _has_indexed_changes(obj):
+            if isinstance(obj, Book):
+                book_ids.add(obj.id)
+            elif isinstance(obj, Author):
+                author_ids.add(obj.id)
+            else:
+                category_ids.add(obj.id)
+
+    changes = {
+        'removed': removed_ids,
+        'id': book_ids - removed_ids,
+        'author_id': author_ids,
+        'category_id': category_ids,
+    }
+    if not any(changes.values()):
+        return
+
+    connection = session.connection()
+    backend = get_search_backend(connection)
+    if removed_ids:
+        backend.remove(connection, removed_ids)
+    for column in REFRESH_COLUMNS:
+        if changes[column]:
+            backend.refresh(connection, column, changes[column])
+
+    # The in-process trigram index only learns about changes once they are committed
+    pending = session.info.setdefault('trigram_index_pending', {})
+    for column, ids in changes.items():
+        pending.setdefault(column, set()).update(ids)
+
+@event.listens_for(Session, 'after_commit')
+def _mark_trigram_index_stale(session):
+    for column, ids in session.info.pop('trigram_index_pending', {}).items():
+        if ids:
+            trigram_index.mark_stale(column, ids)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_trigram_index_changes(session):
+    session.info.pop('trigram_index_pending', None)
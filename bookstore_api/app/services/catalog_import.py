@@ -0,0 +1,241 @@
+import csv
+import datetime
+import io
+import json
+import os
+import time
+
+from itertools import islice
+from sqlalchemy import select, text
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Book, Author, BookCategory
+from .book_search import get_search_backend, trigram_index
+from .response_cache import response_cache
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+# Columns written to books, in COPY order
+BOOK_IMPORT_COLUMNS = ('title', 'description', 'isbn', 'publication_year', 'author_id', 'category_id')
+# Columns an import updates on a book whose isbn already exists
+BOOK_UPSERT_COLUMNS = ('title', 'description', 'publication_year', 'author_id', 'category_id')
+MAX_REPORTED_ERRORS = 20
+
+
+def _dialect_insert(connection, model):
+    """INSERT supporting ON CONFLICT on PostgreSQL and SQLite."""
+    if connection.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert # pylint: disable=import-outside-toplevel
+    elif connection.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert # pylint: disable=import-outside-toplevel
+    else:
+        raise NotImplementedError(f'Catalog import needs ON CONFLICT support, {connection.dialect.name} has none')
+    return dialect_insert(model)
+
+def read_rows(path, file_format=None):
+    """Stream the rows of a CSV or JSONL file as dicts, without holding the file in memory."""
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+def parse_book_row(row):
+    """Validate a row, returns the book values with author and category names or raises ValueError."""
+    title = str(row.get('title') or '').strip()
+    isbn = str(row.get('isbn') or '').strip()
+    author = str(row.get('author') or '').strip()
+    if not title or len(title) > 500:
+        raise ValueError('title must be 1 to 500 characters long')
+    if len(isbn) != 13:
+        raise ValueError('isbn must be exactly 13 characters long')
+    if not author:
+        raise ValueError('author is required')
+
+    publication_year = row.get('publication_year')
+    if publication_year in (None, ''):
+        publication_year = None
+    else:
+        try:
+            publication_year = int(publication_year)
+        except (TypeError, ValueError):
+            raise ValueError('publication_year must be an integer') from None
+
+    return {
+        'title': title,
+        'description': row.get('description') or None,
+        'isbn': isbn,
+        'publication_year': publication_year,
+        'author': author[:120],
+        'category': str(row.get('category') or '').strip()[:100] or None,
+    }
+
+
+class NameCache:
+    """name -> id of an author or category table, missing names are upserted."""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+
+    def _select(self, connection, names):
+        rows = connection.execute(select(self.model.name, self.model.id).where(self.model.name.in_(names)))
+        self.ids.update(rows.all())
+
+    def resolve(self, connection, names):
+        missing = {name for name in names if name and name not in self.ids}
+        if missing:
+            self._select(connection, missing)
+            missing -= self.ids.keys()
+        if missing:
+            connection.execute(
+                _dialect_insert(connection, self.model).on_conflict_do_nothing(index_elements=['name']),
+                [{'name': name} for name in missing]
+            )
+            self._select(connection, missing)
+        return self.ids
+
+
+class CatalogImport:
+    """
+    Streaming import of books, with their authors and categories, from a
+    CSV or JSONL file with title, isbn, description, publication_year,
+    author and category columns. Books are upserted by isbn.
+
+    Rows are written `batch_size` at a time, in one statement per batch
+    (COPY into a staging table on PostgreSQL with psycopg2, a multi-row
+    INSERT otherwise), and each batch is committed with a checkpoint next to
+    the file so an interrupted import resumes where it stopped.
+    """
+
+    def __init__(self, path, batch_size=5000, file_format=None, resume=True, progress=None):
+        self.path = path
+        self.batch_size = batch_size
+        self.file_format = file_format
+        self.checkpoint_path = f'{path}.checkpoint'
+        self.resume = resume
+        self.progress = progress
+        self.authors = NameCache(Author)
+        self.categories = NameCache(BookCategory)
+        self.stats = {'rows': 0, 'imported': 0, 'skipped': 0, 'errors': [], 'rows_per_sec': 0.0}
+
+    def _read_checkpoint(self):
+        if not self.resume or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, encoding='utf-8') as checkpoint:
+            return json.load(checkpoint)['rows']
+
+    def _write_checkpoint(self, rows):
+        with open(self.checkpoint_path, 'w', encoding='utf-8') as checkpoint:
+            json.dump({'rows': rows}, checkpoint)
+
+    def run(self):
+        started_at = time.monotonic()
+        done = self._read_checkpoint()
+        rows = islice(read_rows(self.path, self.file_format), done, None)
+        self.stats['rows'] = self.stats['resumed_from'] = done
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self._import_batch(batch, first_line=self.stats['rows'] + 1)
+            self.stats['rows'] += len(batch)
+            self._write_checkpoint(self.stats['rows'])
+
+            elapsed = time.monotonic() - started_at
+            self.stats['rows_per_sec'] = (self.stats['rows'] - done) / elapsed if elapsed else 0.0
+            if self.progress:
+                self.progress(self.stats)
+
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        response_cache.invalidate('books', 'authors', 'categories')
+        return self.stats
+
+    def _import_batch(self, batch, first_line):
+        books = {}
+        for line, row in enumerate(batch, start=first_line):
+            try:
+                book = parse_book_row(row)
+            except ValueError as e:
+                self.stats['skipped'] += 1
+                if len(self.stats['errors']) < MAX_REPORTED_ERRORS:
+                    self.stats['errors'].append(f'row {line}: {e}')
+                continue
+            # The last row wins when an isbn repeats within a batch
+            books[book['isbn']] = book
+        if not books:
+            return
+
+        try:
+            connection = db.session.connection()
+            author_ids = self.authors.resolve(connection, {book['author'] for book in books.values()})
+            category_ids = self.categories.resolve(connection, {book['category'] for book in books.values()})
+            values = [
+                {
+                    **{column: book[column] for column in ('title', 'description', 'isbn', 'publication_year')},
+                    'author_id': author_ids[book['author']],
+                    'category_id': category_ids.get(book['category']),
+                }
+                for book in books.values()
+            ]
+
+            if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+                book_ids = self._copy_books(connection, values)
+            else:
+                book_ids = self._insert_books(connection, values)
+            get_search_backend(connection).refresh(connection, 'id', book_ids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # Names resolved in the rolled back transaction may not exist
+            self.authors.ids.clear()
+            self.categories.ids.clear()
+            raise
+
+        trigram_index.mark_stale('id', book_ids)
+        self.stats['imported'] += len(book_ids)
+
+    def _insert_books(self, connection, values):
+        statement = _dialect_insert(connection, Book)
+        statement = statement.on_conflict_do_update(
+            index_elements=['isbn'],
+            set_={
+                **{column: statement.excluded[column] for column in BOOK_UPSERT_COLUMNS},
+                'updated_at': datetime.datetime.now(),
+            }
+        ).returning(Book.id)
+        # Sent as multi-row VALUES batches (insertmanyvalues), not a statement per row
+        return connection.execute(statement, values).scalars().all()
+
+    def _copy_books(self, connection, values):
+        connection.execute(text(
+            'CREATE TEMPORARY TABLE IF NOT EXISTS book_import_staging '
+            '(title text, description text, isbn varchar(13), publication_year integer, '
+            'author_id integer, category_id integer) ON COMMIT DELETE ROWS'
+        ))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for book in values:
+            writer.writerow(['' if book[column] is None else book[column] for column in BOOK_IMPORT_COLUMNS])
+        buffer.seek(0)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY book_import_staging ({', '.join(BOOK_IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+        columns = ', '.join(BOOK_IMPORT_COLUMNS)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in BOOK_UPSERT_COLUMNS)
+        return connection.execute(text(
+            f'INSERT INTO books ({columns}, created_at, updated_at) '
+            f'SELECT {columns}, now(), now() FROM book_import_staging '
+            f'ON CONFLICT (isbn) DO UPDATE SET {updates}, updated_at = now() '
+            'RETURNING id'
+        )).scalars().all()
+
+
+def import_catalog(path, batch_size=5000, file_format=None, resume=True, progress=None):
+    """Import a catalog file, see CatalogImport. Returns the import stats."""
+    return CatalogImport(path, batch_size, file_format, resume, progress).run()
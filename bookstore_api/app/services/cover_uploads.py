@@ -0,0 +1,182 @@
+import datetime
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import select, update
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Book
+from .response_cache import response_cache
+from .storage import create_storage, content_key, HASH_CHUNK_SIZE
+from .storage_deletions import schedule_deletion
+
+# Book.cover_status values
+COVER_PENDING = 'pending'
+COVER_READY = 'ready'
+COVER_FAILED = 'failed'
+
+
+class CoverUploadPipeline:
+    """
+    Uploads book covers in the background so that requests never wait on S3.
+
+    The request spools the file to local disk and reserves the object key on
+    the book, whose cover_status stays pending until a worker thread has
+    uploaded the file (retrying with exponential backoff) and filled in
+    cover_image_url. An upload only lands if the book still expects its key,
+    so a newer cover or a deleted book wins over an upload still in flight.
+
+    Keys are the sha256 of the cover, so books sharing a cover share one
+    object: a cover already in storage is not uploaded again, and the
+    deletion outbox only deletes an object once no book references its key.
+
+    Covers a dead process left pending are settled by recover_stale.
+    """
+
+    def __init__(self, app=None, storage=None):
+        self.storage = storage
+        self.executor = None
+        self.uploaded = 0
+        self.deduplicated = 0
+        self._futures = set()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, storage)
+
+    def init_app(self, app, storage=None):
+        self.storage = storage or create_storage(app)
+        self.spool_dir = app.config['COVER_UPLOAD_SPOOL_DIR'] or os.path.join(
+            tempfile.gettempdir(), 'bookstore_cover_uploads')
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.max_retries = app.config['COVER_UPLOAD_MAX_RETRIES']
+        self.retry_backoff = app.config['COVER_UPLOAD_RETRY_BACKOFF']
+        self.stale_after = app.config['COVER_UPLOAD_STALE_AFTER']
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config['COVER_UPLOAD_WORKERS'], thread_name_prefix='cover-upload')
+        app.extensions['cover_uploads'] = self
+
+    def spool(self, file_storage):
+        """
+        Save an uploaded file to the spool directory, hashing it on the way.
+        Returns the spooled upload, whose `key` is the object key to reserve
+        on the book.
+        """
+        path = os.path.join(self.spool_dir, str(uuid.uuid4()))
+        sha256 = hashlib.sha256()
+        with open(path, 'wb') as spooled:
+            for chunk in iter(lambda: file_storage.stream.read(HASH_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+                spooled.write(chunk)
+        extension = file_storage.filename.rsplit('.', 1)[-1] if '.' in file_storage.filename else ''
+        return {
+            'key': content_key(sha256.hexdigest(), extension),
+            'path': path,
+            'content_type': file_storage.content_type
+        }
+
+    def discard(self, upload):
+        """Drop a spooled upload which will not be submitted."""
+        if os.path.exists(upload['path']):
+            os.remove(upload['path'])
+
+    def submit(self, book_id, upload):
+        """Upload a spooled file for a book in the background."""
+        future = self.executor.submit(self._run, current_app._get_current_object(), book_id, upload)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def wait(self, timeout=None):
+        """Block until every upload submitted so far is done."""
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.result(timeout)
+
+    def _upload_with_retries(self, upload):
+        if self.storage.exists(upload['key']):
+            # Same bytes as a cover already stored
+            self.deduplicated += 1
+            return self.storage.url(upload['key'])
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                url = self.storage.upload(upload['path'], upload['key'], upload['content_type'])
+                self.uploaded += 1
+                return url
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_backoff * 2 ** attempt
+                current_app.logger.warning(
+                    f"Cover upload {upload['key']} failed (attempt {attempt + 1}), retrying in {delay}s: {e}")
+                time.sleep(delay)
+
+    def _set_cover(self, book_id, key, **values):
+        # Only if the book still expects this cover
+        result = db.session.execute(
+            update(Book).where(Book.id == book_id, Book.cover_image_s3_key == key).values(**values)
+        )
+        if result.rowcount == 0 and values.get('cover_image_url'):
+            # Superseded by another cover or the book is gone
+            schedule_deletion(key)
+        db.session.commit()
+
+    def recover_stale(self, max_age=None):
+        """
+        Settle the covers pending for over `max_age` seconds (COVER_UPLOAD_STALE_AFTER
+        by default), whose upload died with the process running it: ready if the
+        object made it to storage, failed otherwise. Spooled files as old are
+        removed. Returns how many covers became ready and how many failed.
+        """
+        cutoff = datetime.datetime.now() - datetime.timedelta(seconds=max_age or self.stale_after)
+        stale = db.session.execute(
+            select(Book.id, Book.cover_image_s3_key).where(Book.cover_status == COVER_PENDING, Book.updated_at < cutoff)
+        ).all()
+        ready = failed = 0
+        for book_id, key in stale:
+            url = self.storage.url(key) if key and self.storage.exists(key) else None
+            self._set_cover(book_id, key, cover_image_url=url, cover_status=COVER_READY if url else COVER_FAILED)
+            if url:
+                ready += 1
+            else:
+                failed += 1
+        if stale:
+            response_cache.invalidate('books')
+
+        for entry in os.scandir(self.spool_dir):
+            if entry.is_file() and datetime.datetime.fromtimestamp(entry.stat().st_mtime) < cutoff:
+                os.remove(entry.path)
+        return ready, failed
+
+    def _run(self, app, book_id, upload):
+        with app.app_context():
+            try:
+                try:
+                    url = self._upload_with_retries(upload)
+                except Exception as e:
+                    current_app.logger.error(f"Giving up on cover upload {upload['key']} for book {book_id}: {e}")
+                    url = None
+
+                self._set_cover(
+                    book_id, upload['key'], cover_image_url=url, cover_status=COVER_READY if url else COVER_FAILED)
+                response_cache.invalidate('books')
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Error finishing cover upload {upload['key']} for book {book_id}: {e}")
+            finally:
+                self.discard(upload)
+
+
+cover_uploads = CoverUploadPipeline()
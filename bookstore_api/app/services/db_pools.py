@@ -0,0 +1,237 @@
+import logging
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+
+from bookstore_api.app.extensions import db
+from .replicas import replica_router
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """
+    Checkouts and connection churn of a pool, counted through its events:
+    connections in use and at most in use, how long checkouts waited for a
+    connection and how many gave up, connections opened, closed and invalidated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.opened = 0
+        self.closed = 0
+        self.invalidated = 0
+
+    def listen(self, pool):
+        event.listen(pool, 'connect', self._connect)
+        event.listen(pool, 'checkout', self._checkout)
+        event.listen(pool, 'checkin', self._checkin)
+        event.listen(pool, 'close', self._close)
+        event.listen(pool, 'close_detached', self._close)
+        event.listen(pool, 'invalidate', self._invalidate)
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def _connect(self, dbapi_connection, connection_record):
+        connection_record.info['pid'] = os.getpid()
+        with self._lock:
+            self.opened += 1
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        if connection_record.info.get('pid', os.getpid()) != os.getpid():
+            # Opened before the worker was forked, its socket belongs to the parent: leave
+            # it alone and have the pool open another one
+            connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+            raise exc.DisconnectionError('Connection opened by another process')
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def _checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def _close(self, dbapi_connection, *args):
+        with self._lock:
+            self.closed += 1
+
+    def _invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidated += 1
+
+    def stats(self, pool):
+        with self._lock:
+            stats = {
+                'pool': type(pool).__name__,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'checkouts': self.checkouts,
+                'checkout_timeouts': self.timeouts,
+                'checkout_wait_max_ms': round(self.wait_max * 1000, 3),
+                'checkout_wait_mean_ms': (
+                    round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else None),
+                'connections_opened': self.opened,
+                'connections_closed': self.closed,
+                'connections_invalidated': self.invalidated,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({'size': pool.size(), 'idle': pool.checkedin(), 'overflow': max(0, pool.overflow())})
+        return stats
+
+
+class MeteredPoolMixin:
+    """A pool keeping PoolMetrics, and timing how long checkouts wait for a connection."""
+
+    def __init__(self, *args, _dispatch=None, **kwargs):
+        super().__init__(*args, _dispatch=_dispatch, **kwargs)
+        # A pool recreated by engine.dispose() gets its events along with _dispatch, and
+        # its metrics from recreate()
+        if _dispatch is None:
+            self.metrics = PoolMetrics()
+            self.metrics.listen(self)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            logger.warning(f"Database pool exhausted, checkout timed out: {self.status()}")
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+# Pools log under sqlalchemy.pool like the pools they extend, rather than under this
+# module, a child of the app's logger
+
+
+class MeteredQueuePool(MeteredPoolMixin, QueuePool):
+    _sqla_logger_namespace = 'sqlalchemy.pool.impl.QueuePool'
+
+
+class MeteredNullPool(MeteredPoolMixin, NullPool):
+    _sqla_logger_namespace = 'sqlalchemy.pool.impl.NullPool'
+
+
+# Engine options of the DB_POOL_PROFILE choices
+POOL_PROFILES = {
+    # One process serving requests from threads (flask run, gunicorn gthread)
+    'threaded': {
+        'poolclass': MeteredQueuePool, 'pool_size': 10, 'max_overflow': 10, 'pool_timeout': 10,
+        'pool_recycle': 1800, 'pool_pre_ping': True,
+    },
+    # Forked workers serving one request at a time (gunicorn sync), each with its own pool.
+    # Background cover uploads and deletion drains need a few connections besides the request's.
+    'prefork': {
+        'poolclass': MeteredQueuePool, 'pool_size': 2, 'max_overflow': 3, 'pool_timeout': 5,
+        'pool_recycle': 1800, 'pool_pre_ping': True,
+    },
+    # PgBouncer in transaction mode pools the server connections, a pool here would only
+    # hold on to them
+    'pgbouncer': {
+        'poolclass': MeteredNullPool,
+    },
+}
+
+
+def _sets_statement_timeout(config, url):
+    # PgBouncer refuses startup options, set the timeout on its database role instead
+    return (url.get_backend_name() == 'postgresql' and config['DB_POOL_PROFILE'] != 'pgbouncer'
+            and bool(config['DB_STATEMENT_TIMEOUT']))
+
+
+def engine_options(config, uri):
+    """
+    Options of the engine of the database at `uri`: the DB_POOL_PROFILE's,
+    DB_POOL_SIZE/DB_MAX_OVERFLOW, PostgreSQL's statement timeout, then
+    SQLALCHEMY_ENGINE_OPTIONS. In-memory SQLite databases keep Flask-SQLAlchemy's
+    StaticPool.
+    """
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+
+    profile = config['DB_POOL_PROFILE']
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Unknown DB_POOL_PROFILE {profile!r}, expected one of {', '.join(POOL_PROFILES)}")
+    options = dict(POOL_PROFILES[profile])
+    if 'pool_size' in options:
+        for name, key in (('pool_size', 'DB_POOL_SIZE'), ('max_overflow', 'DB_MAX_OVERFLOW')):
+            if config.get(key) is not None:
+                options[name] = config[key]
+    if _sets_statement_timeout(config, url):
+        options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"}
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def _no_statement_timeout(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('SET statement_timeout = 0')
+    cursor.close()
+
+
+class DatabasePools:
+    """
+    Connection pools of the database engines, configured by DB_POOL_PROFILE.
+    init_app has to run before db.init_app, which creates the engines. The
+    replicas' engines use the same options.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config, app.config['SQLALCHEMY_DATABASE_URI'])
+        app.extensions['db_pools'] = self
+
+    def lift_statement_timeout(self):
+        """
+        Run this process's statements without DB_STATEMENT_TIMEOUT, which is meant
+        for requests: the CLI batch jobs call it before their long statements. The
+        connections opened so far are closed, the next ones reset the timeout.
+        """
+        engines = [db.engine] + [replica.engine for replica in replica_router.replicas]
+        for engine in engines:
+            if not _sets_statement_timeout(current_app.config, engine.url):
+                continue
+            if not event.contains(engine, 'connect', _no_statement_timeout):
+                event.listen(engine, 'connect', _no_statement_timeout)
+            engine.dispose()
+
+    def stats(self):
+        """Metrics of this worker's pools: the primary's, then each replica's."""
+        engines = [('primary', db.engine)] + [
+            (f'replica {index}', replica.engine) for index, replica in enumerate(replica_router.replicas)
+        ]
+        return [
+            {'engine': name, **engine.pool.metrics.stats(engine.pool)}
+            for name, engine in engines if hasattr(engine.pool, 'metrics')
+        ]
+
+
+db_pools = DatabasePools()
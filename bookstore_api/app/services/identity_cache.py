@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.helpers.ttl_cache import TTLCache
+from bookstore_api.app.models import User, Role
+
+
+@dataclass(frozen=True)
+class AuthenticatedRole:
+    id: int
+    name: str
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """
+    Read-only snapshot of the authenticated user and their role, what
+    `get_current_user()` returns. Load the User model for anything else.
+    """
+    id: int
+    username: str
+    email: str
+    role_id: int
+    role: AuthenticatedRole
+
+
+class IdentityCache:
+    """
+    Per-worker cache of AuthenticatedUser snapshots keyed by the token's
+    identity (the user id), so authenticating a request does not hit the
+    database.
+
+    Commits touching a user or a role invalidate this worker's entries right
+    away. Other workers only see the change once their entries expire, so a
+    role change can take up to IDENTITY_CACHE_TTL seconds to apply everywhere.
+    """
+
+    def __init__(self, app=None):
+        self._entries = TTLCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self._entries = TTLCache(maxsize=app.config['IDENTITY_CACHE_MAX_ENTRIES'], ttl=app.config['IDENTITY_CACHE_TTL'])
+        app.extensions['identity_cache'] = self
+
+    def get(self, identity):
+        """Return the snapshot of the user with the given identity, or None when there is no such user."""
+        user = self._entries.get(str(identity))
+        if user is None:
+            user = self._load(int(identity))
+            if user is not None:
+                self._entries.set(str(identity), user)
+        return user
+
+    def _load(self, user_id):
+        # The user and their role in a single round trip
+        row = db.session.execute(
+            select(User.id, User.username, User.email, Role.id, Role.name).join(User.role).where(User.id == user_id)
+        ).one_or_none()
+        if row is None:
+            return None
+        user_id, username, email, role_id, role_name = row
+        return AuthenticatedUser(user_id, username, email, role_id, AuthenticatedRole(role_id, role_name))
+
+    def invalidate(self, *identities):
+        for identity in identities:
+            self._entries.delete(str(identity))
+
+    def clear(self):
+        self._entries.clear()
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_identity_changes(session, flush_context):
+    changed = session.info.setdefault('identity_cache_pending', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+        elif isinstance(obj, Role):
+            # A role is shared by many users, drop them all
+            changed.add(None)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_identity_cache(session):
+    changed = session.info.pop('identity_cache_pending', set())
+    if None in changed:
+        identity_cache.clear()
+    else:
+        identity_cache.invalidate(*changed)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_identity_changes(session):
+    session.info.pop('identity_cache_pending', None)
@@ -0,0 +1,169 @@
+import json
+import logging
+import re
+import time
+
+from collections import Counter
+from flask import current_app, g, request, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+NPLUS1_MODES = ('off', 'warn', 'raise')
+# Bind placeholders of every paramstyle, an expanded IN list of them becomes a single one
+# so that lookups of any number of ids share a shape
+_PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)'
+IN_LIST = re.compile(rf'\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+
+class NPlusOneError(Exception):
+    """A request ran the same SELECT over and over, the way lazy loads in a loop do."""
+
+
+def statement_shape(statement):
+    """The statement with its whitespace and IN lists normalized."""
+    return IN_LIST.sub('(?)', WHITESPACE.sub(' ', statement).strip())
+
+
+class RequestQueries:
+    """Statements a request ran: how many, the time spent in them, and the SELECTs by shape."""
+
+    __slots__ = ('count', 'seconds', 'shapes', 'started', 'status', 'streamed')
+
+    def __init__(self, track_shapes):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter() if track_shapes else None
+        self.started = time.perf_counter()
+        self.status = None
+        self.streamed = False
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        if self.shapes is not None and statement.lstrip()[:6].upper() == 'SELECT':
+            self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """Shapes run at least `threshold` times, most repeated first."""
+        if self.shapes is None:
+            return []
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+class QueryMetrics:
+    """
+    Counts the SQL statements of each request and the time spent in them,
+    through the cursor execute events of every engine (the primary's and
+    the replicas').
+
+    Every response gets a Server-Timing header with the database time and
+    the statement count (SQL_SERVER_TIMING). Every request is logged as a
+    JSON line once it is done, streamed responses included, at WARNING when
+    its database time exceeds SQL_SLOW_REQUEST_MS.
+
+    SQL_NPLUS1_MODE reports requests running the same SELECT
+    SQL_NPLUS1_THRESHOLD times or more, the N+1 pattern of relationships
+    lazy loaded while dumping a list, streamed responses once their body is
+    sent. warn logs them. raise is for the tests, it fails the request with
+    NPlusOneError, which the test client re-raises, when app.testing is set
+    and warns otherwise: the request's writes are committed by then.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if app.config['SQL_NPLUS1_MODE'] not in NPLUS1_MODES:
+            raise ValueError(
+                f"Unknown SQL_NPLUS1_MODE {app.config['SQL_NPLUS1_MODE']!r}, "
+                f"expected one of {', '.join(NPLUS1_MODES)}"
+            )
+        self.server_timing = app.config['SQL_SERVER_TIMING']
+        self.slow_request_ms = app.config['SQL_SLOW_REQUEST_MS']
+        self.nplus1_mode = app.config['SQL_NPLUS1_MODE']
+        self.nplus1_threshold = app.config['SQL_NPLUS1_THRESHOLD']
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._log)
+        app.extensions['query_metrics'] = self
+
+    def _start(self):
+        g.sql_queries = RequestQueries(track_shapes=self.nplus1_mode != 'off')
+
+    def _finish(self, response):
+        queries = g.get('sql_queries')
+        if queries is None:
+            return response
+        queries.status = response.status_code
+        app, method, path = current_app._get_current_object(), request.method, request.path
+        if self.server_timing:
+            app_ms = (time.perf_counter() - queries.started) * 1000
+            response.headers.add(
+                'Server-Timing', f'db;dur={queries.seconds * 1000:.2f};desc="{queries.count} queries"')
+            response.headers.add('Server-Timing', f'app;dur={app_ms:.2f}')
+        if response.is_streamed:
+            # A body streamed with stream_with_context runs its statements after the request
+            # is torn down, count them too, then check and log once the response is closed
+            queries.streamed = True
+
+            def close():
+                self._write_log(app, method, path, queries)
+                self._check_nplus1(app, method, path, queries)
+            response.call_on_close(close)
+        else:
+            self._check_nplus1(app, method, path, queries)
+        return response
+
+    def _check_nplus1(self, app, method, path, queries):
+        repeated = queries.repeated(self.nplus1_threshold)
+        if not repeated:
+            return
+        message = f"N+1 queries in {method} {path}: " + '; '.join(
+            f'{count}x {shape}' for shape, count in repeated)
+        if self.nplus1_mode == 'raise' and app.testing:
+            raise NPlusOneError(message)
+        app.logger.warning(message)
+
+    def _log(self, exception=None):
+        queries = g.get('sql_queries')
+        if queries is None or queries.streamed:
+            return
+        self._write_log(current_app, request.method, request.path, queries, exception)
+
+    def _write_log(self, app, method, path, queries, exception=None):
+        record = {
+            'method': method,
+            'path': path,
+            'status': queries.status if exception is None else 500,
+            'queries': queries.count,
+            'db_ms': round(queries.seconds * 1000, 2),
+            'duration_ms': round((time.perf_counter() - queries.started) * 1000, 2),
+        }
+        level = logging.WARNING if record['db_ms'] >= self.slow_request_ms else logging.INFO
+        app.logger.log(level, json.dumps(record), extra={'sql_metrics': record})
+
+
+query_metrics = QueryMetrics()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info['query_started'].pop()
+    queries = g.get('sql_queries') if has_app_context() else None
+    if queries is not None:
+        queries.record(statement, seconds)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _failed_cursor_execute(exception_context):
+    # after_cursor_execute never comes for a failed statement
+    started = exception_context.connection.info.get('query_started') if exception_context.connection else None
+    if started:
+        started.pop()
@@ -0,0 +1,22 @@
+import redis
+
+
+def create_redis_client(app):
+    """
+    Redis client built from the app's REDIS_* configuration. Clients are
+    created once per app so every user shares the same connection pool.
+    """
+    client = app.extensions.get('redis_client')
+    if client is None:
+        pool = redis.ConnectionPool(
+            host=app.config['REDIS_HOST'],
+            port=app.config['REDIS_PORT'],
+            db=app.config['REDIS_DB'],
+            max_connections=app.config['REDIS_MAX_CONNECTIONS'],
+            socket_timeout=app.config['REDIS_SOCKET_TIMEOUT'],
+            socket_connect_timeout=app.config['REDIS_SOCKET_CONNECT_TIMEOUT'],
+            health_check_interval=app.config['REDIS_HEALTH_CHECK_INTERVAL'],
+            decode_responses=True
+        )
+        client = app.extensions['redis_client'] = redis.Redis(connection_pool=pool)
+    return client
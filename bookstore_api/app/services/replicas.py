@@ -0,0 +1,165 @@
+import random
+import threading
+import time
+
+from flask import current_app, g, request, has_app_context
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from redis import RedisError
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from .redis_client import create_redis_client
+
+# Set on the client for REPLICA_PIN_SECONDS after a write, its reads go to the primary meanwhile
+READ_PRIMARY_COOKIE = 'read_primary'
+# The same, in Redis, for the user who wrote, whichever client they read from next
+READ_PRIMARY_KEY = 'read_primary:{}'
+# Requests which only read
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Blueprint of routes/resources, the only reads sent to replicas
+REPLICA_BLUEPRINTS = ('api',)
+
+POSTGRES_LAG_QUERY = text(
+    'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
+
+class Replica:
+    """A read replica's engine and its last known replication lag."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.lag = None
+        self.healthy = False
+        self.checked_at = None
+        self.error = None
+        self._checking = threading.Lock()
+
+    def measure_lag(self):
+        """Seconds the replica is behind the primary, 0 for databases without replication (SQLite)."""
+        with self.engine.connect() as connection:
+            if connection.dialect.name == 'postgresql':
+                return float(connection.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+            connection.execute(text('SELECT 1'))
+            return 0.0
+
+    def check(self, max_lag):
+        # A single thread checks, the others go on with the last known state
+        if not self._checking.acquire(blocking=False):
+            return
+        try:
+            self.lag = self.measure_lag()
+            self.healthy = self.lag <= max_lag
+            self.error = None
+        except Exception as e:
+            self.lag = None
+            self.healthy = False
+            self.error = str(e)
+            current_app.logger.warning(f"Replica {self.engine.url!r} is unreachable, out of rotation: {e}")
+        finally:
+            self.checked_at = time.monotonic()
+            self._checking.release()
+
+    def stats(self):
+        return {
+            'url': self.engine.url.render_as_string(hide_password=True),
+            'healthy': self.healthy,
+            'lag': self.lag,
+            'error': self.error,
+        }
+
+
+class ReplicaRouter:
+    """
+    Routes the reads of the API's GET requests to the read replicas of
+    SQLALCHEMY_REPLICA_URIS, see RoutingSession. Everything else, and every
+    request while there are no replicas, uses the primary.
+
+    Each request picks a random replica among those whose lag, checked at
+    most every REPLICA_CHECK_INTERVAL seconds, is within REPLICA_MAX_LAG.
+    A client which wrote gets a cookie sending its reads to the primary for
+    REPLICA_PIN_SECONDS, so it reads its own writes. The user who wrote is
+    pinned in Redis for as long, so their other clients (or a client
+    dropping cookies) read their writes too.
+    """
+
+    def __init__(self, app=None):
+        self.replicas = []
+        self.client = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        engine_options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        self.replicas = [
+            Replica(create_engine(uri, **engine_options)) for uri in app.config['SQLALCHEMY_REPLICA_URIS']
+        ]
+        self.max_lag = app.config['REPLICA_MAX_LAG']
+        self.check_interval = app.config['REPLICA_CHECK_INTERVAL']
+        self.pin_seconds = app.config['REPLICA_PIN_SECONDS']
+        self.client = create_redis_client(app)
+        app.before_request(self._route_request)
+        app.after_request(self._pin_writer)
+        app.extensions['replicas'] = self
+
+    def pick(self):
+        """The engine of a replica in rotation, or None if none is."""
+        now = time.monotonic()
+        for replica in self.replicas:
+            if replica.checked_at is None or now - replica.checked_at >= self.check_interval:
+                replica.check(self.max_lag)
+        in_rotation = [replica for replica in self.replicas if replica.healthy]
+        return random.choice(in_rotation).engine if in_rotation else None
+
+    def _route_request(self):
+        g.db_replica = None
+        if (
+            self.replicas and request.method in SAFE_METHODS and request.blueprint in REPLICA_BLUEPRINTS
+            and not request.cookies.get(READ_PRIMARY_COOKIE) and not self._identity_pinned()
+        ):
+            g.db_replica = self.pick()
+
+    def _identity_pinned(self):
+        try:
+            # The endpoint verifies the token again, and rejects the request if it is invalid
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            return True
+        if identity is None:
+            return False
+        try:
+            return bool(self.client.exists(READ_PRIMARY_KEY.format(identity)))
+        except RedisError as e:
+            current_app.logger.warning(f"Could not check whether user {identity} reads from the primary: {e}")
+            return True
+
+    def _pin_writer(self, response):
+        if self.replicas and request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                READ_PRIMARY_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+            try:
+                identity = get_jwt_identity()
+            except RuntimeError:
+                # Not an authenticated endpoint
+                identity = None
+            if identity is not None:
+                try:
+                    self.client.setex(READ_PRIMARY_KEY.format(identity), self.pin_seconds, 1)
+                except RedisError as e:
+                    current_app.logger.warning(f"Could not pin user {identity} to the primary: {e}")
+        return response
+
+    def stats(self):
+        return [replica.stats() for replica in self.replicas]
+
+
+replica_router = ReplicaRouter()
+
+
+@event.listens_for(Session, 'after_flush')
+def _read_own_writes(session, flush_context):
+    # Once a request has written, the rest of its reads go to the primary too
+    if has_app_context() and g.get('db_replica') is not None:
+        g.db_replica = None
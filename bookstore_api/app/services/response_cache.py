@@ -0,0 +1,172 @@
+import hashlib
+import json
+import math
+import threading
+
+from functools import wraps
+from flask import request, make_response, current_app, g
+from flask_jwt_extended import get_jwt_identity
+from redis import RedisError
+
+from bookstore_api.app.helpers.ttl_cache import TTLCache
+from .redis_client import create_redis_client
+
+# Headers replayed on a cache hit
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class LRUCacheBackend:
+    """In-process backend, for tests and single worker deployments."""
+
+    def __init__(self, max_entries):
+        self._entries = TTLCache(maxsize=max_entries)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value, timeout):
+        self._entries.set(key, value, ttl=timeout)
+
+    def get_versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump_versions(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class RedisCacheBackend:
+    """Backend shared by every worker through Redis."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        value = self.client.get(f'response:{key}')
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, timeout):
+        self.client.setex(f'response:{key}', timeout, json.dumps(value))
+
+    def get_versions(self, tags):
+        return [int(version or 0) for version in self.client.mget([f'response_tag:{tag}' for tag in tags])]
+
+    def bump_versions(self, tags):
+        pipeline = self.client.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr(f'response_tag:{tag}')
+        pipeline.execute()
+
+
+class ResponseCache:
+    """
+    Cache for GET responses, invalidated by tag.
+
+    Every tag has a version number which is part of the cache key of the
+    responses tagged with it, so invalidating a tag is a single increment
+    and the stale entries simply age out.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.timeout = None
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_type = (app.config.get('CACHE_TYPE') or 'null').lower()
+        if cache_type == 'redis':
+            self.backend = RedisCacheBackend(create_redis_client(app))
+        elif cache_type in ('lru', 'simple'):
+            self.backend = LRUCacheBackend(app.config['CACHE_MAX_ENTRIES'])
+        else:
+            self.backend = None
+        self.timeout = app.config['CACHE_DEFAULT_TIMEOUT']
+        app.extensions['response_cache'] = self
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+        }
+
+    def invalidate(self, *tags):
+        """Invalidate every cached response tagged with any of the tags."""
+        if self.backend is None:
+            return
+        try:
+            self.backend.bump_versions(tags)
+        except RedisError as e:
+            current_app.logger.error(f"Error invalidating response cache tags {tags}: {e}")
+
+    def _make_key(self, tags, vary_on_user):
+        args = sorted(request.args.items(multi=True))
+        versions = self.backend.get_versions(tags)
+        identity = get_jwt_identity() if vary_on_user else None
+        raw_key = json.dumps([request.path.rstrip('/'), args, identity, list(zip(tags, versions))])
+        return hashlib.sha1(raw_key.encode()).hexdigest()
+
+    def cached(self, tags, vary_on_user=False):
+        """
+        Cache successful GET responses of a view.
+
+        `tags` is a list of tag names, or a callable building it from the view's
+        keyword arguments. Use `vary_on_user` when the response depends on who
+        asks rather than only on their role.
+        """
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if self.backend is None or request.method != 'GET':
+                    return f(*args, **kwargs)
+
+                tag_names = list(tags(**kwargs) if callable(tags) else tags)
+                try:
+                    key = self._make_key(tag_names, vary_on_user)
+                    entry = self.backend.get(key)
+                except RedisError as e:
+                    current_app.logger.error(f"Response cache unavailable: {e}")
+                    return f(*args, **kwargs)
+
+                if entry is not None:
+                    self.hits += 1
+                    response = make_response(entry['body'], entry['status'])
+                    response.headers.update(entry['headers'])
+                    response.headers['X-Cache'] = 'HIT'
+                    # Answer If-None-Match/If-Modified-Since from the replayed validators
+                    return response.make_conditional(request)
+
+                self.misses += 1
+                response = make_response(f(*args, **kwargs))
+                if response.status_code == 200:
+                    entry = {
+                        'status': response.status_code,
+                        'headers': {
+                            name: response.headers[name] for name in CACHED_HEADERS if name in response.headers
+                        },
+                        'body': response.get_data(as_text=True),
+                    }
+                    timeout = self.timeout
+                    if g.get('db_replica') is not None:
+                        # Read from a replica which may not have the write which bumped the
+                        # tags yet, keep it no longer than the replica may lag behind
+                        timeout = min(timeout, max(1, math.ceil(current_app.config['REPLICA_MAX_LAG'])))
+                    try:
+                        self.backend.set(key, entry, timeout)
+                    except RedisError as e:
+                        current_app.logger.error(f"Error storing response in cache: {e}")
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
@@ -2,16 +2,20 @@ import os
 import uuid
 import boto3
 
+from botocore.exceptions import ClientError
 from flask import current_app
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# AWS_S3_ENDPOINT_URL points the client at an S3 compatible emulator (MinIO,
+# moto server, LocalStack) in development and tests
 s3_client = boto3.client(
     's3', 
     aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
     aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_S3_REGION_NAME')
+    region_name=os.getenv('AWS_S3_REGION_NAME'),
+    endpoint_url=os.getenv('AWS_S3_ENDPOINT_URL') or None
 )
 
 def upload_photo_to_s3(file_data, file_name):
@@ -28,16 +32,33 @@ def upload_photo_to_s3(file_data, file_name):
             }
         )
 
-        public_url = public_url = (
-            f"https://{os.getenv('AWS_S3_BUCKET_NAME')}"
-            f".s3.{os.getenv('AWS_S3_REGION_NAME')}"
-            f".amazonaws.com/{s3_key}"
-        )
-        return public_url, s3_key
+        return get_s3_public_url(s3_key), s3_key
     except Exception as e:
         current_app.logger.error(f"Failed to upload file {file_name} to S3: {e}")
         return None, None
 
+def get_s3_public_url(s3_key):
+    """Public URL of an object of the bucket."""
+    if os.getenv('AWS_S3_ENDPOINT_URL'):
+        return f"{os.getenv('AWS_S3_ENDPOINT_URL').rstrip('/')}/{os.getenv('AWS_S3_BUCKET_NAME')}/{s3_key}"
+    return (
+        f"https://{os.getenv('AWS_S3_BUCKET_NAME')}"
+        f".s3.{os.getenv('AWS_S3_REGION_NAME')}"
+        f".amazonaws.com/{s3_key}"
+    )
+
+def upload_file_to_s3(path, s3_key, content_type):
+    """Uploads a local file to the S3 bucket under the given key and returns its public URL. Errors are raised."""
+    s3_client.upload_file(
+        path,
+        os.getenv('AWS_S3_BUCKET_NAME'),
+        s3_key,
+        ExtraArgs={
+            'ContentType': content_type,
+        }
+    )
+    return get_s3_public_url(s3_key)
+
 def delete_photo_from_s3(s3_key):
     """Deletes a photo from the specified S3 bucket."""
     try:
@@ -49,3 +70,45 @@ def delete_photo_from_s3(s3_key):
     except Exception as e:
         current_app.logger.error(f"Failed to delete file {s3_key} from S3: {e}")
         return False
+
+def create_presigned_upload(s3_key, content_type, max_size, expires_in):
+    """
+    Presigned POST letting a client upload an object straight to the bucket,
+    only under the given key, with the given content type and at most
+    `max_size` bytes. Returns the form's url and fields.
+    """
+    return s3_client.generate_presigned_post(
+        os.getenv('AWS_S3_BUCKET_NAME'),
+        s3_key,
+        Fields={'Content-Type': content_type},
+        Conditions=[
+            {'Content-Type': content_type},
+            ['content-length-range', 1, max_size],
+        ],
+        ExpiresIn=expires_in
+    )
+
+def delete_objects_from_s3(s3_keys):
+    """
+    Deletes up to 1000 objects from the S3 bucket in a single request. Returns
+    the keys which could not be deleted, with their error.
+    """
+    response = s3_client.delete_objects(
+        Bucket=os.getenv('AWS_S3_BUCKET_NAME'),
+        Delete={'Objects': [{'Key': s3_key} for s3_key in s3_keys], 'Quiet': True}
+    )
+    return {error['Key']: error.get('Message', error.get('Code')) for error in response.get('Errors', [])}
+
+def s3_object_exists(s3_key):
+    """Whether the bucket has an object under the given key."""
+    return get_s3_object_metadata(s3_key) is not None
+
+def get_s3_object_metadata(s3_key):
+    """Size and content type of an object of the bucket, None when there is no such object."""
+    try:
+        head = s3_client.head_object(Bucket=os.getenv('AWS_S3_BUCKET_NAME'), Key=s3_key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+    return {'size': head['ContentLength'], 'content_type': head.get('ContentType')}
@@ -0,0 +1,93 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+
+from .s3_utils import (
+    upload_file_to_s3, delete_photo_from_s3, delete_objects_from_s3, s3_object_exists, get_s3_public_url
+)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_key(digest, extension, prefix='covers'):
+    """Content-addressed object key: the same bytes always map to the same key."""
+    return f'{prefix}/{digest}.{extension.lower()}' if extension else f'{prefix}/{digest}'
+
+
+class StorageBackend(ABC):
+    """Object storage for book covers, objects are addressed by key."""
+
+    @abstractmethod
+    def exists(self, key):
+        """Whether an object is stored under the key."""
+
+    @abstractmethod
+    def upload(self, path, key, content_type):
+        """Store a local file under the key and return its URL. Errors are raised."""
+
+    @abstractmethod
+    def url(self, key):
+        """Public URL of the object stored under the key."""
+
+    @abstractmethod
+    def delete(self, key):
+        """Delete an object, returns whether it succeeded."""
+
+    def delete_many(self, keys):
+        """Delete objects, returns the keys which could not be deleted with their error."""
+        return {key: 'delete failed' for key in keys if not self.delete(key)}
+
+
+class S3Storage(StorageBackend):
+    def exists(self, key):
+        return s3_object_exists(key)
+
+    def upload(self, path, key, content_type):
+        return upload_file_to_s3(path, key, content_type)
+
+    def url(self, key):
+        return get_s3_public_url(key)
+
+    def delete(self, key):
+        return delete_photo_from_s3(key)
+
+    def delete_many(self, keys):
+        # A single DeleteObjects request, S3 takes at most 1000 keys
+        return delete_objects_from_s3(keys)
+
+
+class LocalStorage(StorageBackend):
+    """Stand-in for S3 keeping objects in a local directory, for development and tests."""
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, *key.split('/'))
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def upload(self, path, key, content_type):
+        destination = self._path(key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(path, destination)
+        return self.url(key)
+
+    def url(self, key):
+        return f'file://{self._path(key)}'
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        return True
+
+
+def create_storage(app):
+    """Storage backend picked by COVER_UPLOAD_BACKEND (s3 or local)."""
+    if app.config['COVER_UPLOAD_BACKEND'] == 'local':
+        return LocalStorage(app.config['COVER_UPLOAD_LOCAL_DIR'])
+    return S3Storage()
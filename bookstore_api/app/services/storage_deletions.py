@@ -0,0 +1,159 @@
+import datetime
+import threading
+
+from flask import current_app
+from sqlalchemy import event, select, text, inspect
+from sqlalchemy.orm import Session
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Book, StorageDeletion
+from .storage import create_storage
+
+# S3's DeleteObjects limit
+MAX_DELETE_BATCH = 1000
+
+
+def schedule_deletion(key):
+    """
+    Queue a storage object for deletion in the current transaction. The
+    caller commits. The object survives if a book uses its key again by the
+    time it is drained.
+    """
+    if key:
+        db.session.add(StorageDeletion(key=key))
+        db.session.info['storage_deletions_scheduled'] = True
+
+def lock_storage_keys(connection, keys):
+    """
+    Serialize the transactions writing a storage key on a book with the
+    drainer deleting it, so a content-addressed object can't be deleted
+    just as a new book starts using it. PostgreSQL only, other databases
+    serialize writers anyway.
+    """
+    if connection.dialect.name != 'postgresql':
+        return
+    for key in sorted(set(keys)):
+        connection.execute(text('SELECT pg_advisory_xact_lock(hashtext(:key))'), {'key': key})
+
+
+class StorageDeletionDrainer:
+    """
+    Deletes the objects queued in the storage_deletions outbox, in batches of
+    up to STORAGE_DELETION_BATCH_SIZE keys per storage request.
+
+    Each worker runs a background thread draining the outbox every
+    STORAGE_DELETION_DRAIN_INTERVAL seconds, and right after a commit which
+    queued deletions. Failed deletions are retried with exponential backoff.
+    """
+
+    def __init__(self, app=None, storage=None):
+        self.storage = storage
+        self.deleted = 0
+        self.failed = 0
+        self._app = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        if app is not None:
+            self.init_app(app, storage)
+
+    def init_app(self, app, storage=None):
+        self.storage = storage or create_storage(app)
+        self.batch_size = min(app.config['STORAGE_DELETION_BATCH_SIZE'], MAX_DELETE_BATCH)
+        self.interval = app.config['STORAGE_DELETION_DRAIN_INTERVAL']
+        self.retry_backoff = app.config['STORAGE_DELETION_RETRY_BACKOFF']
+        self.max_backoff = app.config['STORAGE_DELETION_MAX_BACKOFF']
+        self._app = app
+        # Only processes serving requests drain in the background, not CLI commands
+        app.before_request(self._start)
+        app.extensions['storage_deletions'] = self
+
+    def _start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name='storage-deletions', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            with self._app.app_context():
+                try:
+                    self.drain()
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.error(f"Error draining storage deletions: {e}")
+
+    def drain(self):
+        """Process every deletion due now. Returns how many objects were deleted and how many failed."""
+        deleted = failed = 0
+        while True:
+            batch_deleted, batch_failed, batch_size = self._drain_batch()
+            deleted += batch_deleted
+            failed += batch_failed
+            if batch_size < self.batch_size:
+                return deleted, failed
+
+    def _drain_batch(self):
+        now = datetime.datetime.now()
+        # A locking read, which has to run on the primary
+        rows = StorageDeletion.query.filter(StorageDeletion.next_attempt_at <= now).order_by(
+            StorageDeletion.id).limit(self.batch_size).with_for_update(skip_locked=True).execution_options(
+            primary=True).all()
+        if not rows:
+            db.session.commit()
+            return 0, 0, 0
+
+        keys = {row.key for row in rows}
+        lock_storage_keys(db.session.connection(), keys)
+        # Keys some book uses again (content-addressed covers) must stay
+        referenced = set(db.session.execute(
+            select(Book.cover_image_s3_key).where(Book.cover_image_s3_key.in_(keys)).distinct()
+        ).scalars())
+        to_delete = sorted(keys - referenced)
+
+        try:
+            failures = self.storage.delete_many(to_delete) if to_delete else {}
+        except Exception as e:
+            failures = {key: str(e) for key in to_delete}
+
+        for row in rows:
+            if row.key in failures:
+                row.attempts += 1
+                row.last_error = failures[row.key]
+                backoff = min(self.retry_backoff * 2 ** (row.attempts - 1), self.max_backoff)
+                row.next_attempt_at = now + datetime.timedelta(seconds=backoff)
+            else:
+                db.session.delete(row)
+        db.session.commit()
+
+        if failures:
+            current_app.logger.warning(f"Could not delete {len(failures)} storage objects, will retry: {failures}")
+        self.deleted += len(to_delete) - len(failures)
+        self.failed += len(failures)
+        return len(to_delete) - len(failures), len(failures), len(rows)
+
+
+storage_deletions = StorageDeletionDrainer()
+
+
+@event.listens_for(Session, 'before_flush')
+def _lock_new_storage_keys(session, flush_context, instances):
+    keys = [
+        obj.cover_image_s3_key for obj in (*session.new, *session.dirty)
+        if isinstance(obj, Book) and obj.cover_image_s3_key
+        and inspect(obj).attrs.cover_image_s3_key.history.added
+    ]
+    if keys:
+        lock_storage_keys(session.connection(), keys)
+
+@event.listens_for(Session, 'after_commit')
+def _wake_drainer(session):
+    if session.info.pop('storage_deletions_scheduled', False):
+        storage_deletions.wake()
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_scheduled_deletions(session):
+    session.info.pop('storage_deletions_scheduled', None)
@@ -0,0 +1,103 @@
+import time
+
+from flask import current_app
+from redis import RedisError
+
+from bookstore_api.app.helpers.ttl_cache import TTLCache
+from .redis_client import create_redis_client
+
+
+class TokenBlocklist:
+    """
+    Revoked tokens, kept in Redis so every worker sees them.
+
+    A single token is revoked by its jti until it expires. Every user also has
+    a token generation, embedded in their tokens as the `gen` claim, and
+    revoking all of a user's tokens just bumps it: Redis holds one counter
+    per user rather than one key per token issued.
+
+    Each worker remembers for BLOCKLIST_CACHE_TTL seconds which tokens Redis
+    said were not revoked, so the common path of an authenticated request
+    does not touch the network. Revoking through this worker takes effect
+    immediately, a revocation made through another worker is enforced here
+    at most BLOCKLIST_CACHE_TTL seconds later.
+    """
+
+    def __init__(self, app=None):
+        self.client = None
+        self._not_revoked = TTLCache()
+        self._generations = TTLCache()
+        self.local_hits = 0
+        self.redis_lookups = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.client = create_redis_client(app)
+        self._not_revoked = TTLCache(
+            maxsize=app.config['BLOCKLIST_CACHE_MAX_ENTRIES'], ttl=app.config['BLOCKLIST_CACHE_TTL'])
+        self._generations = TTLCache(
+            maxsize=app.config['BLOCKLIST_CACHE_MAX_ENTRIES'], ttl=app.config['BLOCKLIST_CACHE_TTL'])
+        app.extensions['token_blocklist'] = self
+
+    def stats(self):
+        lookups = self.local_hits + self.redis_lookups
+        return {
+            'local_hits': self.local_hits,
+            'redis_lookups': self.redis_lookups,
+            'local_hit_ratio': self.local_hits / lookups if lookups else None,
+            'staleness_bound_seconds': self._not_revoked.ttl,
+        }
+
+    @staticmethod
+    def _generation_key(identity):
+        return f'token_generation:{identity}'
+
+    def get_generation(self, identity):
+        """Current token generation of a user, the `gen` claim of the tokens issued to them now."""
+        return int(self.client.get(self._generation_key(identity)) or 0)
+
+    def revoke(self, jti, expires_at):
+        """Revoke a token until its expiry (the `exp` claim, a unix timestamp)."""
+        expires_in = int(expires_at - time.time()) + 1
+        if expires_in > 0:
+            self.client.setex(jti, expires_in, 'true')
+        self._not_revoked.delete(jti)
+
+    def revoke_all(self, identity):
+        """Revoke every token issued to a user so far."""
+        generation = self.client.incr(self._generation_key(identity))
+        self._generations.set(str(identity), generation)
+        return generation
+
+    def is_revoked(self, jwt_payload):
+        jti, identity = jwt_payload['jti'], str(jwt_payload['sub'])
+        token_generation = jwt_payload.get('gen', 0)
+
+        generation = self._generations.get(identity)
+        if generation is not None and token_generation < generation:
+            return True
+        if self._not_revoked.get(jti):
+            self.local_hits += 1
+            return False
+
+        self.redis_lookups += 1
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.get(jti)
+            pipeline.get(self._generation_key(identity))
+            revoked_jti, generation = pipeline.execute()
+        except RedisError as e:
+            # Fail closed, a token can't be trusted when its revocation can't be checked
+            current_app.logger.error(f"Token blocklist unavailable: {e}")
+            return True
+
+        generation = int(generation or 0)
+        self._generations.set(identity, generation)
+        revoked = revoked_jti is not None or token_generation < generation
+        if not revoked:
+            self._not_revoked.set(jti, True)
+        return revoked
+
+
+token_blocklist = TokenBlocklist()
@@ -0,0 +1,149 @@
+import re
+import threading
+import time
+
+from collections import Counter, defaultdict
+
+
+def trigrams(value):
+    """pg_trgm style trigrams: every lowercased word padded with two leading spaces and one trailing."""
+    grams = set()
+    for word in re.findall(r'\w+', value.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def similarity(grams, other_grams):
+    """Share of trigrams two strings have in common, as in pg_trgm's similarity()."""
+    if not grams or not other_grams:
+        return 0.0
+    return len(grams & other_grams) / len(grams | other_grams)
+
+def word_similarity(term, term_grams, value):
+    """
+    Best similarity between the term and any run of as many consecutive words
+    of the value, an approximation of pg_trgm's word_similarity().
+    """
+    words = re.findall(r'\w+', value.lower())
+    size = max(1, len(re.findall(r'\w+', term)))
+    if len(words) <= size:
+        return similarity(term_grams, trigrams(value))
+    return max(
+        similarity(term_grams, trigrams(' '.join(words[start:start + size])))
+        for start in range(len(words) - size + 1)
+    )
+
+
+def _index(postings, documents, book_id, values):
+    _unindex(postings, documents, book_id)
+    values = tuple(value for value in values if value)
+    documents[book_id] = values
+    for gram in set().union(*(trigrams(value) for value in values)):
+        postings[gram].add(book_id)
+
+def _unindex(postings, documents, book_id):
+    values = documents.pop(book_id, None)
+    if values is None:
+        return
+    for gram in set().union(*(trigrams(value) for value in values)):
+        postings[gram].discard(book_id)
+        if not postings[gram]:
+            del postings[gram]
+
+
+class TrigramIndex:
+    """
+    In-process inverted index from trigrams to book ids, the fuzzy search
+    fallback for databases without pg_trgm.
+
+    Writes only mark books as stale, they are reloaded by the next search
+    through the loader given to `refresh`. Books are read from the database
+    outside of the lock searches take, a rebuild swapping in the new index
+    once it is complete.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._documents = {}
+        self._pending = defaultdict(set)
+        self._lock = threading.Lock()
+        # Held by the one search refreshing the index
+        self._refresh_lock = threading.Lock()
+        self.built_at = None
+
+    def mark_stale(self, column, ids):
+        """Queue books whose `column` (id, author_id, category_id or removed) is in ids for a reload."""
+        with self._lock:
+            self._pending[column].update(ids)
+
+    def refresh(self, load_documents, max_age):
+        """
+        Bring the index up to date before a search.
+
+        `load_documents(column, ids)` yields (book_id, values) rows, for every
+        book when column is None. The index is rebuilt from scratch once it is
+        older than `max_age` seconds, which bounds how long the writes of other
+        processes go unseen, otherwise only stale books are reloaded. While
+        another search refreshes a built index, the index is searched as it is.
+        """
+        if not self._refresh_lock.acquire(blocking=self.built_at is None):
+            return
+        try:
+            if self.built_at is None or time.monotonic() - self.built_at > max_age:
+                self._rebuild(load_documents)
+            else:
+                self._reload(load_documents)
+        finally:
+            self._refresh_lock.release()
+
+    def _rebuild(self, load_documents):
+        started = time.monotonic()
+        # Books marked from now on are reloaded by the next refresh
+        with self._lock:
+            self._pending = defaultdict(set)
+        postings, documents = defaultdict(set), {}
+        for book_id, values in load_documents(None, None):
+            _index(postings, documents, book_id, values)
+        with self._lock:
+            self._postings, self._documents = postings, documents
+            self.built_at = started
+
+    def _reload(self, load_documents):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(set)
+        if not pending:
+            return
+        removed = pending.pop('removed', ())
+        rows = {column: list(load_documents(column, ids)) for column, ids in pending.items()}
+        with self._lock:
+            for book_id in removed:
+                _unindex(self._postings, self._documents, book_id)
+            for book_id in pending.get('id', ()):
+                _unindex(self._postings, self._documents, book_id)
+            for column_rows in rows.values():
+                for book_id, values in column_rows:
+                    _index(self._postings, self._documents, book_id, values)
+
+    def search(self, term, threshold, limit):
+        """Return up to `limit` (book_id, score) pairs scoring at least `threshold`, best first."""
+        term_grams = trigrams(term)
+        if not term_grams:
+            return []
+
+        with self._lock:
+            shared = Counter()
+            for gram in term_grams:
+                shared.update(self._postings.get(gram, ()))
+            # Similarity can never exceed the share of the term's trigrams a book has
+            candidates = {
+                book_id: self._documents[book_id]
+                for book_id, count in shared.items() if count / len(term_grams) >= threshold
+            }
+
+        scores = []
+        for book_id, values in candidates.items():
+            score = max(word_similarity(term, term_grams, value) for value in values)
+            if score >= threshold:
+                scores.append((book_id, score))
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores[:limit]
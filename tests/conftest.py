@@ -0,0 +1,165 @@
+import os
+import tempfile
+
+# The configuration is read when the app is imported: an in-memory SQLite database,
+# the in-process response cache and local cover storage, under TestConfig
+os.environ.pop('FLASK_ENV', None)
+os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+os.environ['SQLALCHEMY_REPLICA_URIS'] = ''
+os.environ['SECRET_KEY'] = 'test-secret-key'
+os.environ['JWT_SECRET_KEY'] = 'test-jwt-secret-key-long-enough-for-hs256'
+os.environ['JWT_ALGORITHM'] = 'HS256'
+os.environ['CACHE_TYPE'] = 'lru'
+os.environ['COVER_UPLOAD_BACKEND'] = 'local'
+os.environ['COVER_UPLOAD_LOCAL_DIR'] = tempfile.mkdtemp(prefix='bookstore-covers-')
+os.environ['STORAGE_DELETION_DRAIN_INTERVAL'] = '0'
+os.environ['SQL_NPLUS1_MODE'] = 'raise'
+
+import pytest
+import redis
+from flask_jwt_extended import create_access_token
+
+from bookstore_api.app import create_app
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Author, Book, BookCategory, Review, Role, User
+from bookstore_api.app.services import book_search, catalog_import
+from bookstore_api.app.services.trigram_index import TrigramIndex
+
+
+class FakeRedis:
+    """The Redis commands the app uses, on a dict. `down` makes every command fail like an unreachable server."""
+
+    def __init__(self, *args, **kwargs):
+        self.data = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise redis.ConnectionError('Redis is down')
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self._check()
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, *args, **kwargs):
+        self._check()
+        self.data[key] = str(value)
+
+    def setex(self, key, seconds, value):
+        self.set(key, value)
+
+    def incr(self, key, amount=1):
+        self._check()
+        self.data[key] = str(int(self.data.get(key, 0)) + amount)
+        return int(self.data[key])
+
+    def delete(self, *keys):
+        self._check()
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def exists(self, *keys):
+        self._check()
+        return sum(key in self.data for key in keys)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((getattr(self.client, name), args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(redis, 'Redis', FakeRedis)
+    # Every test has a database of its own, the in-process fuzzy search index too
+    trigram_index = TrigramIndex()
+    monkeypatch.setattr(book_search, 'trigram_index', trigram_index)
+    monkeypatch.setattr(catalog_import, 'trigram_index', trigram_index)
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def fake_redis(app):
+    return app.extensions['redis_client']
+
+
+def _get_or_add(model, **values):
+    row = model.query.filter_by(**values).one_or_none()
+    if row is None:
+        row = model(**values)
+        db.session.add(row)
+        db.session.flush()
+    return row
+
+def seed_catalog(books=20, reviewers=3):
+    """
+    Adds books by five authors in three categories, and reviewers reviewing
+    every book, those of earlier calls included. Returns the admin and the
+    new reviewers.
+    """
+    admin_role, user_role = _get_or_add(Role, name='admin'), _get_or_add(Role, name='user')
+    admin = _get_or_add(User, username='admin', email='admin@example.com', password_hash='-', role_id=admin_role.id)
+    authors = [_get_or_add(Author, name=f'author {i}') for i in range(5)]
+    categories = [_get_or_add(BookCategory, name=f'category {i}') for i in range(3)]
+    first_book, first_user = Book.query.count(), User.query.count()
+    db.session.add_all([
+        Book(
+            title=f'Book {i:03d}', isbn=f'{9780000000000 + i}', author_id=authors[i % 5].id,
+            category_id=categories[i % 3].id, publication_year=1990 + i % 30
+        )
+        for i in range(first_book, first_book + books)
+    ])
+    users = [
+        User(username=f'reader{i}', email=f'reader{i}@example.com', password_hash='-', role_id=user_role.id)
+        for i in range(first_user, first_user + reviewers)
+    ]
+    db.session.add_all(users)
+    db.session.flush()
+    db.session.add_all([
+        Review(rating=1 + (book.id + j) % 5, comment='-', user_id=user.id, book_id=book.id)
+        for book in Book.query for j, user in enumerate(users)
+    ])
+    db.session.commit()
+    return admin, users
+
+
+@pytest.fixture
+def catalog(app):
+    """The seeded catalog's users: (admin token, reader token, reader id)."""
+    with app.app_context():
+        admin, users = seed_catalog()
+        return (
+            create_access_token(identity=str(admin.id)), create_access_token(identity=str(users[0].id)),
+            users[0].id
+        )
+
+
+def auth(token):
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,20 @@
+from werkzeug.security import generate_password_hash
+
+from bookstore_api.app.models import Role, User
+
+
+def test_login_without_redis(app, client, catalog, fake_redis):
+    with app.app_context():
+        role = Role.query.filter_by(name='user').one()
+        User(
+            username='newcomer', email='newcomer@example.com', password_hash=generate_password_hash('Secret-123'),
+            role_id=role.id
+        ).save()
+    credentials = {'email': 'newcomer@example.com', 'password': 'Secret-123'}
+    assert client.post('/api/auth/login', json=credentials).status_code == 200
+
+    # The token's generation can't be read, no token is issued
+    fake_redis.down = True
+    response = client.post('/api/auth/login', json=credentials)
+    assert response.status_code == 503
+    assert 'access_token' not in response.get_data(as_text=True)
@@ -0,0 +1,90 @@
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Book
+from .conftest import auth
+
+
+def new_book(i, **values):
+    return {'title': f'Batch book {i}', 'isbn': f'{9781000000000 + i}', 'author_id': 1, **values}
+
+
+def test_book_batch_results(client, catalog):
+    admin, _, _ = catalog
+    response = client.post('/api/v1/books:batch', headers=auth(admin), json={'items': [
+        new_book(1),
+        new_book(2, isbn=f'{9781000000000 + 1}'),
+        {'isbn': '123'},
+        new_book(3, author_id=999),
+        new_book(4, category_id=1),
+    ]})
+    assert response.status_code == 207
+    data = response.get_json()['data']
+    assert [result['status'] for result in data['results']] == [201, 409, 400, 404, 201]
+    assert (data['succeeded'], data['failed']) == (2, 3)
+    assert data['results'][4]['book']['title'] == 'Batch book 4'
+
+    first_id = data['results'][0]['book']['id']
+    response = client.patch('/api/v1/books:batch', headers=auth(admin), json=[
+        {'id': first_id, 'title': 'Renamed'},
+        {'id': 9999, 'title': 'Missing'},
+    ])
+    assert response.status_code == 207
+    assert [result['status'] for result in response.get_json()['data']['results']] == [200, 404]
+
+    # Every item succeeding
+    response = client.patch(
+        '/api/v1/books:batch', headers=auth(admin), json=[{'id': first_id, 'publication_year': 2001}])
+    assert response.status_code == 200
+
+
+def test_batch_limits(app, client, catalog):
+    admin, _, _ = catalog
+    app.config['BATCH_MAX_ITEMS'] = 2
+    response = client.post('/api/v1/books:batch', headers=auth(admin), json=[new_book(i) for i in range(3)])
+    assert response.status_code == 400
+    assert 'limited to 2 items' in response.get_json()['error']
+    assert client.post('/api/v1/books:batch', headers=auth(admin), json=[]).status_code == 400
+    with app.app_context():
+        assert Book.query.filter(Book.title.like('Batch book%')).count() == 0
+
+
+def test_book_batch_invalidates_the_cache(client, catalog):
+    admin, _, _ = catalog
+    url = '/api/v1/books?search=batch&search_mode=prefix&fields=title'
+    assert client.get(url, headers=auth(admin)).get_json()['data']['books'] == []
+    assert client.get(url, headers=auth(admin)).headers.get('X-Cache') == 'HIT'
+
+    client.post('/api/v1/books:batch', headers=auth(admin), json=[new_book(1)])
+    response = client.get(url, headers=auth(admin))
+    assert response.headers.get('X-Cache') != 'HIT'
+    assert response.get_json()['data']['books'] == [{'title': 'Batch book 1'}]
+
+
+def test_review_batch_updates_ratings_and_cache(app, client, catalog):
+    admin, reader, _ = catalog
+    book_id = client.post('/api/v1/books:batch', headers=auth(admin), json=[new_book(1)]).get_json()[
+        'data']['results'][0]['book']['id']
+    url = f'/api/v1/reviews/book/{book_id}'
+    assert client.get(url, headers=auth(reader)).get_json()['data']['reviews'] == []
+
+    response = client.post('/api/v1/reviews:batch', headers=auth(reader), json=[
+        {'book_id': book_id, 'rating': 4, 'comment': 'Good'},
+        {'book_id': book_id, 'rating': 1, 'comment': 'Again'},
+        {'book_id': 9999, 'rating': 5},
+        {'book_id': book_id, 'rating': 9},
+    ])
+    assert response.status_code == 207
+    results = response.get_json()['data']['results']
+    assert [result['status'] for result in results] == [201, 409, 404, 400]
+    assert [review['rating'] for review in client.get(url, headers=auth(reader)).get_json()['data']['reviews']] == [4]
+
+    # Only the owner updates a review
+    review_id = results[0]['review']['id']
+    response = client.patch('/api/v1/reviews:batch', headers=auth(admin), json=[{'id': review_id, 'rating': 1}])
+    assert [result['status'] for result in response.get_json()['data']['results']] == [403]
+    response = client.patch('/api/v1/reviews:batch', headers=auth(reader), json=[{'id': review_id, 'rating': 2}])
+    assert response.status_code == 200
+
+    with app.app_context():
+        book = db.session.get(Book, book_id)
+        assert (book.review_count, book.average_rating, book.rating_2_count, book.rating_4_count) == (1, 2.0, 1, 0)
+    assert [review['rating'] for review in client.get(url, headers=auth(reader)).get_json()['data']['reviews']] == [2]
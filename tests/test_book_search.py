@@ -0,0 +1,22 @@
+import pytest
+
+from .conftest import auth
+
+
+@pytest.mark.parametrize('search_mode, term', [('prefix', 'author 1'), ('fuzzy', 'autor 1')])
+def test_search_matches_author_names(client, catalog, search_mode, term):
+    admin, _, _ = catalog
+    response = client.get(
+        f'/api/v1/books?search={term}&search_mode={search_mode}&per_page=50&fields=id,author.name',
+        headers=auth(admin))
+    assert response.status_code == 200
+    books = response.get_json()['data']['books']
+    # Each matching book once, whichever of its names matched
+    assert len(books) == len({book['id'] for book in books})
+    assert {'author 1'} <= {book['author']['name'] for book in books}
+
+
+def test_prefix_search_matches_titles(client, catalog):
+    admin, _, _ = catalog
+    response = client.get('/api/v1/books?search=book 01&search_mode=prefix&fields=title', headers=auth(admin))
+    assert [book['title'] for book in response.get_json()['data']['books']] == [f'Book 01{i}' for i in range(10)]
@@ -0,0 +1,23 @@
+import pytest
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Book
+from .conftest import auth
+
+
+@pytest.mark.parametrize('sort_order', ['asc', 'desc'])
+def test_unrated_books_come_last(app, client, catalog, sort_order):
+    admin, _, _ = catalog
+    with app.app_context():
+        for book in Book.query:
+            book.average_rating = None if book.id % 2 else book.id / 10
+        db.session.commit()
+
+    url = f'/api/v1/books?sort_by=rating&sort_order={sort_order}&per_page=20&fields=id,average_rating'
+    offset_page = client.get(url, headers=auth(admin)).get_json()['data']['books']
+    cursor_page = client.get(f'{url}&cursor=', headers=auth(admin)).get_json()['data']['books']
+    ratings = [book['average_rating'] for book in offset_page]
+    assert ratings[:10] == sorted(ratings[:10], reverse=sort_order == 'desc')
+    assert ratings[10:] == [None] * 10
+    # Both paginations list the books in the same order
+    assert offset_page == cursor_page
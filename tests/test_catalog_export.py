@@ -0,0 +1,14 @@
+from .conftest import auth
+
+
+def test_export_filters(client, catalog):
+    admin, _, _ = catalog
+    response = client.get('/api/v1/books/export?author_id=1&format=csv', headers=auth(admin))
+    assert response.status_code == 200
+    rows = response.get_data(as_text=True).splitlines()
+    assert len(rows) == 1 + 4 and all(',author 0,' in row for row in rows[1:])
+
+    # Rejected before the export starts streaming
+    response = client.get('/api/v1/books/export?author_id=abc', headers=auth(admin))
+    assert response.status_code == 400
+    assert 'author_id must be an integer' in response.get_data(as_text=True)
@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+from bookstore_api.app.models import Author, Book
+from bookstore_api.app.services import import_catalog
+from bookstore_api.app.services.catalog_import import CatalogImport
+
+CSV_HEADER = 'title,isbn,description,publication_year,author,category\n'
+
+
+def test_import_is_idempotent(app, tmp_path):
+    path = tmp_path / 'catalog.csv'
+    path.write_text(
+        CSV_HEADER
+        + 'Dune,9780000000001,Desert planet,1965,Frank Herbert,Science fiction\n'
+        + 'Children of Dune,9780000000002,,1976,Frank Herbert,Science fiction\n'
+        + 'No isbn,,,,Someone,\n'
+        + 'Emma,9780000000003,,1815,Jane Austen,\n',
+        encoding='utf-8'
+    )
+    with app.app_context():
+        stats = import_catalog(str(path), batch_size=2)
+        assert (stats['rows'], stats['imported'], stats['skipped']) == (4, 3, 1)
+        assert stats['errors'] == ['row 3: isbn must be exactly 13 characters long']
+        assert not os.path.exists(f'{path}.checkpoint')
+        emma = Book.query.filter_by(isbn='9780000000003').one()
+        assert (emma.author.name, emma.category, emma.publication_year) == ('Jane Austen', None, 1815)
+
+        # Running it again updates the books in place
+        path.write_text(path.read_text(encoding='utf-8').replace('Desert planet', 'Spice'), encoding='utf-8')
+        assert import_catalog(str(path), batch_size=2)['imported'] == 3
+        assert Book.query.count() == 3 and Author.query.count() == 2
+        assert Book.query.filter_by(isbn='9780000000001').one().description == 'Spice'
+
+
+def test_interrupted_import_resumes(app, tmp_path, monkeypatch):
+    path = tmp_path / 'catalog.jsonl'
+    path.write_text(''.join(
+        json.dumps({'title': f'Book {i}', 'isbn': f'{9780000000000 + i}', 'author': f'Author {i % 2}'}) + '\n'
+        for i in range(5)
+    ), encoding='utf-8')
+    insert_books = CatalogImport._insert_books
+
+    def failing_insert(self, connection, values):
+        if any(book['isbn'] == '9780000000002' for book in values):
+            raise RuntimeError('connection lost')
+        return insert_books(self, connection, values)
+
+    monkeypatch.setattr(CatalogImport, '_insert_books', failing_insert)
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            import_catalog(str(path), batch_size=2)
+        # The first batch is committed and checkpointed, the failed one rolled back
+        assert Book.query.count() == 2
+        assert json.loads((tmp_path / 'catalog.jsonl.checkpoint').read_text(encoding='utf-8')) == {'rows': 2}
+
+    monkeypatch.setattr(CatalogImport, '_insert_books', insert_books)
+    result = app.test_cli_runner().invoke(args=['seed', 'import', str(path), '--batch-size', '2'])
+    assert 'Imported 3 books from 5 rows' in result.output
+    with app.app_context():
+        assert Book.query.count() == 5
+    assert not os.path.exists(f'{path}.checkpoint')
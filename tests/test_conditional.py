@@ -0,0 +1,22 @@
+import pytest
+
+from .conftest import auth
+
+
+@pytest.mark.parametrize('url', ['/api/v1/authors/1', '/api/v1/books/1'])
+def test_category_rename_changes_the_etag(client, catalog, url):
+    admin, _, _ = catalog
+    etag = client.get(url, headers=auth(admin)).headers['ETag']
+    assert client.get(url, headers={**auth(admin), 'If-None-Match': etag}).status_code == 304
+
+    response = client.put('/api/v1/book_categories/1', json={'name': 'Renamed'}, headers=auth(admin))
+    assert response.status_code == 200
+    response = client.get(url, headers={**auth(admin), 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_missing_entity(client, catalog):
+    admin, _, _ = catalog
+    assert client.get('/api/v1/authors/999', headers=auth(admin)).status_code == 404
+    assert client.get('/api/v1/reviews/999', headers=auth(admin)).status_code == 404
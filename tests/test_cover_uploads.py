@@ -0,0 +1,31 @@
+import datetime
+
+from sqlalchemy import update
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Book
+from bookstore_api.app.services import cover_uploads, COVER_PENDING
+
+
+def test_stale_covers_are_settled(app, catalog, tmp_path):
+    spooled = tmp_path / 'cover.png'
+    spooled.write_bytes(b'cover')
+    with app.app_context():
+        cover_uploads.storage.upload(str(spooled), 'covers/uploaded.png', 'image/png')
+        long_ago = datetime.datetime.now() - datetime.timedelta(hours=2)
+        for book_id, key, updated_at in (
+            (1, 'covers/uploaded.png', long_ago), (2, 'covers/lost.png', long_ago),
+            # Possibly still uploading
+            (3, 'covers/recent.png', datetime.datetime.now()),
+        ):
+            db.session.execute(update(Book).where(Book.id == book_id).values(
+                cover_image_s3_key=key, cover_status=COVER_PENDING, updated_at=updated_at))
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['seed', 'stale-covers'])
+    assert '1 stale covers found in storage, 1 marked as failed' in result.output
+    with app.app_context():
+        books = {book.id: book for book in Book.query.filter(Book.id.in_([1, 2, 3]))}
+        assert books[1].cover_status == 'ready' and books[1].cover_image_url.endswith('uploaded.png')
+        assert books[2].cover_status == 'failed' and books[2].cover_image_url is None
+        assert books[3].cover_status == COVER_PENDING
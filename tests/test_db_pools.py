@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from bookstore_api.app.services.db_pools import MeteredNullPool, MeteredQueuePool, engine_options
+from .conftest import auth
+
+CONFIG = {
+    'DB_POOL_PROFILE': 'threaded', 'DB_POOL_SIZE': None, 'DB_MAX_OVERFLOW': None,
+    'DB_STATEMENT_TIMEOUT': 30000, 'SQLALCHEMY_ENGINE_OPTIONS': {},
+}
+
+
+def test_profiles():
+    options = engine_options(CONFIG, 'postgresql://db/bookstore')
+    assert options['poolclass'] is MeteredQueuePool
+    assert options['connect_args'] == {'options': '-c statement_timeout=30000'}
+
+    options = engine_options({**CONFIG, 'DB_POOL_PROFILE': 'prefork', 'DB_POOL_SIZE': 4}, 'postgresql://db/bookstore')
+    assert (options['pool_size'], options['max_overflow']) == (4, 3)
+
+    # PgBouncer pools the connections and refuses startup options
+    options = engine_options({**CONFIG, 'DB_POOL_PROFILE': 'pgbouncer'}, 'postgresql://db/bookstore')
+    assert options == {'poolclass': MeteredNullPool}
+
+    # In-memory SQLite keeps Flask-SQLAlchemy's single connection
+    assert engine_options(CONFIG, 'sqlite://') == {}
+
+    with pytest.raises(ValueError):
+        engine_options({**CONFIG, 'DB_POOL_PROFILE': 'unknown'}, 'postgresql://db/bookstore')
+
+
+def test_pool_metrics(tmp_path):
+    options = engine_options({**CONFIG, 'DB_POOL_SIZE': 1, 'DB_MAX_OVERFLOW': 0}, f'sqlite:///{tmp_path}/pool.db')
+    engine = create_engine(f'sqlite:///{tmp_path}/pool.db', **{**options, 'pool_timeout': 0.1})
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+        assert engine.pool.metrics.stats(engine.pool)['in_use'] == 1
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    stats = engine.pool.metrics.stats(engine.pool)
+    assert stats['in_use'] == 0 and stats['peak_in_use'] == 1
+    assert stats['checkouts'] == 1 and stats['checkout_timeouts'] == 1
+    assert stats['connections_opened'] == 1 and stats['idle'] == 1
+
+    # The pool engine.dispose() recreates keeps counting
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert engine.pool.metrics.stats(engine.pool)['checkouts'] == 2
+    engine.dispose()
+
+
+def test_stats_endpoint(client, catalog):
+    admin, reader, _ = catalog
+    assert client.get('/api/v1/stats', headers=auth(reader)).status_code == 403
+    response = client.get('/api/v1/stats', headers=auth(admin))
+    assert response.status_code == 200
+    assert set(response.get_json()['data']) == {'database', 'response_cache', 'token_blocklist'}
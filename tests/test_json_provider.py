@@ -0,0 +1,40 @@
+import datetime
+import decimal
+
+import pytest
+from flask import Flask
+
+from bookstore_api.app.helpers import FastJSONProvider, api_response
+from bookstore_api.app.helpers.json_provider import orjson
+
+PAYLOAD = {
+    'title': 'Les Misérables — “Fantine”',
+    'average_rating': float('nan'),
+    'ratings': [float('inf'), float('-inf'), 4.5],
+    'price': decimal.Decimal('12.50'),
+    'created_at': datetime.datetime(2025, 1, 1, 12, 30, 0, 123),
+    'published_on': datetime.date(1862, 4, 3),
+}
+
+
+def encode(provider, debug):
+    app = Flask(__name__)
+    app.config['JSON_PROVIDER'] = provider
+    app.debug = debug
+    app.json = FastJSONProvider(app)
+    with app.test_request_context():
+        return api_response(PAYLOAD).get_data(), app.json.dumps(PAYLOAD)
+
+
+@pytest.mark.parametrize('debug', [False, True])
+def test_stdlib_output(debug):
+    response, text = encode('stdlib', debug)
+    assert 'Les Misérables — “Fantine”'.encode() in response
+    assert b'NaN' not in response and b'Infinity' not in response
+    assert '"average_rating":null' in text
+
+
+@pytest.mark.skipif(orjson is None, reason='orjson is not installed')
+@pytest.mark.parametrize('debug', [False, True])
+def test_providers_write_the_same_json(debug):
+    assert encode('orjson', debug) == encode('stdlib', debug)
@@ -0,0 +1,51 @@
+"""
+Statements each read endpoint runs, counted by services.query_metrics.
+Relationships are loaded by the endpoints' loader plans, so the counts do
+not grow with the catalog, and TestConfig fails a request running the
+same SELECT over and over (NPlusOneError).
+"""
+import pytest
+from flask import g
+
+from .conftest import auth, seed_catalog
+
+# Statements per request: the validators, then the page and its eager loads, the
+# authenticated user coming from the identity cache
+ENDPOINTS = [
+    ('/api/v1/books?per_page=20', 3),
+    ('/api/v1/books?per_page=20&fields=id,title,author.name', 2),
+    ('/api/v1/books?per_page=20&cursor=', 3),
+    ('/api/v1/books/1', 3),
+    ('/api/v1/authors', 4),
+    ('/api/v1/authors/1', 4),
+    ('/api/v1/book_categories', 2),
+    ('/api/v1/reviews/book/1', 2),
+    ('/api/v1/reviews/1', 2),
+    ('/api/v1/books/export?format=csv', 1),
+]
+
+
+def count_statements(client, url, token):
+    with client:
+        response = client.get(url, headers=auth(token))
+        response.get_data()
+        response.close()
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return g.sql_queries.count
+
+
+@pytest.mark.parametrize('url, budget', ENDPOINTS)
+def test_endpoint_statements(client, catalog, url, budget):
+    admin, _, _ = catalog
+    assert count_statements(client, url, admin) <= budget
+
+
+@pytest.mark.parametrize('url', [url for url, _ in ENDPOINTS])
+def test_statements_do_not_grow_with_the_catalog(app, client, catalog, url):
+    admin, _, _ = catalog
+    separator = '&' if '?' in url else '?'
+    # Distinct query strings, the response cache would answer a repeated one
+    before = count_statements(client, f'{url}{separator}run=1', admin)
+    with app.app_context():
+        seed_catalog(books=40, reviewers=4)
+    assert count_statements(client, f'{url}{separator}run=2', admin) == before
@@ -0,0 +1,87 @@
+import json
+import logging
+
+import pytest
+from flask import Response, jsonify, stream_with_context
+
+from bookstore_api.app.models import Book
+from bookstore_api.app.services import NPlusOneError
+from .conftest import auth
+
+
+@pytest.fixture
+def nplus1_routes(app):
+    """Routes reading each book's author lazily, one SELECT per author."""
+    @app.route('/test/authors')
+    def authors():
+        return jsonify([book.author.name for book in Book.query.order_by(Book.id)])
+
+    @app.route('/test/authors.txt')
+    def authors_text():
+        def lines():
+            for book in Book.query.order_by(Book.id):
+                yield f'{book.author.name}\n'
+        return Response(stream_with_context(lines()))
+
+
+@pytest.fixture
+def sql_log(app):
+    records = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            records.append(record)
+    handler = Handler()
+    app.logger.addHandler(handler)
+    yield records
+    app.logger.removeHandler(handler)
+
+
+def test_server_timing(client, catalog):
+    admin, _, _ = catalog
+    response = client.get('/api/v1/books', headers=auth(admin))
+    db_timing, app_timing = response.headers.getlist('Server-Timing')
+    assert db_timing.startswith('db;dur=') and db_timing.endswith('queries"')
+    assert app_timing.startswith('app;dur=')
+
+
+def test_request_log_line(client, catalog, sql_log):
+    admin, _, _ = catalog
+    client.get('/api/v1/books/1', headers=auth(admin))
+    record = [record for record in sql_log if hasattr(record, 'sql_metrics')][-1]
+    assert record.sql_metrics['path'] == '/api/v1/books/1'
+    assert record.sql_metrics['status'] == 200
+    assert record.sql_metrics['queries'] > 0
+    assert json.loads(record.getMessage()) == record.sql_metrics
+
+
+def test_streamed_response_log_line(client, catalog, sql_log):
+    admin, _, _ = catalog
+    response = client.get('/api/v1/books/export?format=csv', headers=auth(admin))
+    response.get_data()
+    response.close()
+    record = [record for record in sql_log if hasattr(record, 'sql_metrics')][-1]
+    # Counted once the body, which runs the export's statements, has been sent
+    assert record.sql_metrics['path'] == '/api/v1/books/export'
+    assert record.sql_metrics['queries'] >= 1
+
+
+def test_nplus1_fails_the_request_under_testing(client, catalog, nplus1_routes):
+    with pytest.raises(NPlusOneError, match='N\\+1 queries in GET /test/authors'):
+        client.get('/test/authors')
+
+
+def test_nplus1_in_a_streamed_body(client, catalog, nplus1_routes):
+    response = client.get('/test/authors.txt')
+    response.get_data()
+    with pytest.raises(NPlusOneError):
+        response.close()
+
+
+def test_nplus1_only_warns_outside_tests(app, client, catalog, nplus1_routes, sql_log):
+    app.config['TESTING'] = False
+    assert client.get('/test/authors').status_code == 200
+    assert any(
+        record.levelno == logging.WARNING and 'N+1 queries in GET /test/authors' in record.getMessage()
+        for record in sql_log
+    )
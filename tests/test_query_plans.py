@@ -0,0 +1,23 @@
+from sqlalchemy import text
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.helpers import check_query_plans
+from bookstore_api.app.models import Book
+
+
+def test_queries_use_indexes(app):
+    with app.app_context():
+        results = check_query_plans(seed_books=2000)
+        assert [name for name, table, scanned in results if table in scanned] == []
+        # The synthetic catalog is rolled back
+        assert Book.query.count() == 0
+
+
+def test_dropped_index_is_reported(app):
+    with app.app_context():
+        db.session.execute(text('DROP INDEX ix_books_author_id'))
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['seed', 'query-plans', '--books', '2000'])
+    assert result.exit_code == 1
+    assert "books list by author: sequential scan of books" in result.output
+    assert "author's books: sequential scan of books" in result.output
@@ -0,0 +1,88 @@
+import sqlite3
+
+import pytest
+from flask import g
+from flask_jwt_extended import create_access_token
+from sqlalchemy import create_engine, select
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Author, Role, User
+from bookstore_api.app.services import replica_router, READ_PRIMARY_COOKIE
+from bookstore_api.app.services.replicas import Replica
+from .conftest import auth
+
+
+@pytest.fixture
+def other_admin(app, catalog):
+    """The token of a second admin."""
+    with app.app_context():
+        role = Role.query.filter_by(name='admin').one()
+        user = User(username='admin2', email='admin2@example.com', password_hash='-', role_id=role.id)
+        user.save()
+        return create_access_token(identity=str(user.id))
+
+
+@pytest.fixture
+def replica(app, catalog, other_admin, monkeypatch, tmp_path):
+    """A copy of the database serving as the replica, where the first author is named differently."""
+    path = tmp_path / 'replica.db'
+    with app.app_context():
+        copy = sqlite3.connect(path)
+        db.engine.raw_connection().driver_connection.backup(copy)
+        copy.execute("UPDATE authors SET name = 'replica author' WHERE id = 1")
+        copy.commit()
+        copy.close()
+    engine = create_engine(f'sqlite:///{path}')
+    monkeypatch.setattr(replica_router, 'replicas', [Replica(engine)])
+    yield path
+    engine.dispose()
+
+
+def author_name(client, token, query=''):
+    response = client.get(f'/api/v1/authors/1?fields=name{query}', headers=auth(token))
+    assert response.status_code == 200
+    return response.get_json()['data']['author']['name']
+
+
+def test_reads_go_to_the_replica(client, catalog, replica):
+    admin, _, _ = catalog
+    assert author_name(client, admin) == 'replica author'
+    assert replica_router.stats()[0]['healthy']
+
+
+def test_writer_reads_from_the_primary(client, catalog, replica):
+    admin, _, _ = catalog
+    response = client.put('/api/v1/authors/2', json={'bio': 'Rewritten'}, headers=auth(admin))
+    assert response.status_code == 200
+    assert client.get_cookie(READ_PRIMARY_COOKIE) is not None
+    assert author_name(client, admin, '&run=1') == 'author 0'
+
+
+def test_writer_pinned_by_identity(app, client, catalog, other_admin, replica):
+    admin, _, _ = catalog
+    client.put('/api/v1/authors/2', json={'bio': 'Rewritten'}, headers=auth(admin))
+    # Another client of the same user, without the cookie
+    other_client = app.test_client()
+    assert author_name(other_client, admin, '&run=1') == 'author 0'
+    # Other users still read from the replica
+    assert author_name(other_client, other_admin, '&run=2') == 'replica author'
+
+
+def test_unreachable_replica_falls_back_to_the_primary(client, catalog, replica):
+    admin, _, _ = catalog
+    replica_router.replicas[0].engine.dispose()
+    replica.unlink()
+    replica.mkdir()
+    replica_router.replicas[0].checked_at = None
+    assert author_name(client, admin) == 'author 0'
+    assert not replica_router.stats()[0]['healthy']
+
+
+def test_primary_execution_option(app, replica):
+    statement = select(Author.name).where(Author.id == 1)
+    with app.test_request_context():
+        g.db_replica = replica_router.replicas[0].engine
+        assert db.session.scalar(statement) == 'replica author'
+        # Locking reads set it
+        assert db.session.scalar(statement.with_for_update().execution_options(primary=True)) == 'author 0'
+        db.session.rollback()
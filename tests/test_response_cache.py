@@ -0,0 +1,61 @@
+from bookstore_api.app.services import response_cache
+from bookstore_api.app.services.response_cache import LRUCacheBackend
+from .conftest import auth
+
+
+def get(client, token, url):
+    response = client.get(url, headers=auth(token))
+    assert response.status_code == 200
+    return response.headers['X-Cache']
+
+
+def test_backend(app):
+    # CACHE_TYPE=lru under test
+    assert isinstance(response_cache.backend, LRUCacheBackend)
+
+
+def test_key_normalization(client, catalog):
+    admin, _, _ = catalog
+    assert get(client, admin, '/api/v1/books?page=1&per_page=5') == 'MISS'
+    # The same args in another order, or with a trailing slash
+    assert get(client, admin, '/api/v1/books?per_page=5&page=1') == 'HIT'
+    assert get(client, admin, '/api/v1/books/?page=1&per_page=5') == 'HIT'
+    assert get(client, admin, '/api/v1/books?page=2&per_page=5') == 'MISS'
+
+
+def test_vary_on_user(client, catalog):
+    admin, reader, _ = catalog
+    # The reader's review of the first book
+    assert get(client, admin, '/api/v1/reviews/1') == 'MISS'
+    assert get(client, admin, '/api/v1/reviews/1') == 'HIT'
+    # Cached apart for every user
+    assert get(client, reader, '/api/v1/reviews/1') == 'MISS'
+    assert get(client, reader, '/api/v1/reviews/1') == 'HIT'
+
+
+def test_writes_invalidate_tags(client, catalog):
+    admin, _, _ = catalog
+    for url in ('/api/v1/authors', '/api/v1/books'):
+        assert get(client, admin, url) == 'MISS'
+        assert get(client, admin, url) == 'HIT'
+    assert get(client, admin, '/api/v1/book_categories') == 'MISS'
+
+    # Books nest their author, categories don't
+    client.put('/api/v1/authors/1', json={'bio': 'Rewritten'}, headers=auth(admin))
+    assert get(client, admin, '/api/v1/authors') == 'MISS'
+    assert get(client, admin, '/api/v1/books') == 'MISS'
+    assert get(client, admin, '/api/v1/book_categories') == 'HIT'
+    authors = client.get('/api/v1/authors', headers=auth(admin)).get_json()['data']['authors']
+    assert 'Rewritten' in [author['bio'] for author in authors]
+
+
+def test_hit_and_miss_counters(client, catalog):
+    admin, _, _ = catalog
+    before = response_cache.stats()
+    for _ in range(3):
+        get(client, admin, '/api/v1/book_categories')
+    after = response_cache.stats()
+    assert (after['hits'] - before['hits'], after['misses'] - before['misses']) == (2, 1)
+    assert 0 < after['hit_ratio'] <= 1
+    stats = client.get('/api/v1/stats', headers=auth(admin)).get_json()['data']['response_cache']
+    assert stats['hits'] == after['hits']
@@ -0,0 +1,61 @@
+import datetime
+import json
+
+import pytest
+
+from bookstore_api.app.helpers import compile_dump, get_schema
+from bookstore_api.app.models import Author, Book, BookCategory, Review, User
+from bookstore_api.app.schemas import AuthorSchema, BookSchema, BookCategorySchema, ReviewSchema
+
+
+@pytest.fixture
+def catalog():
+    """Transient authors, categories, books and reviews, some of their relations and values None."""
+    now = datetime.datetime(2025, 1, 1, 12, 30, 15, 250)
+    authors = [Author(id=1, name='Ursula', bio='Wrote É and ü', updated_at=now), Author(id=2, name='Anonymous')]
+    categories = [BookCategory(id=1, name='Fantasy', description=None)]
+    users = [User(id=1, username='reader'), User(id=2, username='other')]
+    books = [
+        Book(
+            id=1, title='A Wizard', isbn='9780000000001', description='Islands', author=authors[0],
+            category=categories[0], average_rating=4.5, review_count=2, publication_year=1968,
+            cover_image_url='https://covers.example.com/a.jpg', cover_status='ready', created_at=now, updated_at=now
+        ),
+        # No category, no cover and not rated
+        Book(id=2, title='Untitled', isbn='9780000000002', author=authors[1], author_id=2, created_at=now),
+        # No author either
+        Book(id=3, title='Orphan', isbn='9780000000003', average_rating=None),
+    ]
+    reviews = [
+        Review(id=1, rating=5, comment='Great', book=books[0], user=users[0], created_at=now, updated_at=now),
+        Review(id=2, rating=3, comment=None, book=books[0], user=users[1], created_at=now),
+        # Its book and user not loaded
+        Review(id=3, rating=1, comment='-'),
+    ]
+    return {'authors': authors, 'categories': categories, 'books': books, 'reviews': reviews}
+
+
+CASES = [
+    (BookSchema, 'books', {}),
+    (BookSchema, 'books', {'only': ('id', 'author.name', 'reviews.user.username')}),
+    (BookSchema, 'books', {'only': ('title', 'reviews.rating')}),
+    (BookSchema, 'books', {'exclude': ('reviews', 'description')}),
+    (AuthorSchema, 'authors', {}),
+    (AuthorSchema, 'authors', {'only': ('name', 'books.title', 'books.category')}),
+    (AuthorSchema, 'authors', {'exclude': ('books',)}),
+    (ReviewSchema, 'reviews', {}),
+    (ReviewSchema, 'reviews', {'only': ('rating', 'book.title')}),
+    (ReviewSchema, 'reviews', {'exclude': ('user', 'created_at')}),
+    (BookCategorySchema, 'categories', {}),
+    (BookCategorySchema, 'categories', {'only': ('name', 'books.reviews')}),
+]
+
+
+@pytest.mark.parametrize('schema_class, rows, options', CASES)
+def test_compiled_dump_matches_marshmallow(catalog, schema_class, rows, options):
+    for many, value in ((True, catalog[rows]), *((False, row) for row in catalog[rows])):
+        schema = get_schema(schema_class, many=many, **options)
+        assert json.dumps(compile_dump(schema)(value)) == json.dumps(schema.dump(value))
+        # An unshared instance compiles the same
+        schema = schema_class(many=many, **options)
+        assert json.dumps(compile_dump(schema)(value)) == json.dumps(schema.dump(value))
@@ -0,0 +1,28 @@
+import pytest
+
+from .conftest import auth
+
+
+@pytest.mark.parametrize('fields', [
+    'id,bogus',
+    'id,author.bogus',
+    # Outside the nested field's own only
+    'id,author.books',
+    'id,reviews.user.email',
+    # Not a nested field
+    'id,title.length',
+])
+def test_invalid_fields(client, catalog, fields):
+    admin, _, _ = catalog
+    response = client.get(f'/api/v1/books?fields={fields}', headers=auth(admin))
+    assert response.status_code == 400
+
+
+def test_nested_fields(client, catalog):
+    admin, _, _ = catalog
+    for field in ('rating', 'comment'):
+        response = client.get(f'/api/v1/books?fields=id,reviews.{field}', headers=auth(admin))
+        assert response.status_code == 200
+        book = response.get_json()['data']['books'][0]
+        assert set(book) == {'id', 'reviews'}
+        assert {key for review in book['reviews'] for key in review} == {field}
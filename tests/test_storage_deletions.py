@@ -0,0 +1,116 @@
+import datetime
+import io
+
+from sqlalchemy import update
+
+from bookstore_api.app.extensions import db
+from bookstore_api.app.models import Book, StorageDeletion
+from bookstore_api.app.services import storage_deletions, schedule_deletion
+from bookstore_api.app.services.storage import LocalStorage
+from .conftest import auth
+
+
+class FlakyStorage(LocalStorage):
+    """Local storage failing to delete the `failing` keys, recording every delete_many call."""
+
+    def __init__(self, directory, failing=()):
+        super().__init__(directory)
+        self.failing = set(failing)
+        self.batches = []
+
+    def delete_many(self, keys):
+        self.batches.append(list(keys))
+        failures = {key: 'access denied' for key in keys if key in self.failing}
+        super().delete_many([key for key in keys if key not in failures])
+        return failures
+
+
+def store(storage, tmp_path, *keys):
+    cover = tmp_path / 'cover.png'
+    cover.write_bytes(b'cover')
+    for key in keys:
+        storage.upload(str(cover), key, 'image/png')
+
+
+def test_drains_in_batches(app, catalog, tmp_path, monkeypatch):
+    storage = FlakyStorage(tmp_path / 'storage')
+    monkeypatch.setattr(storage_deletions, 'storage', storage)
+    monkeypatch.setattr(storage_deletions, 'batch_size', 2)
+    keys = [f'covers/old-{i}.png' for i in range(5)]
+    store(storage, tmp_path, *keys, 'covers/shared.png')
+    with app.app_context():
+        # A book uses this key again, it stays
+        db.session.execute(update(Book).where(Book.id == 1).values(cover_image_s3_key='covers/shared.png'))
+        for key in (*keys, 'covers/shared.png'):
+            schedule_deletion(key)
+        db.session.commit()
+
+        assert storage_deletions.drain() == (5, 0)
+        assert StorageDeletion.query.count() == 0
+    # Two rows a batch, the last one holding the key still in use
+    assert storage.batches == [keys[:2], keys[2:4], keys[4:]]
+    assert not any(storage.exists(key) for key in keys)
+    assert storage.exists('covers/shared.png')
+
+
+def test_failed_deletions_back_off(app, catalog, tmp_path, monkeypatch):
+    storage = FlakyStorage(tmp_path / 'storage', failing=['covers/locked.png'])
+    monkeypatch.setattr(storage_deletions, 'storage', storage)
+    monkeypatch.setattr(storage_deletions, 'retry_backoff', 60)
+    monkeypatch.setattr(storage_deletions, 'max_backoff', 100)
+    store(storage, tmp_path, 'covers/locked.png', 'covers/old.png')
+    with app.app_context():
+        schedule_deletion('covers/locked.png')
+        schedule_deletion('covers/old.png')
+        db.session.commit()
+
+        before = datetime.datetime.now()
+        assert storage_deletions.drain() == (1, 1)
+        row = StorageDeletion.query.one()
+        assert (row.key, row.attempts, row.last_error) == ('covers/locked.png', 1, 'access denied')
+        assert row.next_attempt_at >= before + datetime.timedelta(seconds=60)
+
+        # Not due yet, so the next drain leaves it alone
+        assert storage_deletions.drain() == (0, 0)
+        assert len(storage.batches) == 1
+
+        # Due again and failing again, the backoff doubles up to the maximum
+        row.next_attempt_at = datetime.datetime.now() - datetime.timedelta(seconds=1)
+        db.session.commit()
+        before = datetime.datetime.now()
+        assert storage_deletions.drain() == (0, 1)
+        row = StorageDeletion.query.one()
+        assert row.attempts == 2
+        assert before + datetime.timedelta(seconds=100) <= row.next_attempt_at \
+            < before + datetime.timedelta(seconds=120)
+
+        # Deleted once the storage recovers
+        storage.failing.clear()
+        row.next_attempt_at = datetime.datetime.now() - datetime.timedelta(seconds=1)
+        db.session.commit()
+        assert storage_deletions.drain() == (1, 0)
+        assert StorageDeletion.query.count() == 0
+    assert not storage.exists('covers/locked.png')
+
+
+def test_rolled_back_with_failed_book_update(app, client, catalog, tmp_path, monkeypatch):
+    admin, _, _ = catalog
+    storage = FlakyStorage(tmp_path / 'storage')
+    monkeypatch.setattr(storage_deletions, 'storage', storage)
+    store(storage, tmp_path, 'covers/old.png')
+    with app.app_context():
+        db.session.execute(update(Book).where(Book.id == 1).values(cover_image_s3_key='covers/old.png'))
+        db.session.commit()
+        taken_isbn = db.session.get(Book, 2).isbn
+
+    # A new cover, with the ISBN of another book failing the update
+    response = client.put('/api/v1/books/1', headers=auth(admin), data={
+        'isbn': taken_isbn, 'cover_image': (io.BytesIO(b'new cover'), 'new.png'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 500 and response.get_json()['error'] == 'Error updating book'
+
+    with app.app_context():
+        assert StorageDeletion.query.count() == 0
+        assert db.session.get(Book, 1).cover_image_s3_key == 'covers/old.png'
+        assert storage_deletions.drain() == (0, 0)
+    assert storage.exists('covers/old.png')
@@ -0,0 +1,40 @@
+import threading
+
+from bookstore_api.app.services.trigram_index import TrigramIndex
+
+
+def test_rebuild_outside_the_lock():
+    index = TrigramIndex()
+    catalog = {1: ('The Hobbit',), 2: ('Dune',)}
+    index.refresh(lambda column, ids: catalog.items(), max_age=60)
+    loading, resume = threading.Event(), threading.Event()
+
+    def slow_load(column, ids):
+        loading.set()
+        resume.wait(5)
+        return list(catalog.items())
+
+    catalog[3] = ('The Silmarillion',)
+    rebuild = threading.Thread(target=index.refresh, args=(slow_load, 0))
+    rebuild.start()
+    assert loading.wait(5)
+    # Searches meanwhile neither wait for the rebuild nor see a half built index
+    results = []
+
+    def search_hobbit():
+        index.refresh(slow_load, 0)
+        results.append(index.search('hobit', 0.3, 10))
+
+    search = threading.Thread(target=search_hobbit)
+    search.start()
+    search.join(1)
+    assert [book_id for book_id, _ in results[0]] == [1]
+    # A write made during the rebuild is reloaded by the next refresh
+    index.mark_stale('id', [2])
+    resume.set()
+    rebuild.join(5)
+    assert [book_id for book_id, _ in index.search('silmarilion', 0.3, 10)] == [3]
+
+    catalog[2] = ('Dune Messiah',)
+    index.refresh(lambda column, ids: [(book_id, catalog[book_id]) for book_id in ids], max_age=60)
+    assert [book_id for book_id, _ in index.search('messiah', 0.3, 10)] == [2]